@@ -0,0 +1,211 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+MAX_ROWS = 1048576
+MAX_COLUMNS = 16384
+
+_CELL_RE = re.compile(r'^\$?([A-Za-z]{1,3})\$?(\d+)$')
+_COLUMN_RE = re.compile(r'^\$?([A-Za-z]{1,3})$')
+_ROW_RE = re.compile(r'^\$?(\d+)$')
+
+
+@lru_cache(maxsize=None)
+def column_letters(index: int) -> str:
+    """Convert a 1-based column index to letters: 1 -> 'A', 28 -> 'AB'."""
+    if not 1 <= index <= MAX_COLUMNS:
+        raise ValueError(f"Column index {index} is outside 1..{MAX_COLUMNS}")
+    letters = ''
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+@lru_cache(maxsize=None)
+def column_index(letters: str) -> int:
+    """Convert column letters to a 1-based column index: 'A' -> 1, 'ab' -> 28."""
+    index = 0
+    for ch in letters.upper():
+        if not 'A' <= ch <= 'Z':
+            raise ValueError(f"Invalid column letters '{letters}'")
+        index = index * 26 + (ord(ch) - 64)
+    if not 1 <= index <= MAX_COLUMNS:
+        raise ValueError(f"Column '{letters}' is outside A..XFD")
+    return index
+
+
+@lru_cache(maxsize=1)
+def _letters_table() -> np.ndarray:
+    """Letters of every column, position 0 is unused so the table is indexed by column number."""
+    return np.array([''] + [column_letters(i) for i in range(1, MAX_COLUMNS + 1)], dtype=object)
+
+
+@lru_cache(maxsize=1)
+def _index_table() -> dict[str, int]:
+    return {letters: i for i, letters in enumerate(_letters_table()) if letters}
+
+
+def columns_to_letters(indices) -> np.ndarray:
+    """Vectorized column_letters over an array of 1-based column indices."""
+    indices = np.asarray(indices, dtype=np.int64)
+    if indices.size and (indices.min() < 1 or indices.max() > MAX_COLUMNS):
+        raise ValueError(f"Column indices must be within 1..{MAX_COLUMNS}")
+    return _letters_table()[indices]
+
+
+def letters_to_columns(letters) -> np.ndarray:
+    """Vectorized column_index over an array of column letters."""
+    table = _index_table()
+    return np.fromiter((table[str(x).upper()] for x in np.ravel(letters)), dtype=np.int64).reshape(np.shape(letters))
+
+
+def column_letters_range(first_col: int, count: int) -> list[str]:
+    """Letters of `count` consecutive columns starting at first_col."""
+    if count <= 0:
+        return []
+    return list(columns_to_letters(np.arange(first_col, first_col + count)))
+
+
+def split_sheet(reference: str) -> tuple[str, str]:
+    """Split "'My Sheet'!A1:B2" into ("My Sheet", "A1:B2"). The sheet is None if not present."""
+    if '!' not in reference:
+        return None, reference
+    sheet, _, address = reference.rpartition('!')
+    if sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    return sheet, address
+
+
+def quote_sheet(sheet_name: str) -> str:
+    """Quote a sheet name for use in a reference if needed: My Sheet -> 'My Sheet'."""
+    if re.fullmatch(r'[A-Za-z_][A-Za-z0-9_.]*', sheet_name):
+        return sheet_name
+    return "'" + sheet_name.replace("'", "''") + "'"
+
+
+def _row_number(digits: str) -> int:
+    row = int(digits)
+    if not 1 <= row <= MAX_ROWS:
+        raise ValueError(f"Row {row} is outside 1..{MAX_ROWS}")
+    return row
+
+
+def parse_cell(reference: str) -> tuple[int, int]:
+    """Parse 'B7' or '$B$7' into (row, column). Rows and columns outside the sheet raise ValueError."""
+    match = _CELL_RE.match(reference.strip())
+    if not match:
+        raise ValueError(f"Invalid cell reference '{reference}'")
+    return _row_number(match.group(2)), column_index(match.group(1))
+
+
+def cell_address(row: int, col: int, absolute: bool = False) -> str:
+    """Build 'B7' (or '$B$7') from a row and a column index."""
+    if absolute:
+        return f"${column_letters(col)}${row}"
+    return f"{column_letters(col)}{row}"
+
+
+class CellRange(NamedTuple):
+    """A rectangular range, all coordinates 1-based and inclusive."""
+    first_row: int
+    first_col: int
+    last_row: int
+    last_col: int
+
+    @property
+    def rows(self) -> int:
+        return self.last_row - self.first_row + 1
+
+    @property
+    def columns(self) -> int:
+        return self.last_col - self.first_col + 1
+
+    @property
+    def size(self) -> int:
+        return self.rows * self.columns
+
+    def address(self, absolute: bool = True) -> str:
+        """A1 address of the range, e.g. '$B$2:$D$10', '$6:$6' for whole rows or '$B:$B' for whole columns."""
+        dollar = '$' if absolute else ''
+        if (self.first_col, self.last_col) == (1, MAX_COLUMNS):
+            return f"{dollar}{self.first_row}:{dollar}{self.last_row}"
+        if (self.first_row, self.last_row) == (1, MAX_ROWS):
+            return f"{dollar}{column_letters(self.first_col)}:{dollar}{column_letters(self.last_col)}"
+        first = cell_address(self.first_row, self.first_col, absolute)
+        if (self.first_row, self.first_col) == (self.last_row, self.last_col):
+            return first
+        return f"{first}:{cell_address(self.last_row, self.last_col, absolute)}"
+
+    def column_letters(self) -> list[str]:
+        return column_letters_range(self.first_col, self.columns)
+
+    def contains(self, row: int, col: int) -> bool:
+        return self.first_row <= row <= self.last_row and self.first_col <= col <= self.last_col
+
+    def contains_range(self, other: "CellRange") -> bool:
+        return self.contains(other.first_row, other.first_col) and self.contains(other.last_row, other.last_col)
+
+    def intersection(self, other: "CellRange") -> "CellRange":
+        """Overlap of two ranges, or None if they do not overlap."""
+        first_row, first_col = max(self.first_row, other.first_row), max(self.first_col, other.first_col)
+        last_row, last_col = min(self.last_row, other.last_row), min(self.last_col, other.last_col)
+        if first_row > last_row or first_col > last_col:
+            return None
+        return CellRange(first_row, first_col, last_row, last_col)
+
+    def union(self, other: "CellRange") -> "CellRange":
+        """Smallest range containing both ranges."""
+        return CellRange(min(self.first_row, other.first_row), min(self.first_col, other.first_col),
+                         max(self.last_row, other.last_row), max(self.last_col, other.last_col))
+
+    def offset(self, rows: int = 0, columns: int = 0) -> "CellRange":
+        return CellRange(self.first_row + rows, self.first_col + columns, self.last_row + rows, self.last_col + columns)
+
+    def resize(self, rows: int = None, columns: int = None) -> "CellRange":
+        rows = self.rows if rows is None else rows
+        columns = self.columns if columns is None else columns
+        return CellRange(self.first_row, self.first_col, self.first_row + rows - 1, self.first_col + columns - 1)
+
+
+def parse_range(reference: str, bounds: CellRange = None) -> CellRange:
+    """
+    Parse 'A1', 'I3:AH10', 'B:D' or '3:5' (optionally prefixed with a sheet name) into a CellRange.
+
+    :param reference: The range reference.
+    :param bounds: (optional) Whole row / column references are limited to these bounds,
+                   e.g. the used range. They span the entire sheet if not provided.
+    """
+    _, address = split_sheet(reference.strip())
+    first, _, last = address.partition(':')
+    last = last or first
+    bounds = bounds or CellRange(1, 1, MAX_ROWS, MAX_COLUMNS)
+
+    def parse_part(part):
+        part = part.strip()
+        if _CELL_RE.match(part):
+            row, col = parse_cell(part)
+            return row, col, row, col
+        col = _COLUMN_RE.match(part)
+        if col:
+            col = column_index(col.group(1))
+            return bounds.first_row, col, bounds.last_row, col
+        row = _ROW_RE.match(part)
+        if row:
+            row = _row_number(row.group(1))
+            return row, bounds.first_col, row, bounds.last_col
+        raise ValueError(f"Invalid cell range '{reference}'")
+
+    r1, c1, r1_end, c1_end = parse_part(first)
+    r2, c2, r2_end, c2_end = parse_part(last)
+    return CellRange(min(r1, r2), min(c1, c2), max(r1_end, r2_end), max(c1_end, c2_end))
+
+
+def bounding_range(cells) -> CellRange:
+    """Smallest range containing all the given (row, col) pairs."""
+    cells = np.asarray(list(cells), dtype=np.int64).reshape(-1, 2)
+    if not len(cells):
+        raise ValueError("No cells given")
+    return CellRange(int(cells[:, 0].min()), int(cells[:, 1].min()), int(cells[:, 0].max()), int(cells[:, 1].max()))
@@ -0,0 +1,237 @@
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Kind of each cell. EMPTY marks blank cells, so the kinds array is also the validity map.
+EMPTY, NUMBER, INTEGER, TEXT, DATE, BOOL, OTHER = range(7)
+
+# Integers beyond this are not exact as float64 and are kept as objects
+_MAX_EXACT_INTEGER = 2 ** 53
+_type_of = np.frompyfunc(type, 1, 1)
+
+
+class StringTable:
+    """Append-only table of distinct strings; cells hold the code (position) of their string."""
+
+    def __init__(self):
+        self.strings: list[str] = []
+        self._codes: dict[str, int] = {}
+        self._array = None
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def encode(self, text: str) -> int:
+        code = self._codes.get(text)
+        if code is None:
+            code = self._codes[text] = len(self.strings)
+            self.strings.append(text)
+        return code
+
+    def code(self, text: str) -> Optional[int]:
+        """Code of a string, None if it is not in the table."""
+        return self._codes.get(text)
+
+    def array(self) -> np.ndarray:
+        """The strings as an object array, to decode many codes with one gather."""
+        if self._array is None or len(self._array) != len(self.strings):
+            self._array = np.array(self.strings, dtype=object)
+        return self._array
+
+
+def _date_payload(values: list[datetime]) -> np.ndarray:
+    """Naive datetimes as microseconds since 1970, held exactly in float64 for any date Excel can show."""
+    return np.array(values, dtype='datetime64[us]').astype(np.int64).astype(np.float64)
+
+
+def _dates(payload: np.ndarray) -> list[datetime]:
+    return payload.astype(np.int64).astype('datetime64[us]').tolist()
+
+
+class ColumnarSheet:
+    """
+    Compact copy of the values of a rectangular block of cells.
+
+    Each cell is a kind (uint8) and a float64 payload: the number itself, the code of a
+    string in a StringTable shared by the block's columns, a date as microseconds, or a
+    bool as 0/1. Values of any other type are kept aside in a dict. That is 9 bytes per
+    cell instead of a Python object in a list of lists; repeated strings are stored once.
+
+    Both arrays are column-major, so a column is a contiguous slice: columns holding only
+    numbers and blanks (NaN payload) are handed to pandas without copying.
+    """
+
+    def __init__(self, first_row: int, first_col: int, row_count: int, column_count: int,
+                 strings: StringTable = None):
+        self.first_row = first_row
+        self.first_col = first_col
+        self.strings = strings if strings is not None else StringTable()
+        self.kinds = np.zeros((row_count, column_count), dtype=np.uint8, order='F')
+        self.payload = np.full((row_count, column_count), np.nan, order='F')
+        self._others: dict[tuple[int, int], object] = {}
+
+    @classmethod
+    def from_rows(cls, values: list[list], first_row: int, first_col: int,
+                  strings: StringTable = None) -> "ColumnarSheet":
+        store = cls(first_row, first_col, len(values), len(values[0]) if values else 0, strings)
+        store.set_block(0, 0, values)
+        return store
+
+    @classmethod
+    def from_arrays(cls, first_row: int, first_col: int, kinds: np.ndarray, payload: np.ndarray,
+                    strings: StringTable, others: dict = None) -> "ColumnarSheet":
+        """Wrap existing arrays (e.g. memory-mapped from SheetCache) without copying them."""
+        store = cls(first_row, first_col, 0, 0, strings)
+        store.kinds, store.payload = kinds, payload
+        store._others = dict(others or {})
+        return store
+
+    @property
+    def row_count(self) -> int:
+        return self.kinds.shape[0]
+
+    @property
+    def column_count(self) -> int:
+        return self.kinds.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the cells, excluding the shared strings."""
+        return self.kinds.nbytes + self.payload.nbytes + 64 * len(self._others)
+
+    def _encode(self, values: list[list]) -> tuple[np.ndarray, np.ndarray, dict]:
+        """Kinds, payload and the values kept aside (keyed by offsets in the block) of a 2D list."""
+        cells = np.empty((len(values), len(values[0])), dtype=object)
+        cells[...] = values
+        kinds = np.full(cells.shape, OTHER, dtype=np.uint8)
+        payload = np.full(cells.shape, np.nan)
+        # Exact types: subclasses (e.g. NumPy scalars, pandas Timestamps) are kept as objects
+        types = _type_of(cells)
+
+        kinds[types == type(None)] = EMPTY
+        for kind, python_type in ((NUMBER, float), (BOOL, bool)):
+            mask = types == python_type
+            kinds[mask] = kind
+            payload[mask] = cells[mask].astype(np.float64)
+        mask = types == str
+        if mask.any():
+            kinds[mask] = TEXT
+            payload[mask] = [self.strings.encode(text) for text in cells[mask]]
+        for r, c in zip(*np.nonzero(types == int)):
+            if abs(cells[r, c]) < _MAX_EXACT_INTEGER:
+                kinds[r, c], payload[r, c] = INTEGER, cells[r, c]
+        mask = types == datetime
+        if mask.any():
+            # Dates with a time zone are kept as objects
+            mask[mask] = [value.tzinfo is None for value in cells[mask]]
+            kinds[mask] = DATE
+            payload[mask] = _date_payload(cells[mask].tolist())
+
+        others = {(int(r), int(c)): cells[r, c] for r, c in zip(*np.nonzero(kinds == OTHER))}
+        return kinds, payload, others
+
+    def set_block(self, row_offset: int, col_offset: int, values: list[list]) -> None:
+        """Encode a 2D list of values into the cells starting at (row_offset, col_offset)."""
+        if not values or not values[0]:
+            return
+        kinds, payload, others = self._encode(values)
+        rows = slice(row_offset, row_offset + kinds.shape[0])
+        cols = slice(col_offset, col_offset + kinds.shape[1])
+        if self._others:
+            for key in [key for key in self._others
+                        if rows.start <= key[0] < rows.stop and cols.start <= key[1] < cols.stop]:
+                del self._others[key]
+        self.kinds[rows, cols] = kinds
+        self.payload[rows, cols] = payload
+        for (r, c), value in others.items():
+            self._others[(row_offset + r, col_offset + c)] = value
+
+    def set_value(self, row_offset: int, col_offset: int, value: any) -> None:
+        self.set_block(row_offset, col_offset, [[value]])
+
+    def decode_payload(self, kind: int, payload: np.ndarray) -> list:
+        """Values of cells of one kind (other than OTHER) from their payload."""
+        if kind == NUMBER:
+            return payload.tolist()
+        if kind == INTEGER:
+            return payload.astype(np.int64).tolist()
+        if kind == TEXT:
+            return self.strings.array()[payload.astype(np.intp)].tolist()
+        if kind == DATE:
+            return _dates(payload)
+        if kind == BOOL:
+            return payload.astype(bool).tolist()
+        raise ValueError(f"Cells of kind {kind} have no payload")
+
+    def other_values(self) -> dict[tuple[int, int], object]:
+        """The values kept aside (kind OTHER), keyed by (row offset, column offset)."""
+        return self._others
+
+    def _decode(self, kinds: np.ndarray, payload: np.ndarray, row_offset: int = 0,
+                col_offset: int = 0) -> np.ndarray:
+        """Object array of the values of a block of the arrays."""
+        values = np.full(kinds.shape, None, dtype=object)
+        for kind in (NUMBER, INTEGER, TEXT, DATE, BOOL):
+            mask = kinds == kind
+            if mask.any():
+                values[mask] = self.decode_payload(kind, payload[mask])
+        if self._others:
+            for r, c in zip(*np.nonzero(kinds == OTHER)):
+                values[r, c] = self._others[(row_offset + int(r), col_offset + int(c))]
+        return values
+
+    def value(self, row_offset: int, col_offset: int) -> any:
+        kind = self.kinds[row_offset, col_offset]
+        if kind == EMPTY:
+            return None
+        if kind == OTHER:
+            return self._others[(row_offset, col_offset)]
+        return self._decode(self.kinds[row_offset:row_offset + 1, col_offset:col_offset + 1],
+                            self.payload[row_offset:row_offset + 1, col_offset:col_offset + 1],
+                            row_offset, col_offset)[0, 0]
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> list[list]:
+        """Decode a run of rows to a 2D list of values, as returned by ExcelBackend.read_range."""
+        return self._decode(self.kinds[start:stop], self.payload[start:stop], start).tolist()
+
+    def column(self, col_offset: int) -> np.ndarray:
+        """
+        The values of a column: a float64 view of the payload (NaN for blanks) if it holds
+        only numbers, an object array otherwise.
+        """
+        kinds = self.kinds[:, col_offset]
+        if np.all((kinds == NUMBER) | (kinds == EMPTY)) and (kinds == NUMBER).any():
+            return self.payload[:, col_offset]
+        return self._decode(kinds[:, None], self.payload[:, col_offset:col_offset + 1], 0, col_offset)[:, 0]
+
+    def dataframe(self, columns: list[str]) -> pd.DataFrame:
+        """
+        The cells as a DataFrame with the given column labels. Numeric columns share memory
+        with the store; callers must not modify the frame.
+        """
+        data = {}
+        for col_offset, label in enumerate(columns):
+            column = self.column(col_offset)
+            # Let pandas type the other columns the way it does for lists of values
+            data[label] = column if column.dtype != object else pd.Series(column).infer_objects().to_numpy()
+        return pd.DataFrame(data, columns=columns, copy=False)
+
+    def occupied(self) -> np.ndarray:
+        """Boolean array, True for cells holding a value other than an empty string."""
+        occupied = self.kinds != EMPTY
+        text = self.kinds == TEXT
+        if text.any():
+            empty_code = self.strings.code('')
+            if empty_code is not None:
+                occupied &= ~(text & (self.payload == empty_code))
+        return occupied
+
+    def copy(self) -> "ColumnarSheet":
+        """Copy of the cells, sharing the (append-only) string table."""
+        store = ColumnarSheet(self.first_row, self.first_col, 0, 0, self.strings)
+        store.kinds = self.kinds.copy(order='F')
+        store.payload = self.payload.copy(order='F')
+        store._others = dict(self._others)
+        return store
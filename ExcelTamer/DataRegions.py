@@ -0,0 +1,141 @@
+from typing import Iterable, Optional
+
+import numpy as np
+
+from ExcelTamer.CellAddress import CellRange
+
+# Regions reported per sheet; smaller ones beyond this are dropped from the list
+MAX_REGIONS = 50
+
+
+def occupied_mask(values: list[list]) -> np.ndarray:
+    """Boolean array, True for cells holding a value (anything but None or an empty string)."""
+    if not values or not values[0]:
+        return np.zeros((len(values), 0), dtype=bool)
+    cells = np.empty((len(values), len(values[0])), dtype=object)
+    cells[...] = values
+    return (cells != None) & (cells != '')  # noqa: E711 - elementwise comparison
+
+
+class RegionDetector:
+    """
+    Finds the data regions of a sheet: the bounding box of its non-empty cells, and the
+    separate blocks of cells touching each other (horizontally, vertically or diagonally),
+    typically one per table.
+
+    Row blocks are fed in order with add_block, so a sheet can be scanned in windows
+    without holding it in memory. Each block is reduced to runs of non-empty cells per
+    row with NumPy; runs overlapping a run of the previous row are joined in a union-find
+    that keeps the bounding box of each component.
+    """
+
+    def __init__(self):
+        self._parents: list[int] = []
+        # [first_row, first_col, last_row, last_col] of each component, valid for roots
+        self._boxes: list[list[int]] = []
+        # Runs (first_col, last_col, component) of the last row seen, and that row
+        self._previous_runs: list[tuple[int, int, int]] = []
+        self._previous_row = None
+
+    def _find(self, component: int) -> int:
+        parents = self._parents
+        while parents[component] != component:
+            parents[component] = parents[parents[component]]
+            component = parents[component]
+        return component
+
+    def _union(self, first: int, second: int) -> None:
+        first, second = self._find(first), self._find(second)
+        if first == second:
+            return
+        self._parents[second] = first
+        box, other = self._boxes[first], self._boxes[second]
+        box[0], box[1] = min(box[0], other[0]), min(box[1], other[1])
+        box[2], box[3] = max(box[2], other[2]), max(box[3], other[3])
+
+    def add_block(self, values: list[list], first_row: int, first_col: int) -> None:
+        """Add the next row block of the sheet; blocks must come in row order."""
+        self.add_mask(occupied_mask(values), first_row, first_col)
+
+    def add_mask(self, mask: np.ndarray, first_row: int, first_col: int) -> None:
+        """Like add_block, for a block already reduced to its occupied_mask."""
+        if not mask.any():
+            self._previous_runs = []
+            self._previous_row = first_row + mask.shape[0] - 1
+            return
+
+        # Runs start where the padded mask steps up and end before it steps down
+        padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = mask
+        steps = np.diff(padded, axis=1)
+        run_rows, run_starts = np.nonzero(steps == 1)
+        _, run_ends = np.nonzero(steps == -1)
+        run_rows = (run_rows + first_row).tolist()
+        run_starts = (run_starts + first_col).tolist()
+        run_ends = (run_ends + first_col - 1).tolist()
+
+        current_row, current_runs = None, []
+        for row, start, end in zip(run_rows, run_starts, run_ends):
+            if row != current_row:
+                if current_row is not None:
+                    self._previous_row, self._previous_runs = current_row, current_runs
+                current_row, current_runs = row, []
+            component = len(self._parents)
+            self._parents.append(component)
+            self._boxes.append([row, start, row, end])
+            current_runs.append((start, end, component))
+
+            if self._previous_row == row - 1:
+                for previous_start, previous_end, previous_component in self._previous_runs:
+                    if previous_start > end + 1:
+                        break
+                    if previous_end + 1 >= start:
+                        self._union(previous_component, component)
+        self._previous_row, self._previous_runs = current_row, current_runs
+        # Rows after the last run of the block are empty
+        if current_row != first_row + mask.shape[0] - 1:
+            self._previous_row, self._previous_runs = first_row + mask.shape[0] - 1, []
+
+    def regions(self) -> list[CellRange]:
+        """
+        The data regions found so far, largest first. Components whose bounding boxes
+        overlap (e.g. a table with an empty column between its labels and values) are merged.
+        """
+        boxes = [list(self._boxes[component]) for component in range(len(self._parents))
+                 if self._parents[component] == component]
+        merged = True
+        while merged:
+            merged = False
+            boxes.sort()
+            result = []
+            for box in boxes:
+                for other in result:
+                    if box[0] <= other[2] and other[0] <= box[2] and box[1] <= other[3] and other[1] <= box[3]:
+                        other[0], other[1] = min(box[0], other[0]), min(box[1], other[1])
+                        other[2], other[3] = max(box[2], other[2]), max(box[3], other[3])
+                        merged = True
+                        break
+                else:
+                    result.append(box)
+            boxes = result
+        regions = [CellRange(*box) for box in boxes]
+        regions.sort(key=lambda region: (-region.size, region.first_row, region.first_col))
+        return regions[:MAX_REGIONS]
+
+    @property
+    def bounds(self) -> Optional[CellRange]:
+        """The smallest range holding every non-empty cell, None if all cells were empty."""
+        roots = [self._boxes[component] for component in range(len(self._parents))
+                 if self._parents[component] == component]
+        if not roots:
+            return None
+        return CellRange(min(box[0] for box in roots), min(box[1] for box in roots),
+                         max(box[2] for box in roots), max(box[3] for box in roots))
+
+
+def detect_regions(blocks: Iterable) -> RegionDetector:
+    """Run a RegionDetector over RangeData row blocks, e.g. from RangeReader.read_in_windows."""
+    detector = RegionDetector()
+    for block in blocks:
+        detector.add_block(block.values, block.first_row, block.first_col)
+    return detector
@@ -1,8 +1,26 @@
 import pandas as pd
-import xlwings as xw
 
 import logging
+import os
+import threading
+import uuid
 from datetime import datetime
+from typing import Iterator, Optional
+
+from PIL import Image
+
+from ExcelTamer.CellAddress import CellRange, cell_address, column_letters, parse_cell, parse_range
+from ExcelTamer.DataRegions import RegionDetector, detect_regions
+from ExcelTamer.ExcelBackend import ExcelBackend, RangeData, XlwingsBackend
+from ExcelTamer.FormulaIndex import FormulaQuery, TableDefinition
+from ExcelTamer.RangePager import DEFAULT_MAX_TOKENS, first_window_cells, take_page
+from ExcelTamer.RangeReader import CHUNK_CELLS, TILE_COLUMNS, TILE_OVERLAP, TILE_ROWS, read_in_windows, split_into_tiles
+from ExcelTamer.SheetCache import SheetCache
+from ExcelTamer.SheetSnapshot import SheetSnapshot
+from ExcelTamer.TrigramIndex import MATCH_MODES
+from ExcelTamer.ValueIndex import ValueIndex
+from ExcelTamer.WriteBuffer import WriteBuffer
+from ExcelTamer.XlsxFileBackend import XlsxFileBackend
 
 # Configure logging
 logging.basicConfig(
@@ -13,54 +31,256 @@ logging.basicConfig(
 
 
 class ExcelAutomation:
-    def __init__(self, file_path: str = None):
-        self.app = xw.apps.active if xw.apps else xw.App(visible=True)
-
-        if file_path:
-            self.wb = self.app.books.open(file_path)
-        else:
-            self.wb = self.app.books.active if self.app.books else self.app.books.add()
-
+    def __init__(self, file_path: str = None, backend: ExcelBackend = None, write_behind: bool = False,
+                 max_pending_writes: int = 500, max_pending_seconds: float = 30.0, sheet_cache: SheetCache = None):
+        """
+        :param file_path: Workbook to open. The active workbook is used if not provided.
+        :param backend: (optional) The backend used to access the workbook. Defaults to
+                        XlwingsBackend, which drives a running Excel instance.
+        :param write_behind: If True, write_cell only records the write in memory, where reads
+                             see it immediately. Pending writes are sent to the workbook as
+                             coalesced range writes on save, on flush, or once a threshold is hit.
+        :param max_pending_writes: Number of pending cells that triggers a flush.
+        :param max_pending_seconds: Age of the oldest pending write that triggers a flush,
+                                    checked when a write is made.
+        :param sheet_cache: (optional) On-disk cache of sheet snapshots and structure. While the
+                            workbook is unchanged (on disk and through this instance), they are
+                            loaded from the cache rather than read from the workbook.
+        """
+        self.backend = backend if backend is not None else XlwingsBackend(file_path)
+
+        self.write_behind = write_behind
+        self.max_pending_writes = max_pending_writes
+        self.max_pending_seconds = max_pending_seconds
+        self._write_buffer = WriteBuffer()
+
+        # Incremented on every change made through this instance. Cached sheet
+        # snapshots are only valid for the revision they were read at.
+        self.revision = 0
+        # Also incremented by buffered writes (which patch the snapshots instead of
+        # bumping the revision) and by saving under a new name; keys caches of results.
+        self.version = 0
+        # Tells apart the versions of different instances, e.g. in caches shared by several workbooks
+        self.session = uuid.uuid4().hex
+        self._snapshots: dict[str, SheetSnapshot] = {}
+        self._value_index = ValueIndex()
+        # Workbook structure: sheet names, named ranges grouped by sheet, and the used range and
+        # data regions of each sheet. Entries are dropped when the sheet is written, all of it
+        # when sheets change.
+        self._sheet_names = None
+        self._named_ranges = None
+        self._tables = None
+        self._sheet_structure: dict[str, dict] = {}
+
+        self.sheet_cache = sheet_cache
+        self._structure_cached = False
+        # Headless workbooks are read by several threads at once (see WorkbookExecutor). The lazily
+        # built state above is built under these locks, once per sheet, by the first reader needing it.
+        self._lock = threading.RLock()
+        self._sheet_locks: dict[str, threading.RLock] = {}
+        self._restore_structure()
+
+    @classmethod
+    def open_headless(cls, file_path: str, sheet_cache: SheetCache = None) -> "ExcelAutomation":
+        """Open an .xlsx file for reading without a running Excel instance."""
+        return cls(backend=XlsxFileBackend(file_path), sheet_cache=sheet_cache)
+
+    def _cache_path(self) -> Optional[str]:
+        """Path keying the workbook in the sheet cache, None while the cache cannot be used."""
+        if self.sheet_cache is None or self.version:
+            return None
+        path = self.backend.workbook_path()
+        return path if path and not self.backend.has_unsaved_changes() else None
+
+    def _restore_structure(self) -> None:
+        path = self._cache_path()
+        structure = self.sheet_cache.load_structure(path) if path else None
+        if structure is None:
+            return
+        self._sheet_names = structure['Sheets']
+        self._named_ranges = {scope: infos for scope, infos in structure['Named Ranges']}
+        self._sheet_structure = structure['Sheet Info']
+        self._structure_cached = True
+        logging.debug(f"Restored structure of '{path}' from the sheet cache")
+
+    def _store_structure(self) -> None:
+        path = self._cache_path()
+        with self._lock:
+            if path is None or self._structure_cached:
+                return
+            structure = {
+                'Sheets': self._sheet_names,
+                'Named Ranges': list(self._named_ranges.items()),
+                'Sheet Info': self._sheet_structure,
+            }
+            try:
+                self.sheet_cache.save_structure(path, structure)
+                self._structure_cached = True
+            except OSError as e:
+                logging.warning(f"Failed to save the structure of '{path}' to the sheet cache: {e}")
+
+    def _sheet_lock(self, sheet_name: str) -> threading.RLock:
+        """Lock under which the snapshot, structure and indexes of a sheet are built."""
+        with self._lock:
+            lock = self._sheet_locks.get(sheet_name)
+            if lock is None:
+                lock = self._sheet_locks[sheet_name] = threading.RLock()
+            return lock
+
+    def _cached_snapshot(self, sheet_name: str) -> Optional[SheetSnapshot]:
+        """The current snapshot of a sheet, from memory or from the sheet cache, None if neither has it."""
+        snapshot = self._snapshots.get(sheet_name)
+        if snapshot is not None and snapshot.revision == self.revision:
+            return snapshot
+        path = self._cache_path()
+        snapshot = self.sheet_cache.load_snapshot(path, sheet_name, self.revision) if path else None
+        if snapshot is not None:
+            self._snapshots[sheet_name] = snapshot
+        return snapshot
 
     def list_open_workbooks(self) -> list[str]:
-        return [wb.fullname for wb in self.app.books]
+        return self.backend.list_open_workbooks()
 
     def save(self, file_path: str = None) -> None:
+        self.flush()
+        self.backend.save(file_path)
         if file_path:
-            self.wb.save(file_path)
-        else:
-            self.wb.save()
+            self.version += 1
 
     def close(self) -> None:
-        self.wb.close()
-        self.app.quit()
+        if self._write_buffer.has_pending():
+            logging.warning(f"Closing workbook with {len(self._write_buffer)} buffered writes that were not saved")
+        self.backend.close()
 
     def list_sheets(self) -> list[str]:
-        return [sheet.tool_name for sheet in self.wb.sheets]
+        with self._lock:
+            if self._sheet_names is None:
+                self._sheet_names = self.backend.list_sheets()
+            return list(self._sheet_names)
 
     def add_sheet(self, sheet_name: str) -> None:
-        self.wb.sheets.add(sheet_name)
+        self.flush()
+        self.backend.add_sheet(sheet_name)
+        self._clear_structure()
+        self._bump_revision()
 
     def remove_sheet(self, sheet_name: str) -> None:
-        sheet = self.wb.sheets[sheet_name]
-        sheet.delete()
+        self.flush()
+        self.backend.remove_sheet(sheet_name)
+        self._value_index.drop_sheet(sheet_name)
+        self._clear_structure()
+        self._bump_revision()
+
+    def _bump_revision(self) -> None:
+        """Record a change to the workbook; cached sheet snapshots are re-read on next use."""
+        self.revision += 1
+        self.version += 1
+        self._snapshots.clear()
+
+    def invalidate_snapshots(self) -> None:
+        """
+        Discard all cached sheet data (snapshots and value index).
+        Call this if the workbook was changed outside of this instance (e.g. edited in Excel).
+        """
+        self._bump_revision()
+        self._value_index.clear()
+        self._clear_structure()
+
+    def _clear_structure(self) -> None:
+        self._sheet_names = None
+        self._named_ranges = None
+        self._tables = None
+        self._sheet_structure.clear()
+
+    def _sheet_changed(self, sheet_name: str) -> None:
+        """Drop the cached structure of a sheet that was written, its extent may have changed."""
+        self._sheet_structure.pop(sheet_name, None)
+
+    def get_snapshot(self, sheet_name: str) -> SheetSnapshot:
+        """Return the snapshot of a sheet for the current revision, reading it in bulk if needed."""
+        with self._sheet_lock(sheet_name):
+            snapshot = self._cached_snapshot(sheet_name)
+            if snapshot is None:
+                if self._write_buffer.has_pending(sheet_name):
+                    # The snapshot could not hold the buffered writes; send them before re-reading
+                    self.flush()
+                bounds = self._default_bounds(sheet_name)
+                logging.debug(f"Loading snapshot of sheet '{sheet_name}' at revision {self.revision}")
+                snapshot = SheetSnapshot.load(self.backend, sheet_name, self.revision, bounds)
+                self._snapshots[sheet_name] = snapshot
+                path = self._cache_path()
+                if path:
+                    try:
+                        self.sheet_cache.save_snapshot(path, snapshot)
+                    except OSError as e:
+                        logging.warning(f"Failed to save sheet '{sheet_name}' to the sheet cache: {e}")
+            return snapshot
 
     def read_cell(self, sheet_name: str, cell: str) -> any:
-        sheet = self.wb.sheets[sheet_name]
-        return sheet.range(cell).value
+        row, col = parse_cell(cell)
+        return self.get_snapshot(sheet_name).value(row, column_letters(col))
 
     def query_cell(self, sheet_name:str, cell:str) ->dict:
         """Retrieve the value and formula of a specific cell."""
-        sheet = self.wb.sheets[sheet_name]
-        value = sheet.range(cell).value
-        formula = sheet.range(cell).formula
-        visible_text = sheet.range(cell).api.Text
-        return {'Value': value, 'Formula': formula, 'VisibleText': visible_text}
+        return next(iter(self.query_cells(sheet_name, [cell]).values()))
 
-    def get_range_as_markdown(self, sheet_name: str, cell_range: str=None) -> str:
-        df = self.get_range_as_dataframe(sheet_name, cell_range)
+    def query_cells(self, sheet_name: str, cells: list[str], max_cells: int = 1000) -> dict[str, dict]:
+        """
+        Retrieve value, formula and visible text of many cells at once.
 
-        return df.to_markdown(index=True)
+        Values and formulas come from the sheet snapshot (one bulk read of the data range);
+        visible text is read in a single batch for the cells not seen before.
+
+        :param sheet_name: The name of the sheet.
+        :param cells: Cell addresses or ranges, e.g. ["B7", "D5:F5"].
+        :param max_cells: Maximum number of cells returned, ranges are expanded cell by cell.
+        :return: A dictionary mapping each cell address (e.g. "D5") to
+                 {'Value', 'Formula', 'VisibleText'}, in the order requested.
+        """
+        logging.debug(f"Querying cells {cells} in sheet '{sheet_name}'")
+        if isinstance(cells, str):
+            cells = [cells]
+
+        keys = []
+        for reference in cells:
+            cell_range = parse_range(reference)
+            if len(keys) + cell_range.size > max_cells:
+                raise ValueError(f"Too many cells requested (more than {max_cells}). "
+                                 f"Query smaller ranges or read the range as markdown instead.")
+            letters = cell_range.column_letters()
+            keys += [(row, column) for row in range(cell_range.first_row, cell_range.last_row + 1)
+                     for column in letters]
+        keys = list(dict.fromkeys(keys))
+
+        snapshot = self.get_snapshot(sheet_name)
+        texts = snapshot.visible_texts(self.backend, keys)
+        return {
+            f"{column}{row}": {
+                'Value': snapshot.value(row, column),
+                'Formula': snapshot.formula(row, column),
+                'VisibleText': text,
+            }
+            for (row, column), text in zip(keys, texts)
+        }
+
+    def get_range_as_markdown(self, sheet_name: str, cell_range: str = None,
+                              max_tokens: Optional[int] = DEFAULT_MAX_TOKENS) -> str:
+        """
+        Render a range as a Markdown table, limited to the leading rows that fit in max_tokens
+        like a page of get_range_page, which also returns the cursor to the following rows.
+        A table cut short ends with a line naming the range of the rows left out.
+
+        :param max_tokens: Budget of the table in estimated tokens, None to render the whole range
+                           whatever its size.
+        """
+        if max_tokens is None:
+            return self.get_range_as_dataframe(sheet_name, cell_range).to_markdown(index=True)
+        page = self.get_range_page(sheet_name, cell_range, max_tokens)
+        if page['Error']:
+            raise ValueError(page['Error'])
+        if page['NextCursor']:
+            return f"{page['Content']}\n\n(Rows {page['NextCursor']} not shown)"
+        return page['Content']
 
     def get_range_as_dataframe(self, sheet_name, cell_range=None):
         """
@@ -72,131 +292,456 @@ class ExcelAutomation:
         """
         logging.debug(f"Getting range as DataFrame for sheet: {sheet_name}, cell_range: {cell_range}")
 
-        sheet = self.wb.sheets[sheet_name]
+        blocks = list(self.iter_range_as_dataframes(sheet_name, cell_range))
+        if not blocks:
+            return pd.DataFrame()  # Empty range => empty DataFrame
+
+        return pd.concat(blocks) if len(blocks) > 1 else blocks[0]
+
+    def get_range_page(self, sheet_name: str, cell_range: str = None, max_tokens: int = DEFAULT_MAX_TOKENS,
+                       compact: bool = False) -> dict:
+        """
+        Render the leading rows of a range that fit in a token budget, and a cursor to the rest.
+
+        :param sheet_name: The name of the sheet.
+        :param cell_range: (optional) The range to render. Defaults to the data range.
+        :param max_tokens: Budget of the rendered page, in estimated tokens.
+        :param compact: If True, render CSV lines with runs of empty rows and columns elided (see
+                        RangePager.render_compact) instead of a Markdown table.
+        :return: A dictionary with:
+                 - 'Error': An error message (empty string if no error).
+                 - 'Content': The rendered page.
+                 - 'PageRange': The range covered by the page.
+                 - 'NextCursor': The range holding the remaining rows, to pass as cell_range
+                   for the next page (empty string on the last page).
+        """
+        try:
+            bounds = self._range_bounds(sheet_name, cell_range)
+        except ValueError as e:
+            return {'Error': str(e), 'Content': '', 'PageRange': '', 'NextCursor': ''}
+
+        # The first read is sized from the budget, a page rarely needs more than one
+        blocks = self.iter_range_as_dataframes(sheet_name, bounds.address(False),
+                                               first_window_cells(max_tokens, bounds.columns))
+        content, last_row, next_row = take_page(blocks, max_tokens, compact)
+        page_range = CellRange(bounds.first_row, bounds.first_col, last_row, bounds.last_col) \
+            if last_row is not None else None
+        next_range = CellRange(next_row, bounds.first_col, bounds.last_row, bounds.last_col) \
+            if next_row is not None else None
+        logging.debug(f"Rendered page {page_range} of sheet '{sheet_name}', next page {next_range}")
+        return {
+            'Error': '',
+            'Content': content,
+            'PageRange': page_range.address(False) if page_range else '',
+            'NextCursor': next_range.address(False) if next_range else '',
+        }
 
-        # If cell_range is empty or blank, treat it as None
+    def _range_bounds(self, sheet_name: str, cell_range: str = None) -> CellRange:
+        """Parse a range of a sheet, defaulting to the data range when cell_range is empty."""
+        default_bounds = self._default_bounds(sheet_name)
+        # If cell_range is empty or blank, default to the range holding the data.
         if not cell_range or cell_range.strip() == "":
-            cell_range = None
+            return default_bounds
+        return parse_range(cell_range, default_bounds)
+
+    def _sheet_info(self, sheet_name: str) -> dict:
+        """Cached structure entry of a sheet, starting with its used range."""
+        with self._sheet_lock(sheet_name):
+            sheet_info = self._sheet_structure.get(sheet_name)
+            if sheet_info is None:
+                address, row_count, col_count = self.backend.used_range(sheet_name)
+                sheet_info = {'Rows': row_count, 'Columns': col_count, 'Range': address}
+                self._sheet_structure[sheet_name] = sheet_info
+            return sheet_info
+
+    def get_data_range(self, sheet_name: str) -> str:
+        """
+        Return the address of the smallest range holding every non-empty cell of a sheet, or an
+        empty string if the sheet is empty. The used range reported by Excel also covers cells
+        that are only formatted, and can reach far beyond the data.
+        """
+        # Buffered writes to the sheet must reach the workbook before its extent is read
+        if self._write_buffer.has_pending(sheet_name):
+            self.flush()
+        with self._sheet_lock(sheet_name):
+            sheet_info = self._sheet_info(sheet_name)
+            if 'Data Range' not in sheet_info:
+                sheet_info['Data Range'] = self.backend.data_range(sheet_name) or ''
+            return sheet_info['Data Range']
+
+    def _default_bounds(self, sheet_name: str) -> CellRange:
+        """Extent read when no range is given: the data range, or the used range of an empty sheet."""
+        data_range = self.get_data_range(sheet_name)
+        return parse_range(data_range or self._sheet_info(sheet_name)['Range'])
+
+    def get_data_regions(self, sheet_name: str) -> list[str]:
+        """
+        Return the separate blocks of data of a sheet (typically one per table), largest first.
+        A block is a group of non-empty cells touching each other, found by scanning the data
+        range in row windows (see DataRegions.RegionDetector).
 
-        # If no specific range is given, default to entire used range.
-        if cell_range is None:
-            cell_range = sheet.used_range.address
-            range = sheet.range(cell_range)
-        else:
-            range = sheet.range(cell_range)
+        :return: The address of each block, e.g. ["B6:AE14", "B2:B4"].
+        """
+        data_range = self.get_data_range(sheet_name)
+        with self._sheet_lock(sheet_name):
+            sheet_info = self._sheet_info(sheet_name)
+            if 'Data Regions' not in sheet_info:
+                regions = []
+                if data_range:
+                    snapshot = self._snapshots.get(sheet_name)
+                    if snapshot is not None and snapshot.revision == self.revision:
+                        detector = RegionDetector()
+                        detector.add_mask(snapshot.store.occupied(), snapshot.first_row, snapshot.first_col)
+                    else:
+                        detector = detect_regions(self.iter_range_blocks(sheet_name, data_range))
+                    regions = [region.address(False) for region in detector.regions()]
+                logging.debug(f"Found {len(regions)} data regions in sheet '{sheet_name}'")
+                sheet_info['Data Regions'] = regions
+            return list(sheet_info['Data Regions'])
+
+    def iter_range_blocks(self, sheet_name: str, cell_range: str = None,
+                          chunk_cells: int = CHUNK_CELLS) -> Iterator[RangeData]:
+        """
+        Read a range as a stream of row blocks, so memory stays bounded however large the range is.
+        The block height adapts to the backend (see RangeReader.read_in_windows).
 
-        df = self.get_dataframe_with_excel_headers_impl(sheet,range)
+        :param sheet_name: The name of the sheet.
+        :param cell_range: (optional) The range to read. Defaults to the data range.
+        :param chunk_cells: Cells of the first block, later blocks grow while reads are fast.
+        """
+        # Buffered writes must reach the workbook before reading it directly
+        self.flush()
 
-        return df
+        bounds = self._range_bounds(sheet_name, cell_range)
+        yield from read_in_windows(bounds, lambda window: self.backend.read_range(sheet_name, window.address(False)),
+                                   chunk_cells)
+
+    def iter_range_as_dataframes(self, sheet_name: str, cell_range: str = None,
+                                 chunk_cells: int = CHUNK_CELLS) -> Iterator[pd.DataFrame]:
+        """
+        Like get_range_as_dataframe, but yields the range as a sequence of row-block DataFrames.
+        Each block has the Excel column letters as columns, a 'RowNumber' column, and an index
+        continuing from the previous block.
+        """
+        offset = 0
+        for range_data in self.iter_range_blocks(sheet_name, cell_range, chunk_cells):
+            df = self.get_dataframe_with_excel_headers_impl(range_data)
+            if df.empty:
+                continue
+            df.index = pd.RangeIndex(offset, offset + len(df))
+            offset += len(df)
+            yield df
+
+    def export_range_to_csv(self, sheet_name: str, output_path: str, cell_range: str = None,
+                            excel_headers: bool = False) -> int:
+        """
+        Export a range (the data range by default) to a CSV file, streaming it block by block.
+
+        :param excel_headers: If True, write the Excel column letters as a header row and
+                              a leading 'RowNumber' column. Only the cell values are written otherwise.
+        :return: The number of rows written.
+        """
+        row_count = 0
+        with open(output_path, "w", newline="", encoding="utf-8") as csv_file:
+            for df in self.iter_range_as_dataframes(sheet_name, cell_range):
+                if not excel_headers:
+                    df = df.drop(columns="RowNumber")
+                df.to_csv(csv_file, index=False, header=excel_headers and row_count == 0)
+                row_count += len(df)
+        logging.debug(f"Exported {row_count} rows of sheet '{sheet_name}' to '{output_path}'")
+        return row_count
 
     def write_cell(self, sheet_name: str, cell: str, value: any) -> None:
-        sheet = self.wb.sheets[sheet_name]
-        sheet.range(cell).value = value
+        if self.write_behind and not (isinstance(value, str) and value.startswith('=')):
+            target = parse_range(cell)
+            if target.size <= self.max_pending_writes:
+                self._buffer_write(sheet_name, target, [[value] * target.columns for _ in range(target.rows)])
+                return
+
+        # Formulas are written directly so their results can be read back
+        self.flush()
+        self.backend.write_cell(sheet_name, cell, value)
+        self._sheet_changed(sheet_name)
+        self._value_index.cell_written(sheet_name, cell, value)
+        # Formulas on any sheet may depend on the cell, so every snapshot is stale
+        self._value_index.drop_formula_sheets()
+        self._bump_revision()
+
+    def _buffer_write(self, sheet_name: str, target: CellRange, values: list[list]) -> None:
+        """Record a write in the write-behind buffer and overlay it on the cached snapshot."""
+        snapshot = self._snapshots.get(sheet_name)
+        letters = target.column_letters()
+        overlay = snapshot is not None and snapshot.revision == self.revision and all(
+            snapshot.contains(row, column) for row in (target.first_row, target.last_row)
+            for column in (letters[0], letters[-1]))
+
+        for row_offset, row_values in enumerate(values):
+            row = target.first_row + row_offset
+            for col_offset, value in enumerate(row_values):
+                self._write_buffer.add(sheet_name, row, target.first_col + col_offset, value)
+                if overlay:
+                    snapshot.set_value(row, letters[col_offset], value)
+        if not overlay:
+            # The written cells extend the data range; the sheet is re-read after a flush
+            self._snapshots.pop(sheet_name, None)
+
+        # Formula results are refreshed when the buffer is flushed
+        self._value_index.range_written(sheet_name, target, values)
+        self.version += 1
+
+        if len(self._write_buffer) >= self.max_pending_writes or \
+                self._write_buffer.age() >= self.max_pending_seconds:
+            self.flush()
+
+    def flush(self) -> None:
+        """Send buffered writes to the workbook, coalesced into rectangular range writes."""
+        if not self._write_buffer.has_pending():
+            return
+        block_count = 0
+        with self.backend.suspend_updates():
+            for sheet_name in self._write_buffer.sheets():
+                for target, values in self._write_buffer.blocks(sheet_name):
+                    self.backend.write_range(sheet_name, cell_address(target.first_row, target.first_col), values)
+                    block_count += 1
+                self._sheet_changed(sheet_name)
+        logging.debug(f"Flushed {len(self._write_buffer)} buffered cell writes as {block_count} range writes")
+        self._write_buffer.clear()
+
+        self._value_index.drop_formula_sheets()
+        self._bump_revision()
+
+    def write_range(self, sheet_name: str, top_left_cell: str, values: list[list]) -> None:
+        """
+        Write a 2D list of values in one call, with its top-left corner at the given cell.
+        Calculation, screen updating and events are suspended during the write and the
+        workbook is recalculated once afterwards.
+
+        :param sheet_name: The name of the sheet.
+        :param top_left_cell: The cell receiving values[0][0], e.g. "B7".
+        :param values: Rows of values. A flat list is written as a single row.
+        """
+        if values and not isinstance(values[0], (list, tuple)):
+            values = [values]
+        values = [list(row) for row in values]
+        if not values or not values[0]:
+            return
+        if any(len(row) != len(values[0]) for row in values):
+            raise ValueError("All rows must have the same number of values.")
+
+        top_left = parse_range(top_left_cell)
+        target = top_left.resize(len(values), len(values[0]))
+        logging.debug(f"Writing {target.rows}x{target.columns} values to '{sheet_name}'!{target.address(False)}")
+
+        # Keep writes in order: buffered cells go first
+        self.flush()
+        with self.backend.suspend_updates():
+            self.backend.write_range(sheet_name, top_left.address(False), values)
+        self._sheet_changed(sheet_name)
+        self._value_index.range_written(sheet_name, target, values)
+        self._value_index.drop_formula_sheets()
+        self._bump_revision()
+
+    def write_dataframe(self, sheet_name: str, top_left_cell: str, df: pd.DataFrame, header: bool = True,
+                        index: bool = False) -> None:
+        """
+        Write a DataFrame in one call, with its top-left corner at the given cell.
+
+        :param header: Write the column names as the first row.
+        :param index: Write the index as the first column.
+        """
+        if index:
+            df = df.reset_index()
+        # Missing values (NaN / NaT) are written as empty cells
+        values = df.astype(object).where(df.notna(), None).values.tolist()
+        if header:
+            values.insert(0, [str(column) for column in df.columns])
+        self.write_range(sheet_name, top_left_cell, values)
 
     def list_named_ranges(self) -> dict[str, str]:
-        return {name.tool_name: name.refers_to_range.address for name in self.wb.names}
+        return {name['Name']: name['Refers To'] for names in self._named_ranges_by_sheet().values()
+                for name in names}
+
+    def _named_ranges_by_sheet(self) -> dict:
+        with self._lock:
+            if self._named_ranges is None:
+                self._named_ranges = self.backend.named_ranges_by_sheet()
+            return self._named_ranges
+
+    def _table_definitions(self) -> dict[str, TableDefinition]:
+        """The workbook's tables by case-folded name, to resolve structured references."""
+        with self._lock:
+            if self._tables is None:
+                self._tables = {info['Name'].casefold(): TableDefinition.from_info(info)
+                                for info in self.backend.list_tables()}
+            return self._tables
 
     def capture_screenshot_png(self, sheet_name: str, output_path: str, cell_range: str = None) -> bool:
+        self.flush()
         try:
-            #cell_range = None
-            sheet = self.wb.sheets[sheet_name]
             if not cell_range:
-                cell_range = sheet.used_range.address
-            sheet.range(cell_range).api.Show()
-            sheet.range(cell_range).to_png(output_path)
-            return True
-        except Exception as e:
-            print(f"Failed to capture screenshot: {e}")
+                # Render the cells holding data rather than the whole used range
+                cell_range = self._default_bounds(sheet_name).address(False)
+            return self.backend.capture_screenshot_png(sheet_name, output_path, cell_range)
+        except Exception:
+            logging.exception(f"Failed to capture screenshot of sheet '{sheet_name}'")
             return False
 
-    def get_dataframe_with_excel_headers_impl(self, sheet: xw.Sheet, cell_range:xw.Range):
+    def capture_screenshot(self, sheet_name: str, cell_range: str = None) -> Optional[Image.Image]:
+        """Like capture_screenshot_png, returning the image in memory instead of writing a file; None on failure."""
+        self.flush()
+        try:
+            if not cell_range:
+                cell_range = self._default_bounds(sheet_name).address(False)
+            try:
+                return self.backend.capture_screenshot(sheet_name, cell_range)
+            except Exception as e:
+                # e.g. Excel is not visible or the clipboard is unavailable: draw the range instead
+                logging.warning(f"Failed to capture screenshot, rendering the range instead: {e}")
+                return self.backend.render_range(sheet_name, cell_range)
+        except Exception:
+            logging.exception(f"Failed to capture screenshot of sheet '{sheet_name}'")
+            return None
+
+    def capture_screenshots(self, sheet_name: str, cell_ranges: list[str]) -> list[Optional[Image.Image]]:
+        """capture_screenshot of several ranges of a sheet in one call."""
+        return [self.capture_screenshot(sheet_name, cell_range) for cell_range in cell_ranges]
+
+    def screenshot_tiles(self, sheet_name: str, cell_range: str = None, max_rows: int = TILE_ROWS,
+                         max_columns: int = TILE_COLUMNS, overlap: int = TILE_OVERLAP) -> list[str]:
         """
-        Returns a DataFrame from the given xlwings sheet and cell_range.
+        Split a range (the range holding data by default) into overlapping tiles small enough
+        to stay legible in a screenshot; see split_into_tiles.
+        """
+        bounds = self._range_bounds(sheet_name, cell_range)
+        return [tile.address(False) for tile in split_into_tiles(bounds, max_rows, max_columns, overlap)]
+
+    def get_dataframe_with_excel_headers_impl(self, range_data: RangeData):
+        """
+        Returns a DataFrame from the values read by the backend.
         The columns of the DataFrame are the actual Excel column letters
         (e.g. I, J, K, ... AH). A 'RowNumber' column is added to reflect
         actual Excel row indices.
 
-        :param sheet: An xlwings Sheet object.
-        :param cell_range: A string like 'I3:AH10', or any valid Excel range.
+        :param range_data: RangeData returned by ExcelBackend.read_range.
         :return: pandas DataFrame
         """
-        # TO-DO: Remove this var and use cell_range directly
-        rng:xw.Range = cell_range  # e.g. "I3:AH10"
-
         # Read the raw 2D list of values
-        data_2d = rng.value
+        data_2d = range_data.values
         if not data_2d:
             return pd.DataFrame()  # Empty range => empty DataFrame
 
-        # Dimensions: number of rows/columns in the 2D data
-        row_count = rng.rows.count
-        col_count = rng.columns.count
-
-        # Excel's top-left row/col for the specified range
-        start_row = rng.row
-        start_col = rng.column
-
-        # 1) Build column labels from the top row of each column's address
-        #    For column c in [0..col_count-1], we parse e.g. "$I$3" -> "I".
-        columns_letters = []
-        for c_offset in range(col_count):
-            col_address = sheet.range((start_row, start_col + c_offset)).address
-            # col_address might look like "$I$3" => extract just the letters
-            letters = ''.join(ch for ch in col_address if ch.isalpha())
-            columns_letters.append(letters)
-
-        # 2) Build the 'RowNumber' list from start_row -> (start_row + row_count - 1)
-        row_numbers = list(range(start_row, start_row + row_count))
+        # Build the 'RowNumber' list from the first row of the range
+        start_row = range_data.first_row
+        row_numbers = list(range(start_row, start_row + len(data_2d)))
 
-        # 3) Create the DataFrame
-        df = pd.DataFrame(data_2d, columns=columns_letters)
+        # Create the DataFrame, columns are the Excel column letters
+        df = pd.DataFrame(data_2d, columns=range_data.columns)
 
-        # 4) Insert 'RowNumber' at the beginning
+        # Insert 'RowNumber' at the beginning
         df.insert(0, "RowNumber", row_numbers)
 
         return df
 
-    def find_all_cells_by_value(self, value: str, sheet_name: str = None, search_whole_workbook: bool = False):
+    def find_all_cells_by_value(self, value: str, sheet_name: str = None, search_whole_workbook: bool = False,
+                                match_mode: str = 'exact'):
+        """
+        Find cells by value in a sheet (the active sheet if not provided) or in the whole workbook.
+
+        :param match_mode: 'exact' (default), 'contains', 'wildcard' (Excel-style * and ?) or 'regex'.
+        :return: A list of (sheet name, column letters, row) tuples.
+        """
         logging.debug(
-            f"Searching for cells with value '{value}' in sheet '{sheet_name}' (search whole workbook: {search_whole_workbook})")
+            f"Searching for cells with value '{value}' in sheet '{sheet_name}' (search whole workbook: {search_whole_workbook}, match mode: {match_mode})")
         # If search_whole_workbook is True, search all sheets
         if search_whole_workbook:
             found_cells = []
-            for sheet in self.wb.sheets:
-                found_cells += self.find_all_cells_in_sheet(sheet, value)
+            for sheet in self.list_sheets():
+                found_cells += self.find_all_cells_in_sheet(sheet, value, match_mode)
             return found_cells
 
-        # If sheet_name is provided, search within that sheet
-        if sheet_name:
-            sheet = self.wb.sheets[sheet_name]
-        else:
-            # Use the active sheet if no sheet_name is provided
-            sheet = self.wb.sheets.active
-
-        return self.find_all_cells_in_sheet(sheet, value)
+        # Use the active sheet if no sheet_name is provided
+        if not sheet_name:
+            sheet_name = self.backend.active_sheet_name()
 
-    def find_all_cells_in_sheet(self, sheet, value: str) -> list[tuple[str, str, int]]:
-        logging.debug(f"Searching for value '{value}' in sheet '{sheet.name}'")
+        return self.find_all_cells_in_sheet(sheet_name, value, match_mode)
 
-        search_range = sheet.used_range
+    def _index_sheet(self, sheet_name: str) -> None:
+        """
+        Build the value index of a sheet, from its snapshot if one is cached, otherwise
+        from a stream of row blocks that is not kept in memory.
+        With a sheet cache, the snapshot is read instead, so the next session starts from it.
+        """
+        snapshot = self._cached_snapshot(sheet_name)
+        if snapshot is None and self._cache_path():
+            snapshot = self.get_snapshot(sheet_name)
+        if snapshot is not None:
+            self._value_index.index_store(sheet_name, snapshot.store, snapshot.has_formulas())
+        else:
+            blocks = self.iter_range_blocks(sheet_name)
+            self._value_index.index_sheet(sheet_name, blocks, self.backend.has_formulas(sheet_name))
 
-        # Get DataFrame from the specified range
-        df = self.get_dataframe_with_excel_headers_impl(sheet, search_range)
+    def find_all_cells_in_sheet(self, sheet_name: str, value: str, match_mode: str = 'exact') -> list[tuple[str, str, int]]:
+        """
+        Find the cells of a sheet holding the value. Matching ignores case and surrounding
+        whitespace, and treats numbers and their text form (2023 / "2023") as equal.
 
-        # Find all cells with the specified value
-        found_cells = df[df.isin([value])].stack().index.tolist()
+        :param match_mode: 'exact' (default), 'contains', 'wildcard' (Excel-style * and ?) or 'regex'.
+        :return: A list of (sheet name, column letters, row) tuples.
+        """
+        logging.debug(f"Searching for value '{value}' in sheet '{sheet_name}' (match mode: {match_mode})")
+        if match_mode not in MATCH_MODES:
+            raise ValueError(f"Unsupported match mode '{match_mode}', expected one of {MATCH_MODES}")
 
-        # Convert the DataFrame index to Excel row and column indices
-        found_cells = [(sheet.name, df.columns.get_loc(col) + 1, int(df.at[row, 'RowNumber'])) for row, col in
-                       found_cells]
+        # Index the sheet on first search
+        with self._sheet_lock(sheet_name):
+            if not self._value_index.is_indexed(sheet_name):
+                self._index_sheet(sheet_name)
 
-        # Convert column indices to Excel column letters
-        found_cells = [(sheet_name, df.columns[col - 1], row) for sheet_name, col, row in found_cells]
+        if match_mode == 'exact':
+            found_cells = self._value_index.lookup(sheet_name, value)
+        else:
+            found_cells = self._value_index.search(sheet_name, value, match_mode)
 
-        logging.debug(f"Found {len(found_cells)} cells with value '{value}' in sheet '{sheet.name}'")
+        logging.debug(f"Found {len(found_cells)} cells with value '{value}' in sheet '{sheet_name}'")
         return found_cells
 
-    #def find_all_cells_by_formula(self, formula: str, sheet_name: str = None, search_whole_workbook: bool = False):
+    def find_all_cells_by_formula(self, formula: str, sheet_name: str = None,
+                                  search_whole_workbook: bool = False) -> list[tuple[str, str, int, str]]:
+        """
+        Find the cells whose formula calls functions or references ranges, in a sheet (the active
+        sheet if not provided) or in the whole workbook.
+
+        :param formula: Function names and references the formulas must all have, e.g. "VLOOKUP",
+                        "Expenses!B:B" (any reference overlapping column B of Expenses) or
+                        "SUMIFS 'Cost of sales'!D7:D25". A sheet name alone finds the formulas referencing
+                        that sheet, and references without a sheet refer to the sheet of the formula.
+                        Table names and structured references ("Revenue", "Revenue[JAN]") stand for
+                        the table's range, so they also find references to it by address.
+                        A query starting with '=' finds the formulas containing it as text instead.
+        :return: A list of (sheet name, column letters, row, formula) tuples.
+        """
+        logging.debug(
+            f"Searching for cells with formula '{formula}' in sheet '{sheet_name}' (search whole workbook: {search_whole_workbook})")
+        query = FormulaQuery.parse(formula, self.list_sheets(), self._table_definitions())
+        if search_whole_workbook:
+            found_cells = []
+            for sheet in self.list_sheets():
+                found_cells += self._find_formula_cells(sheet, query)
+            return found_cells
+
+        if not sheet_name:
+            sheet_name = self.backend.active_sheet_name()
+        return self._find_formula_cells(sheet_name, query)
+
+    def _find_formula_cells(self, sheet_name: str, query: FormulaQuery) -> list[tuple[str, str, int, str]]:
+        """Cells of a sheet with a formula matching the query, from the formula index of its snapshot."""
+        snapshot = self.get_snapshot(sheet_name)
+        rows, cols = snapshot.formula_index(self._table_definitions()).cells(query)
+        strings = snapshot.store.strings.strings
+        found_cells = [(sheet_name, snapshot.columns[col], snapshot.first_row + row,
+                        strings[snapshot.formula_codes[row, col]]) for row, col in zip(rows.tolist(), cols.tolist())]
+        logging.debug(f"Found {len(found_cells)} cells with a matching formula in sheet '{sheet_name}'")
+        return found_cells
 
     def find_metric_value(self, sheet_name: str, metric_name: str, time_period: str) -> dict:
         """
@@ -216,75 +761,100 @@ class ExcelAutomation:
                     - 'Column': The column where the time period was found.
         """
         logging.debug(f"Finding metric '{metric_name}' for time period '{time_period}' in sheet '{sheet_name}'")
+        return self.find_metric_values(sheet_name, [(metric_name, time_period)])[0]
 
-        # Get the sheet object
-        sheet = self.wb.sheets[sheet_name]
-
-        # Step 1: Find all occurrences of the metric in the sheet
-        logging.debug(f"Searching for metric '{metric_name}' in sheet '{sheet_name}'")
-        metric_cells = self.find_all_cells_in_sheet(sheet, metric_name)
-        if not metric_cells:
-            return {"Error": f"Metric '{metric_name}' not found in sheet '{sheet_name}'.", "Cells": []}
-
-        # Step 2: Find all occurrences of the time period in the sheet
-        logging.debug(f"Searching for time period '{time_period}' in sheet '{sheet_name}'")
-        time_period_cells = self.find_all_cells_in_sheet(sheet, time_period)
-        if not time_period_cells:
-            return {"Error": f"Time period '{time_period}' not found in sheet '{sheet_name}'.", "Cells": []}
+    def find_metric_values(self, sheet_name: str, lookups: list[tuple[str, str]]) -> list[dict]:
+        """
+        Batch version of find_metric_value: one result per (metric name, time period) pair.
 
+        Pairs are looked up in the label index of the sheet (see LabelIndex): its row labels and
+        header rows, including merged and multi-level headers, so "Revenue > Total" or "Q3 2023"
+        pick out one row or column among several. Pairs the index does not answer fall back to
+        matching every cell holding the metric with every cell holding the time period.
+        Visible texts of all the cells found are read in one backend call.
+        """
+        snapshot = self.get_snapshot(sheet_name)
+        label_index = snapshot.label_index()
+        matches = []
+        for metric_name, time_period in lookups:
+            cells = [(snapshot.first_row + row, snapshot.columns[col])
+                     for row, col in label_index.lookup(metric_name, time_period)]
+            cells = [cell for cell in cells if snapshot.value(*cell) is not None]
+            error = ""
+            if not cells:
+                cells, error = self._scan_metric_cells(snapshot, metric_name, time_period)
+            matches.append((cells, error))
+
+        texts = iter(snapshot.visible_texts(self.backend, [cell for cells, _ in matches for cell in cells]))
         results = []
+        for cells, error in matches:
+            results.append({
+                "Error": error,
+                "Cells": [{
+                    "Cell": f"{column}{row}",
+                    "Value": snapshot.value(row, column),
+                    "Formula": snapshot.formula(row, column),
+                    "VisibleText": next(texts),
+                    "Row": row,
+                    "Column": column
+                } for row, column in cells]
+            })
+        return results
 
-        # Step 3: Identify all intersection points (possible metric occurrences matching a time period)
-        logging.debug(f"Identifying intersection points for metric '{metric_name}' and time period '{time_period}'")
-        for metric_cell in metric_cells:
-            metric_row = metric_cell[2]  # Extract row number of metric
-
-            for time_cell in time_period_cells:
-                time_col = time_cell[1]  # Extract column letter of time period
-
-                # Construct the cell address where the metric value should be
-                value_cell = f"{time_col}{metric_row}"
-
-                # Retrieve value, formula, and visible text from the cell
-                cell_data = self.query_cell(sheet_name, value_cell)
-
-                # Store the result if it contains a value
-                if cell_data.get("Value") is not None:
-                    results.append({
-                        "Cell": value_cell,
-                        "Value": cell_data.get("Value"),
-                        "Formula": cell_data.get("Formula"),
-                        "VisibleText": cell_data.get("VisibleText"),
-                        "Row": metric_row,
-                        "Column": time_col
-                    })
-
-        # Return the structured result
-        return {
-            "Error": "" if results else f"No values found for '{metric_name}' in '{time_period}' in sheet '{sheet_name}'.",
-            "Cells": results
-        }
+    def _scan_metric_cells(self, snapshot: SheetSnapshot, metric_name: str, time_period: str) -> tuple[list, str]:
+        """
+        Cells at the intersection of any cell holding the metric with any cell holding the time
+        period that hold a value, and the error message if there are none.
+        """
+        sheet_name = snapshot.sheet_name
+        metric_cells = self.find_all_cells_in_sheet(sheet_name, metric_name)
+        if not metric_cells:
+            return [], f"Metric '{metric_name}' not found in sheet '{sheet_name}'."
+        time_period_cells = self.find_all_cells_in_sheet(sheet_name, time_period)
+        if not time_period_cells:
+            return [], f"Time period '{time_period}' not found in sheet '{sheet_name}'."
 
+        cells = [(metric_row, time_col) for _, _, metric_row in metric_cells for _, time_col, _ in time_period_cells
+                 if snapshot.value(metric_row, time_col) is not None]
+        if not cells:
+            return [], f"No values found for '{metric_name}' in '{time_period}' in sheet '{sheet_name}'."
+        return cells, ""
 
+    def workbook_identity(self) -> str:
+        """
+        Cheap key of the workbook's content, e.g. to key cached answers about it. While the workbook
+        matches its file, it is the file's path and its content hash kept by the sheet cache (size
+        and modification time without one), so it holds across sessions. Once changed, it is the path
+        and this instance's version, only valid within the session.
+        """
+        path = self.backend.workbook_path()
+        if path and not self.version and not self.backend.has_unsaved_changes():
+            path = os.path.abspath(path)
+            if self.sheet_cache is not None:
+                return f"{path}\0{self.sheet_cache.workbook_hash(path)}"
+            stat = os.stat(path)
+            return f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        return f"{path}\0{self.session}\0{self.version}"
 
     def get_structure(self):
-        """Return the structure of the workbook."""
+        """
+        Return the structure of the workbook.
+
+        Named ranges are resolved once for the whole workbook, and each sheet's used range and
+        data regions are kept until the sheet is written, so repeated calls only query sheets
+        that changed.
+        """
+        self.flush()
+        named_ranges = self._named_ranges_by_sheet()
         structure_info = []
-        for sheet in self.wb.sheets:
-            used_range = sheet.used_range
-            # Access all named ranges in the sheet
-            named_ranges = sheet.names
-            named_range_info = []
-            for name in named_ranges:
-                named_range_info.append({
-                    'Name': name.name,
-                    'Refers To': name.refers_to_range.address
-                })
+        for sheet_name in self.list_sheets():
+            data_regions = self.get_data_regions(sheet_name)
             structure_info.append({
-                'Sheet Name': sheet.name,
-                'Rows': used_range.rows.count,
-                'Columns': used_range.columns.count,
-                'Range': used_range.address,
-                'Named Ranges': named_range_info
+                'Sheet Name': sheet_name,
+                **self._sheet_info(sheet_name),
+                'Data Regions': data_regions,
+                # Named ranges scoped to the sheet
+                'Named Ranges': [dict(info) for info in named_ranges.get(sheet_name, [])]
             })
-        return structure_info
\ No newline at end of file
+        self._store_structure()
+        return structure_info
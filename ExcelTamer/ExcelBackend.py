@@ -0,0 +1,424 @@
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, nullcontext
+from typing import NamedTuple, Optional
+
+import numpy as np
+import xlwings as xw
+from PIL import Image, ImageGrab
+
+from ExcelTamer.CellAddress import CellRange, column_letters_range, parse_range, split_sheet
+from ExcelTamer.DataRegions import detect_regions
+from ExcelTamer.RangeReader import read_in_windows
+from ExcelTamer.RangeRenderer import (DEFAULT_COLUMN_WIDTH, DEFAULT_ROW_HEIGHT, DEFAULT_STYLE, RangeLayout,
+                                      default_renderer)
+
+
+class RangeData(NamedTuple):
+    """A rectangular block of cell values read from a sheet."""
+    values: list[list]
+    first_row: int
+    first_col: int
+    columns: list[str]
+
+
+def named_range_address(refers_to: str) -> Optional[str]:
+    """
+    Absolute address of the range a defined name refers to, e.g. "=Sheet1!$A$1:$B$3" -> "$A$1:$B$3".
+    None for names holding formulas, constants or broken (#REF!) references, which do not resolve to a range.
+    """
+    target_sheet, reference = split_sheet(refers_to.lstrip('='))
+    if target_sheet is None:
+        return None
+    try:
+        return parse_range(reference).address()
+    except ValueError:
+        return None
+
+
+class ExcelBackend:
+    """
+    Interface between ExcelAutomation and the workbook it operates on.
+
+    ExcelAutomation only talks to a workbook through these methods, so the same
+    search / metric / structure logic can run against a live Excel instance
+    (XlwingsBackend) or directly against an .xlsx file (XlsxFileBackend).
+    """
+
+    def list_open_workbooks(self) -> list[str]:
+        raise NotImplementedError
+
+    def workbook_path(self) -> Optional[str]:
+        """Path of the workbook's file, None if it has not been saved to a file."""
+        return None
+
+    def has_unsaved_changes(self) -> bool:
+        """Whether the open workbook differs from its file."""
+        return True
+
+    def save(self, file_path: str = None) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+    def list_sheets(self) -> list[str]:
+        raise NotImplementedError
+
+    def active_sheet_name(self) -> str:
+        raise NotImplementedError
+
+    def add_sheet(self, sheet_name: str) -> None:
+        raise NotImplementedError
+
+    def remove_sheet(self, sheet_name: str) -> None:
+        raise NotImplementedError
+
+    def used_range(self, sheet_name: str) -> tuple[str, int, int]:
+        """Return (address, row count, column count) of the used range of a sheet."""
+        raise NotImplementedError
+
+    def data_range(self, sheet_name: str) -> Optional[str]:
+        """
+        Return the address of the smallest range holding every non-empty cell of a sheet,
+        None if the sheet is empty. Unlike the used range, it is not inflated by formatted
+        but empty cells. The default implementation scans the used range in row windows.
+        """
+        bounds = parse_range(self.used_range(sheet_name)[0])
+        blocks = read_in_windows(bounds, lambda window: self.read_range(sheet_name, window.address(False)))
+        data_bounds = detect_regions(blocks).bounds
+        return data_bounds.address() if data_bounds else None
+
+    def read_range(self, sheet_name: str, cell_range: str = None) -> RangeData:
+        """
+        Read a range as a 2D list of values.
+
+        :param sheet_name: The name of the sheet.
+        :param cell_range: A range like 'I3:AH10'. The used range is read if not provided.
+        :return: RangeData with the values and the position of the top-left cell.
+        """
+        raise NotImplementedError
+
+    def read_formulas(self, sheet_name: str, cell_range: str) -> list[list[str]]:
+        """
+        Read the formulas of a range as a 2D list, like Range.Formula: '=...' for
+        formulas, the constant as text otherwise and '' for empty cells.
+        """
+        raise NotImplementedError
+
+    def has_formulas(self, sheet_name: str) -> bool:
+        """Return True if any cell of the sheet holds a formula."""
+        raise NotImplementedError
+
+    def cell_text(self, sheet_name: str, cell: str) -> str:
+        """Return the text displayed in a single cell."""
+        raise NotImplementedError
+
+    def cell_texts(self, sheet_name: str, cells: list[str]) -> list[str]:
+        """Return the text displayed in each of the given cells."""
+        return [self.cell_text(sheet_name, cell) for cell in cells]
+
+    def query_cell(self, sheet_name: str, cell: str) -> dict:
+        """Return {'Value', 'Formula', 'VisibleText'} for a single cell."""
+        raise NotImplementedError
+
+    def write_cell(self, sheet_name: str, cell: str, value: any) -> None:
+        raise NotImplementedError
+
+    def write_range(self, sheet_name: str, top_left_cell: str, values: list[list]) -> None:
+        """Write a 2D list of values with its top-left corner at the given cell."""
+        raise NotImplementedError
+
+    def suspend_updates(self):
+        """
+        Context manager suspending automatic calculation, screen updating and events
+        for the duration of a bulk operation. Does nothing by default.
+        """
+        return nullcontext()
+
+    def list_named_ranges(self, sheet_name: str = None) -> list[dict]:
+        """
+        Return the named ranges of the workbook as [{'Name', 'Refers To'}].
+        If sheet_name is provided, only names scoped to that sheet are returned.
+        """
+        raise NotImplementedError
+
+    def named_ranges_by_sheet(self) -> dict[Optional[str], list[dict]]:
+        """
+        Return all named ranges in one pass, grouped by the sheet they are scoped to
+        (None for workbook-level names), in the format of list_named_ranges.
+        """
+        named_ranges = {sheet_name: self.list_named_ranges(sheet_name) for sheet_name in self.list_sheets()}
+        scoped = {info['Name'] for infos in named_ranges.values() for info in infos}
+        named_ranges[None] = [info for info in self.list_named_ranges() if info['Name'] not in scoped]
+        return named_ranges
+
+    def list_tables(self) -> list[dict]:
+        """
+        Return the tables (list objects) of the workbook as [{'Name', 'Sheet', 'Range', 'Columns',
+        'Header Rows', 'Totals Rows'}], Range including the header and totals rows. No tables by default.
+        """
+        return []
+
+    def capture_screenshot_png(self, sheet_name: str, output_path: str, cell_range: str = None) -> bool:
+        raise NotImplementedError
+
+    def range_layout(self, sheet_name: str, cell_range: str) -> RangeLayout:
+        """
+        Values, display text and formatting of a range, as drawn by RangeRenderer.
+        By default every cell has the default style, width and height.
+        """
+        data = self.read_range(sheet_name, cell_range)
+        bounds = CellRange(data.first_row, data.first_col, data.first_row + len(data.values) - 1,
+                           data.first_col + len(data.columns) - 1)
+        cells = [(r, c) for r, row_values in enumerate(data.values) for c, value in enumerate(row_values)
+                 if value is not None]
+        texts = [[''] * bounds.columns for _ in range(bounds.rows)]
+        cell_texts = self.cell_texts(sheet_name, [f"{data.columns[c]}{data.first_row + r}" for r, c in cells])
+        for (r, c), text in zip(cells, cell_texts):
+            texts[r][c] = text
+        return RangeLayout(bounds, data.values, texts, np.zeros((bounds.rows, bounds.columns), dtype=np.int64),
+                           [DEFAULT_STYLE], np.full(bounds.columns, DEFAULT_COLUMN_WIDTH),
+                           np.full(bounds.rows, DEFAULT_ROW_HEIGHT))
+
+    def render_range(self, sheet_name: str, cell_range: str) -> Image.Image:
+        """Draw a range from its range_layout with RangeRenderer, without Excel."""
+        return default_renderer().render(self.range_layout(sheet_name, cell_range))
+
+    def capture_screenshot(self, sheet_name: str, cell_range: str = None) -> Image.Image:
+        """Render a range as an in-memory image. By default it goes through a temporary PNG file."""
+        fd, output_path = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+        try:
+            self.capture_screenshot_png(sheet_name, output_path, cell_range)
+            with Image.open(output_path) as image:
+                image.load()
+                return image
+        finally:
+            os.remove(output_path)
+
+
+# Range.Find arguments (XlFindLookIn, XlLookAt, XlSearchOrder, XlSearchDirection)
+XL_FORMULAS = -4123
+XL_PART = 2
+XL_BY_ROWS, XL_BY_COLUMNS = 1, 2
+XL_NEXT, XL_PREVIOUS = 1, 2
+# Range.CopyPicture arguments (XlPictureAppearance, XlCopyPictureFormat)
+XL_SCREEN = 1
+XL_BITMAP = 2
+# The clipboard may be held by another application for a moment
+CLIPBOARD_RETRIES = 10
+CLIPBOARD_RETRY_DELAY = 0.1
+
+
+class XlwingsBackend(ExcelBackend):
+    """Backend driving a running Excel instance through xlwings / COM."""
+
+    # Largest number of cells sent to Excel in one COM call when writing
+    MAX_CELLS_PER_WRITE = 250000
+
+    def __init__(self, file_path: str = None):
+        self.app = xw.apps.active if xw.apps else xw.App(visible=True)
+
+        if file_path:
+            self.wb = self.app.books.open(file_path)
+        else:
+            self.wb = self.app.books.active if self.app.books else self.app.books.add()
+
+    def list_open_workbooks(self) -> list[str]:
+        return [wb.fullname for wb in self.app.books]
+
+    def workbook_path(self) -> Optional[str]:
+        # FullName is only a file path once the workbook has been saved
+        path = self.wb.fullname
+        return path if os.path.isfile(path) else None
+
+    def has_unsaved_changes(self) -> bool:
+        return not self.wb.api.Saved
+
+    def save(self, file_path: str = None) -> None:
+        if file_path:
+            self.wb.save(file_path)
+        else:
+            self.wb.save()
+
+    def close(self) -> None:
+        self.wb.close()
+        self.app.quit()
+
+    def list_sheets(self) -> list[str]:
+        return [sheet.name for sheet in self.wb.sheets]
+
+    def active_sheet_name(self) -> str:
+        return self.wb.sheets.active.name
+
+    def add_sheet(self, sheet_name: str) -> None:
+        self.wb.sheets.add(sheet_name)
+
+    def remove_sheet(self, sheet_name: str) -> None:
+        sheet = self.wb.sheets[sheet_name]
+        sheet.delete()
+
+    def used_range(self, sheet_name: str) -> tuple[str, int, int]:
+        # Counts are derived from the address rather than read through two more COM calls each
+        address = self.wb.sheets[sheet_name].used_range.address
+        bounds = parse_range(address)
+        return address, bounds.rows, bounds.columns
+
+    def data_range(self, sheet_name: str) -> Optional[str]:
+        # Range.Find on formulas skips cells that are only formatted; four searches give the
+        # last and first row and column holding anything, without reading any values
+        cells = self.wb.sheets[sheet_name].used_range.api
+        first_cell = cells.Cells(1, 1)
+        last_cell = cells.Cells(cells.Rows.Count, cells.Columns.Count)
+
+        def find(order, direction, after):
+            return cells.Find(What="*", After=after, LookIn=XL_FORMULAS, LookAt=XL_PART,
+                              SearchOrder=order, SearchDirection=direction)
+
+        last_by_rows = find(XL_BY_ROWS, XL_PREVIOUS, first_cell)
+        if last_by_rows is None:
+            return None
+        last_by_columns = find(XL_BY_COLUMNS, XL_PREVIOUS, first_cell)
+        first_by_rows = find(XL_BY_ROWS, XL_NEXT, last_cell)
+        first_by_columns = find(XL_BY_COLUMNS, XL_NEXT, last_cell)
+        return CellRange(first_by_rows.Row, first_by_columns.Column,
+                         last_by_rows.Row, last_by_columns.Column).address()
+
+    def read_range(self, sheet_name: str, cell_range: str = None) -> RangeData:
+        sheet = self.wb.sheets[sheet_name]
+        rng: xw.Range = sheet.range(cell_range) if cell_range else sheet.used_range
+
+        # ndim=2 keeps single rows / columns / cells as a list of lists
+        data_2d = rng.options(ndim=2).value
+
+        start_row = rng.row
+        start_col = rng.column
+
+        # Column labels are computed locally rather than read from each column's address
+        columns_letters = column_letters_range(start_col, len(data_2d[0]) if data_2d else 0)
+
+        return RangeData(data_2d, start_row, start_col, columns_letters)
+
+    def read_formulas(self, sheet_name: str, cell_range: str) -> list[list[str]]:
+        formulas = self.wb.sheets[sheet_name].range(cell_range).formula
+        # A single cell comes back as a plain string
+        if isinstance(formulas, str):
+            return [[formulas]]
+        return [list(row) for row in formulas]
+
+    def has_formulas(self, sheet_name: str) -> bool:
+        # Range.HasFormula is None when the range mixes formulas and constants
+        return self.wb.sheets[sheet_name].used_range.api.HasFormula is not False
+
+    def cell_text(self, sheet_name: str, cell: str) -> str:
+        return self.wb.sheets[sheet_name].range(cell).api.Text
+
+    def cell_texts(self, sheet_name: str, cells: list[str]) -> list[str]:
+        # Range.Text has no multi-cell form, but the sheet object is resolved only once
+        sheet = self.wb.sheets[sheet_name]
+        return [sheet.range(cell).api.Text for cell in cells]
+
+    def query_cell(self, sheet_name: str, cell: str) -> dict:
+        sheet = self.wb.sheets[sheet_name]
+        value = sheet.range(cell).value
+        formula = sheet.range(cell).formula
+        visible_text = sheet.range(cell).api.Text
+        return {'Value': value, 'Formula': formula, 'VisibleText': visible_text}
+
+    def write_cell(self, sheet_name: str, cell: str, value: any) -> None:
+        sheet = self.wb.sheets[sheet_name]
+        sheet.range(cell).value = value
+
+    def write_range(self, sheet_name: str, top_left_cell: str, values: list[list]) -> None:
+        if not values or not values[0]:
+            return
+        sheet = self.wb.sheets[sheet_name]
+        # Large payloads are split into row chunks to stay within COM's safe array limits
+        chunk_rows = max(1, self.MAX_CELLS_PER_WRITE // len(values[0]))
+        sheet.range(top_left_cell).options(chunksize=chunk_rows).value = values
+
+    @contextmanager
+    def suspend_updates(self):
+        app = self.app
+        calculation, screen_updating, enable_events = app.calculation, app.screen_updating, app.enable_events
+        app.calculation = 'manual'
+        app.screen_updating = False
+        app.enable_events = False
+        try:
+            yield
+        finally:
+            try:
+                # Recalculate once for the whole operation, then restore the previous settings
+                if calculation != 'manual':
+                    app.calculate()
+            finally:
+                app.calculation = calculation
+                app.screen_updating = screen_updating
+                app.enable_events = enable_events
+
+    def list_named_ranges(self, sheet_name: str = None) -> list[dict]:
+        named_ranges = self.named_ranges_by_sheet()
+        if sheet_name:
+            return named_ranges.get(sheet_name, [])
+        return [info for infos in named_ranges.values() for info in infos]
+
+    def named_ranges_by_sheet(self) -> dict[Optional[str], list[dict]]:
+        # One pass over the workbook's names, reading the RefersTo text of each and resolving it
+        # locally instead of going through refers_to_range (several COM calls per name)
+        named_ranges = {}
+        for name in self.wb.names:
+            full_name = name.name
+            address = named_range_address(name.refers_to)
+            if address is None:
+                continue
+            # Sheet-scoped names are reported as 'Sheet'!Name
+            scope, _ = split_sheet(full_name)
+            named_ranges.setdefault(scope, []).append({'Name': full_name, 'Refers To': address})
+        return named_ranges
+
+    def list_tables(self) -> list[dict]:
+        tables = []
+        for sheet in self.wb.sheets:
+            for table in sheet.tables:
+                # Column names are read from the ListColumns, the header row may be hidden
+                tables.append({
+                    'Name': table.name,
+                    'Sheet': sheet.name,
+                    'Range': table.range.address.replace('$', ''),
+                    'Columns': [column.Name for column in table.api.ListColumns],
+                    'Header Rows': int(table.show_headers),
+                    'Totals Rows': int(table.show_totals),
+                })
+        return tables
+
+    def capture_screenshot_png(self, sheet_name: str, output_path: str, cell_range: str = None) -> bool:
+        sheet = self.wb.sheets[sheet_name]
+        if not cell_range:
+            cell_range = sheet.used_range.address
+        sheet.range(cell_range).api.Show()
+        sheet.range(cell_range).to_png(output_path)
+        return True
+
+    def capture_screenshot(self, sheet_name: str, cell_range: str = None) -> Image.Image:
+        if sys.platform != 'win32':
+            return super().capture_screenshot(sheet_name, cell_range)
+        sheet = self.wb.sheets[sheet_name]
+        if not cell_range:
+            cell_range = sheet.used_range.address
+        rng = sheet.range(cell_range)
+        rng.api.Show()
+        # Copy the range as a bitmap and take it from the clipboard, as Range.to_png does, minus the file
+        for attempt in range(CLIPBOARD_RETRIES):
+            try:
+                rng.api.CopyPicture(Appearance=XL_SCREEN, Format=XL_BITMAP)
+                image = ImageGrab.grabclipboard()
+                if isinstance(image, Image.Image):
+                    return image
+            except Exception:
+                if attempt == CLIPBOARD_RETRIES - 1:
+                    raise
+            time.sleep(CLIPBOARD_RETRY_DELAY)
+        raise RuntimeError(f"Failed to copy range {cell_range} of sheet '{sheet_name}' as a picture")
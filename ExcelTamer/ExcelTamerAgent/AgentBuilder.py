@@ -1,39 +1,144 @@
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+from typing import Any, Callable, Optional
 
 from langchain.agents import create_openai_functions_agent, AgentExecutor
 from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 from ExcelTamer.ExcelAutomation import ExcelAutomation
+from ExcelTamer.ExcelTamerAgent.AnswerCache import AnswerCache, model_name
+from ExcelTamer.ExcelTamerAgent.ProcessWorker import ProcessExcelAutomation
+from ExcelTamer.ExcelTamerAgent.ResultCache import ToolResultCache
+from ExcelTamer.ExcelTamerAgent.WorkbookWorkers import WorkerManager
+from ExcelTamer.ImageEncoding import DEFAULT_MAX_SHORT_SIDE, DEFAULT_MAX_SIDE
+from ExcelTamer.RangePager import DEFAULT_MAX_TOKENS
+from ExcelTamer.SheetCache import SheetCache
 from ExcelTamer.ExcelTamerAgent.ExcelTamerTools import (ExcelGetStructureTool, ExcelCellValueTool,
+                                                        ExcelQueryCellsTool,
                                                         ExcelAnalyzeImageTool, \
                                                         ExcelSaveTool, ExcelCloseTool, ExcelWriteCellTool,
-                                                        ExcelCellSearchTool,
+                                                        ExcelWriteRangeTool,
+                                                        ExcelCellSearchTool, ExcelFormulaSearchTool,
                                                         ExcelGetSheetOrRangeAsMarkdownTool,
-                                                        ExcelFindMetricValueTool)
+                                                        ExcelFindMetricValueTool, DEFAULT_TIMEOUT,
+                                                        SCREENSHOT_CACHE_ENTRIES, run_in_executor)
 
-executor = None
+workers = WorkerManager()
 
 
-def create_agent(excel_path: str, llm: BaseChatModel, memory=None, callbacks=None):
-    # We use a global ThreadPoolExecutor to ensure all xlwings calls operate on the same thread.
-    # xlwings relies on COM for Excel automation, and Excel typically operates under a
-    # Single-Threaded Apartment (STA) model. COM objects in an STA environment must only
-    # be accessed by the thread they were created on to avoid threading conflicts. Attempts
-    # to use these objects from multiple threads can lead to unpredictable behavior, such as
-    # crashes or deadlocks.
+class CachedAgentExecutor(AgentExecutor):
+    """
+    AgentExecutor answering repeated questions about an unchanged workbook from an AnswerCache.
+
+    Answers are keyed by the workbook's identity (see ExcelAutomation.workbook_identity), the
+    question and the model. Follow-up questions (with a chat history) are not cached, and neither
+    are answers that took a tool outside cacheable_tools, so a request to write a cell is always
+    carried out.
+    """
+
+    answer_cache: Optional[Any] = None
+    workbook_identity: Optional[Callable[[], str]] = None
+    model: str = ""
+    cacheable_tools: frozenset = frozenset()
+
+    def _answer_key(self, inputs: dict) -> Optional[str]:
+        if self.answer_cache is None or self.workbook_identity is None or inputs.get('chat_history'):
+            return None
+        return AnswerCache.key(self.workbook_identity(), inputs['input'], self.model)
+
+    def _cached_answer(self, inputs: dict) -> tuple[Optional[str], Optional[str]]:
+        """(key, cached answer or None) of a question; the key is None if the answer cannot be cached."""
+        key = self._answer_key(inputs)
+        return key, self.answer_cache.get(key) if key is not None else None
+
+    def _store_answer(self, key: Optional[str], outputs: dict) -> dict:
+        steps = outputs.get('intermediate_steps', [])
+        if key is not None and all(action.tool in self.cacheable_tools for action, _ in steps):
+            self.answer_cache.put(key, outputs['output'])
+        return outputs
+
+    def _cached_outputs(self, answer: str) -> dict:
+        outputs = {'output': answer}
+        if self.return_intermediate_steps:
+            outputs['intermediate_steps'] = []
+        return outputs
+
+    def _call(self, inputs: dict, run_manager=None) -> dict:
+        key, answer = self._cached_answer(inputs)
+        if answer is not None:
+            return self._cached_outputs(answer)
+        return self._store_answer(key, super()._call(inputs, run_manager=run_manager))
+
+    async def _acall(self, inputs: dict, run_manager=None) -> dict:
+        # Both the workbook identity and the SQLite lookup block
+        key, answer = await asyncio.to_thread(self._cached_answer, inputs)
+        if answer is not None:
+            return self._cached_outputs(answer)
+        outputs = await super()._acall(inputs, run_manager=run_manager)
+        return await asyncio.to_thread(self._store_answer, key, outputs)
+
+
+def create_agent(excel_path: str, llm: BaseChatModel, memory=None, callbacks=None, headless: bool = False,
+                 max_page_tokens: int = DEFAULT_MAX_TOKENS, tool_timeout: float = DEFAULT_TIMEOUT,
+                 isolate_process: bool = False, result_cache: ToolResultCache = None,
+                 sheet_cache: SheetCache = None, screenshot_cache: ToolResultCache = None,
+                 max_image_side: int = DEFAULT_MAX_SIDE, max_image_short_side: int = DEFAULT_MAX_SHORT_SIDE,
+                 tile_images: bool = False, answer_cache: AnswerCache = None):
+    """
+    Create an agent that works on the given workbook.
+
+    :param headless: If True, the .xlsx file is read directly with XlsxFileBackend instead of
+                     through a running Excel. Read-only, but works on any platform.
+    :param max_page_tokens: Token budget of one page returned by the range as markdown tool.
+    :param tool_timeout: Limit for one tool call in seconds (None to wait indefinitely). A call timing out
+                         is reported to the agent as a tool error.
+    :param isolate_process: If True, the workbook is opened in a child process (see ProcessExcelAutomation),
+                            so a hung or crashing Excel call cannot take the agent process down.
+    :param result_cache: Cache of the results of read-only tools. A new ToolResultCache is used if not
+                         provided; pass one to share it or to read its hit and miss counters.
+    :param sheet_cache: On-disk cache of parsed sheets (see SheetCache). A workbook unchanged since a
+                        previous session is then answered from the cache instead of being read again.
+    :param screenshot_cache: Cache of the screenshots sent to the vision model, per range and workbook version.
+                             A new ToolResultCache holding SCREENSHOT_CACHE_ENTRIES images is used if not provided.
+    :param max_image_side: Screenshots are downscaled to fit this many pixels on their long side,
+    :param max_image_short_side: and this many on their short side, to bound the vision model's token cost.
+    :param tile_images: If True, the image tool splits large ranges into tiles, asks about them concurrently
+                        and merges the answers, instead of sending one downscaled image.
+    :param answer_cache: Persistent cache of answers (see AnswerCache). The image tool then reuses its
+                         answers about identical images, and the agent answers a question it already
+                         answered about the unchanged workbook, with the same model, without calling it.
+    """
+    # Each workbook gets its own worker thread, to ensure all xlwings calls on a workbook operate
+    # on the thread that opened it. xlwings relies on COM for Excel automation, and Excel typically
+    # operates under a Single-Threaded Apartment (STA) model. COM objects in an STA environment
+    # must only be accessed by the thread they were created on to avoid threading conflicts.
+    # Attempts to use these objects from multiple threads can lead to unpredictable behavior,
+    # such as crashes or deadlocks. Headless workbooks have no such affinity, their reads may
+    # run on several threads.
     #
     # For more details on STA threading and COM, see:
     # https://devblogs.microsoft.com/oldnewthing/20191125-00/?p=103135
     # https://docs.microsoft.com/en-us/windows/win32/com/using-the-threading
+    # Calls to a worker process are serialized by its pipe, there is nothing to gain from concurrent reads.
+    # Tool calls go through the workbook's scheduler, which coalesces identical reads and runs
+    # interactive calls ahead of background work.
+    concurrent_reads = headless and not isolate_process
+    executor = workers.scheduler_for(excel_path, concurrent_reads=concurrent_reads)
 
-    global executor
-    if executor is None:
-        executor = ThreadPoolExecutor(max_workers=1)
-
-    future = executor.submit(ExcelAutomation, file_path=excel_path)
+    if isolate_process:
+        future = executor.submit(ProcessExcelAutomation, excel_path, headless=headless, timeout=tool_timeout,
+                                 sheet_cache=sheet_cache)
+    elif headless:
+        future = executor.submit(ExcelAutomation.open_headless, excel_path, sheet_cache=sheet_cache)
+    else:
+        future = executor.submit(ExcelAutomation, file_path=excel_path, sheet_cache=sheet_cache)
     excel: ExcelAutomation = future.result()
 
+    if result_cache is None:
+        result_cache = ToolResultCache()
+    if screenshot_cache is None:
+        screenshot_cache = ToolResultCache(max_entries=SCREENSHOT_CACHE_ENTRIES)
+
     from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
     prompt = ChatPromptTemplate.from_messages(
@@ -46,15 +151,23 @@ def create_agent(excel_path: str, llm: BaseChatModel, memory=None, callbacks=Non
     )
 
     tools = [
-        ExcelGetStructureTool(excel_automation=excel, executor=executor),
-        ExcelCellValueTool(excel_automation=excel, executor=executor),
-        ExcelAnalyzeImageTool(excel_automation=excel, executor=executor, llm=llm),
-        ExcelSaveTool(excel_automation=excel, executor=executor),
-        ExcelCloseTool(excel_automation=excel, executor=executor),
-        ExcelWriteCellTool(excel_automation=excel, executor=executor),
-        ExcelCellSearchTool(excel_automation=excel, executor=executor),
-        ExcelGetSheetOrRangeAsMarkdownTool(excel_automation=excel, executor=executor),
-        ExcelFindMetricValueTool(excel_automation=excel, executor=executor),
+        ExcelGetStructureTool(excel_automation=excel, executor=executor, timeout=tool_timeout, cache=result_cache),
+        ExcelCellValueTool(excel_automation=excel, executor=executor, timeout=tool_timeout),
+        ExcelQueryCellsTool(excel_automation=excel, executor=executor, timeout=tool_timeout),
+        ExcelAnalyzeImageTool(excel_automation=excel, executor=executor, llm=llm, timeout=tool_timeout,
+                              cache=screenshot_cache, max_image_side=max_image_side,
+                              max_image_short_side=max_image_short_side, tiled=tile_images,
+                              answer_cache=answer_cache),
+        ExcelSaveTool(excel_automation=excel, executor=executor, timeout=tool_timeout),
+        ExcelCloseTool(excel_automation=excel, executor=executor, timeout=tool_timeout,
+                       on_close=lambda: workers.release(excel_path, concurrent_reads)),
+        ExcelWriteCellTool(excel_automation=excel, executor=executor, timeout=tool_timeout),
+        ExcelWriteRangeTool(excel_automation=excel, executor=executor, timeout=tool_timeout),
+        ExcelCellSearchTool(excel_automation=excel, executor=executor, timeout=tool_timeout, cache=result_cache),
+        ExcelFormulaSearchTool(excel_automation=excel, executor=executor, timeout=tool_timeout, cache=result_cache),
+        ExcelGetSheetOrRangeAsMarkdownTool(excel_automation=excel, executor=executor, max_tokens=max_page_tokens,
+                                           timeout=tool_timeout, cache=result_cache),
+        ExcelFindMetricValueTool(excel_automation=excel, executor=executor, timeout=tool_timeout, cache=result_cache),
     ]
 
     agent = create_openai_functions_agent(
@@ -63,7 +176,20 @@ def create_agent(excel_path: str, llm: BaseChatModel, memory=None, callbacks=Non
         prompt=prompt,
     )
     #agent.return_intermediate_steps=True
-    agent_executor = AgentExecutor(
-        agent=agent, verbose=True, tools=tools, memory=memory, return_intermediate_steps=True, callbacks=None
+    if answer_cache is None:
+        agent_executor = AgentExecutor(
+            agent=agent, verbose=True, tools=tools, memory=memory, return_intermediate_steps=True, callbacks=None
+        )
+        return agent_executor
+
+    # Answers that only took read-only tools may be reused
+    read_only_tools = {ExcelGetStructureTool, ExcelCellValueTool, ExcelQueryCellsTool, ExcelAnalyzeImageTool,
+                       ExcelCellSearchTool, ExcelFormulaSearchTool, ExcelGetSheetOrRangeAsMarkdownTool,
+                       ExcelFindMetricValueTool}
+    agent_executor = CachedAgentExecutor(
+        agent=agent, verbose=True, tools=tools, memory=memory, return_intermediate_steps=True, callbacks=None,
+        answer_cache=answer_cache, model=model_name(llm),
+        workbook_identity=lambda: run_in_executor(executor, tool_timeout, excel.workbook_identity, read=True),
+        cacheable_tools=frozenset(tool.tool_name for tool in read_only_tools),
     )
     return agent_executor
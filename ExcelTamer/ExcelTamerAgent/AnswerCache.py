@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# Default location, lifetime of an answer in seconds, and number of answers kept
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ExcelTamer", "answers.sqlite3")
+DEFAULT_TTL = 7 * 24 * 3600
+MAX_ENTRIES = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    answer TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used);
+"""
+
+
+def normalize_question(question: str) -> str:
+    """Lower case, single spaces and no trailing punctuation, so trivially different phrasings share answers."""
+    return re.sub(r'\s+', ' ', str(question)).strip().rstrip('?!. ').lower()
+
+
+def model_name(llm) -> str:
+    """Name of the model behind a chat model, as used in cache keys."""
+    return getattr(llm, 'model_name', None) or getattr(llm, 'model', None) or type(llm).__name__
+
+
+class AnswerCache:
+    """
+    Persistent cache of LLM answers in a local SQLite database, so the same question about
+    the same unchanged content is answered without calling the model.
+
+    Keys combine what the question is about, the normalized question and the model name.
+    For an image, that is a hash of its data. For a workbook, it is ExcelAutomation.workbook_identity:
+    the file's path and content hash (or size and modification time) while the workbook matches
+    its file, so answers hold until the file changes, and the path and the session's version once
+    it was written to, so those answers are only reused within the session. Answers expire after
+    ttl seconds; beyond max_entries the least recently used ones are evicted.
+    The cache can be shared by threads and processes.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, ttl: float = DEFAULT_TTL, max_entries: int = MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def key(content_key: str, question: str, model: str) -> str:
+        text = "\0".join((content_key, normalize_question(question), model))
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """The answer stored under the key, None if there is none or it expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT answer FROM answers WHERE key = ? AND created >= ?",
+                                     (key, now - self.ttl)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        logging.debug(f"Answer cache hit for {key[:12]}")
+        return row[0]
+
+    def put(self, key: str, answer: str) -> None:
+        if not isinstance(answer, str):
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO answers (key, answer, created, last_used) VALUES (?, ?, ?, ?)",
+                               (key, answer, now, now))
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl,))
+        self._conn.execute("DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY last_used DESC "
+                           "LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,15 +1,96 @@
 import asyncio
-import base64
-import os
-import tempfile
-from typing import ClassVar, Any, List, Dict
-from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import concurrent.futures
+import time
+from typing import Awaitable, Callable, ClassVar, Any, List, Dict, Hashable, Optional
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import HumanMessage
+from PIL import Image
 from pydantic import PrivateAttr
 from langchain.tools import BaseTool
+from langchain_core.tools import ToolException
 from ExcelTamer.ExcelAutomation import ExcelAutomation
+from ExcelTamer.ExcelTamerAgent.AnswerCache import AnswerCache, model_name
+from ExcelTamer.ExcelTamerAgent.ResultCache import ToolResultCache
+from ExcelTamer.ExcelTamerAgent.RequestScheduler import BACKGROUND, INTERACTIVE, RequestScheduler, WorkerQueueFullError
+from ExcelTamer.ImageEncoding import DEFAULT_COLORS, DEFAULT_MAX_SHORT_SIDE, DEFAULT_MAX_SIDE, encode_png_data_url
+from ExcelTamer.RangePager import DEFAULT_MAX_TOKENS
+from ExcelTamer.RangeReader import TILE_COLUMNS, TILE_OVERLAP, TILE_ROWS
+
+# Default limit for one tool call in seconds, None to wait indefinitely
+DEFAULT_TIMEOUT = 120.0
+# Encoded screenshots kept by the cache create_agent gives the image tool
+SCREENSHOT_CACHE_ENTRIES = 32
+# Image questions about the tiles of a range sent to the LLM at the same time
+MAX_CONCURRENCY = 4
+
+
+def _submit(executor: Executor, timeout: Optional[float], func: Callable, args: tuple, read: bool,
+            priority: int) -> Future:
+    try:
+        if isinstance(executor, RequestScheduler):
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            return executor.schedule(func, args, read=read, priority=priority, deadline=deadline)
+        # Workbook workers may run reads concurrently, see WorkbookExecutor.submit_read
+        submit = getattr(executor, 'submit_read', executor.submit) if read else executor.submit
+        return submit(func, *args)
+    except WorkerQueueFullError as e:
+        raise ToolException(str(e))
+
+
+def run_in_executor(executor: Executor, timeout: Optional[float], func: Callable, *args: Any,
+                    read: bool = False, priority: int = INTERACTIVE) -> Any:
+    """
+    Run func on the executor and wait for its result.
+    A call still waiting in the executor queue when the timeout expires is cancelled.
+
+    :param read: True if func only reads the workbook.
+    :param priority: Priority of the call when the executor is a RequestScheduler.
+    """
+    future = _submit(executor, timeout, func, args, read, priority)
+    try:
+        return future.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise ToolException(f"{func.__name__} did not complete within {timeout} seconds")
+
+
+async def arun_in_executor(executor: Executor, timeout: Optional[float], func: Callable, *args: Any,
+                           read: bool = False, priority: int = INTERACTIVE) -> Any:
+    """
+    Async version of run_in_executor, awaiting the result without blocking the event loop.
+
+    Cancelling the awaiting task (or the timeout expiring) cancels a call still waiting in the
+    executor queue. A call already running on the executor thread cannot be interrupted,
+    it completes in the background and its result is discarded.
+    """
+    future = _submit(executor, timeout, func, args, read, priority)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        raise ToolException(f"{func.__name__} did not complete within {timeout} seconds")
+
+
+def cached_call(cache: Optional[ToolResultCache], excel_automation: ExcelAutomation, tool_name: str, args: tuple,
+                compute: Callable[[], Any]) -> Any:
+    """Return compute(), memoized in the cache (if any) for the current version of the workbook."""
+    if cache is None:
+        return compute()
+    # A cache may be shared by the agents of several workbooks. The session tells them apart; an id()
+    # could be reused by an instance created after another was collected.
+    version = (excel_automation.session, excel_automation.version)
+    return cache.get_or_compute(tool_name, args, version, compute)
+
+
+async def acached_call(cache: Optional[ToolResultCache], excel_automation: ExcelAutomation, tool_name: str,
+                       args: tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """Async version of cached_call; a hit returns without going through the executor."""
+    if cache is None:
+        return await compute()
+    version = (excel_automation.session, excel_automation.version)
+    return await cache.aget_or_compute(tool_name, args, version, compute)
 
 
 class ExcelGetStructureTool(BaseTool):
@@ -21,38 +102,44 @@ class ExcelGetStructureTool(BaseTool):
     - Number of Rows
     - Number of Columns
     - Range of the used cells
+    - Data Range: the range actually holding data, which may be much smaller than the used range
+    - Data Regions: the separate blocks of data in the sheet (typically one per table), largest first
     - Named ranges in the sheet (name and reference)
 
     Useful for inspecting workbook for data operations. Does not access raw cell data."""
 
     _excel_automation: ExcelAutomation = PrivateAttr()
     _executor: ThreadPoolExecutor = PrivateAttr()
+    _timeout: float = PrivateAttr()
+    _cache: Optional[ToolResultCache] = PrivateAttr()
 
-    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor):
+    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 cache: ToolResultCache = None):
         """Constructor accepts an ExcelAutomation instance and a ThreadPoolExecutor."""
-        super().__init__(name=self.tool_name, description=self.tool_description)
+        super().__init__(name=self.tool_name, description=self.tool_description, handle_tool_error=True)
         self._excel_automation = excel_automation
         self._executor = executor
+        self._timeout = timeout
+        self._cache = cache
 
     def _get_structure_sync(self) -> List[dict]:
         """Sync wrapper for the get_structure method."""
         # Use the ThreadPoolExecutor to ensure that xlwings interacts with Excel in a separate thread
-        future = self._executor.submit(self._excel_automation.get_structure)
-        return future.result()
+        return run_in_executor(self._executor, self._timeout, self._excel_automation.get_structure, read=True)
 
     async def _get_structure_async(self) -> List[dict]:
-        """Async wrapper for the get_structure method using ThreadPoolExecutor."""
-        #loop = asyncio.get_event_loop()
-        #return await loop.run_in_executor(self._executor, self._get_structure_sync)
-        return self._get_structure_sync()
+        """Async wrapper for the get_structure method, awaiting the ThreadPoolExecutor."""
+        return await arun_in_executor(self._executor, self._timeout, self._excel_automation.get_structure,
+                                      read=True)
 
     def _run(self, *args: Any, **kwargs: Any) -> Any:
         """Sync entry point for the tool."""
-        return self._get_structure_sync()
+        return cached_call(self._cache, self._excel_automation, self.tool_name, (), self._get_structure_sync)
 
     async def _arun(self, *args: Any, **kwargs: Any) -> Any:
         """Async entry point for the tool."""
-        return await self._get_structure_async()
+        return await acached_call(self._cache, self._excel_automation, self.tool_name, (), self._get_structure_async)
 
     @property
     def name(self) -> str:
@@ -73,18 +160,21 @@ class ExcelCellValueTool(BaseTool):
 
         _excel_automation: ExcelAutomation = PrivateAttr()
         _executor: ThreadPoolExecutor = PrivateAttr()
+        _timeout: float = PrivateAttr()
 
-        def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor):
+        def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor,
+                     timeout: float = DEFAULT_TIMEOUT):
             """Constructor accepts an ExcelAutomation instance and a ThreadPoolExecutor."""
-            super().__init__(name=self.tool_name, description=self.tool_description)
+            super().__init__(name=self.tool_name, description=self.tool_description, handle_tool_error=True)
             self._excel_automation = excel_automation
             self._executor = executor
+            self._timeout = timeout
 
         def _impl(self, sheet_name: str, cell: str) -> dict:
             """Sync wrapper for the get_structure method."""
             # Use the ThreadPoolExecutor to ensure that xlwings interacts with Excel in a separate thread
-            future = self._executor.submit(self._excel_automation.query_cell, sheet_name, cell)
-            return future.result()
+            return run_in_executor(self._executor, self._timeout, self._excel_automation.query_cell,
+                                   sheet_name, cell, read=True)
 
         def _run(self, sheet_name: str, cell: str) -> Any:
             """Sync entry point for the tool."""
@@ -92,7 +182,8 @@ class ExcelCellValueTool(BaseTool):
 
         async def _arun(self, sheet_name: str, cell: str) -> Any:
             """Async entry point for the tool."""
-            return self._impl(sheet_name, cell)
+            return await arun_in_executor(self._executor, self._timeout, self._excel_automation.query_cell,
+                                          sheet_name, cell, read=True)
 
         @property
         def name(self) -> str:
@@ -104,6 +195,54 @@ class ExcelCellValueTool(BaseTool):
             """A brief description of the tool's functionality."""
             return self.tool_description
 
+class ExcelQueryCellsTool(BaseTool):
+    """Tool to query Formula / Value of many cells at once."""
+
+    tool_name: ClassVar[str] = "excel_query_cells"
+    tool_description: ClassVar[str] = """Retrieve the value, formula and visible text of several cells in one call.
+    Prefer this over repeated excel_query_cell calls.
+    Parameters:
+      - sheet_name: The name of the sheet.
+      - cells: List of cell addresses or small ranges, e.g. ["B7", "D15", "D6:F6"].
+    Returns a dictionary mapping each cell address to its 'Value', 'Formula' and 'VisibleText'."""
+
+    _excel_automation: ExcelAutomation = PrivateAttr()
+    _executor: ThreadPoolExecutor = PrivateAttr()
+    _timeout: float = PrivateAttr()
+
+    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor,
+                 timeout: float = DEFAULT_TIMEOUT):
+        """Constructor accepts an ExcelAutomation instance and a ThreadPoolExecutor."""
+        super().__init__(name=self.tool_name, description=self.tool_description, handle_tool_error=True)
+        self._excel_automation = excel_automation
+        self._executor = executor
+        self._timeout = timeout
+
+    def _impl(self, sheet_name: str, cells: List[str]) -> Dict[str, dict]:
+        """Sync wrapper for the query_cells method."""
+        # Use the ThreadPoolExecutor to ensure that xlwings interacts with Excel in a separate thread
+        return run_in_executor(self._executor, self._timeout, self._excel_automation.query_cells,
+                               sheet_name, cells, read=True)
+
+    def _run(self, sheet_name: str, cells: List[str]) -> Any:
+        """Sync entry point for the tool."""
+        return self._impl(sheet_name, cells)
+
+    async def _arun(self, sheet_name: str, cells: List[str]) -> Any:
+        """Async entry point for the tool."""
+        return await arun_in_executor(self._executor, self._timeout, self._excel_automation.query_cells,
+                                      sheet_name, cells, read=True)
+
+    @property
+    def name(self) -> str:
+        """The name of the tool."""
+        return self.tool_name
+
+    @property
+    def description(self) -> str:
+        """A brief description of the tool's functionality."""
+        return self.tool_description
+
 class ExcelAnalyzeImageTool(BaseTool):
     """Tool to analyze an image of an Excel sheet."""
 
@@ -120,52 +259,136 @@ class ExcelAnalyzeImageTool(BaseTool):
 
     _excel_automation: ExcelAutomation = PrivateAttr()
     _llm: BaseChatModel = PrivateAttr()
+    _tiled: bool = PrivateAttr()
+    _tile_rows: int = PrivateAttr()
+    _tile_columns: int = PrivateAttr()
+    _tile_overlap: int = PrivateAttr()
+    _max_concurrency: int = PrivateAttr()
     _executor: ThreadPoolExecutor = PrivateAttr()
-
-    def __init__(self, llm: BaseChatModel, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor):
-        """Constructor accepts an image path and a ThreadPoolExecutor."""
-        super().__init__(name=self.tool_name, description=self.tool_description)
+    _timeout: float = PrivateAttr()
+    _cache: Optional[ToolResultCache] = PrivateAttr()
+    _max_image_side: int = PrivateAttr()
+    _max_image_short_side: int = PrivateAttr()
+    _image_colors: int = PrivateAttr()
+    _answer_cache: Optional[AnswerCache] = PrivateAttr()
+
+    def __init__(self, llm: BaseChatModel, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor,
+                 timeout: float = DEFAULT_TIMEOUT, cache: ToolResultCache = None,
+                 max_image_side: int = DEFAULT_MAX_SIDE, max_image_short_side: int = DEFAULT_MAX_SHORT_SIDE,
+                 image_colors: int = DEFAULT_COLORS, tiled: bool = False, tile_rows: int = TILE_ROWS,
+                 tile_columns: int = TILE_COLUMNS, tile_overlap: int = TILE_OVERLAP,
+                 max_concurrency: int = MAX_CONCURRENCY, answer_cache: AnswerCache = None):
+        """
+        Constructor accepts the LLM answering questions, an ExcelAutomation instance and a ThreadPoolExecutor.
+
+        :param cache: Cache of the encoded screenshots, reused until the workbook changes.
+        :param max_image_side: Screenshots are downscaled to fit this many pixels on their long side,
+        :param max_image_short_side: and this many on their short side.
+        :param image_colors: Size of the palette screenshots are quantized to, 0 to keep full color.
+        :param tiled: Split ranges larger than tile_rows x tile_columns into tiles sharing tile_overlap
+                      rows / columns, ask about each tile and merge the answers, so text stays legible.
+        :param max_concurrency: Tiles submitted to the LLM at the same time.
+        :param answer_cache: Persistent cache of the answers, by image, question and model.
+        """
+        super().__init__(name=self.tool_name, description=self.tool_description, handle_tool_error=True)
         self._llm = llm
         self._executor = executor
+        self._timeout = timeout
         self._excel_automation = excel_automation
-
-    def take_screenshot(self,sheet_name: str, cell_range: str) -> str:
+        self._cache = cache
+        self._max_image_side = max_image_side
+        self._max_image_short_side = max_image_short_side
+        self._image_colors = image_colors
+        self._tiled = tiled
+        self._tile_rows = tile_rows
+        self._tile_columns = tile_columns
+        self._tile_overlap = tile_overlap
+        self._max_concurrency = max_concurrency
+        self._answer_cache = answer_cache
+
+    def _capture(self, sheet_name: str, cell_range: str) -> Image.Image:
+        image = self._excel_automation.capture_screenshot(sheet_name, cell_range)
+        if image is None:
+            raise ToolException(f"Failed to capture a screenshot of sheet '{sheet_name}'")
+        return image
+
+    def _encode(self, image: Image.Image) -> str:
+        return encode_png_data_url(image, self._max_image_side, self._max_image_short_side, self._image_colors)
+
+    def _screenshot_args(self, sheet_name: str, cell_range: str) -> tuple:
+        return sheet_name, cell_range, self._max_image_side, self._max_image_short_side, self._image_colors
+
+    def take_screenshot(self, sheet_name: str, cell_range: str) -> str:
         """Capture a screenshot of the specified sheet or range,
-         and return the base64 string of the image data.
-         If cell_range is not provided, the entire sheet will be captured.
+         and return it as a downscaled, palette PNG data URL.
+         If cell_range is not provided, the range holding data will be captured.
+         The image is reused while the workbook is unchanged.
          """
-
-        # Create a temporary file path
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as temp_file:
-            output_path = temp_file.name
-
-        # Capture the screenshot
-        self._excel_automation.capture_screenshot_png(sheet_name, output_path, cell_range)
-
-        # Read the image and convert to base64
-        with open(output_path, "rb") as image_file:
-            base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-
-        # Clean up the temporary file
-        os.remove(output_path)
-
-        # Create data URL
-        data_url = f"data:image/png;base64,{base64_image}"
-
-        return data_url
-
-    def ask_question_about_image_base64(self,encoded_image_url, question):
-        """
-        Submits an image (in form of Data URL) and a related question to LLM and returns the concise response.
-
-        :param encoded_image_url: Base64 encoded image string (data URL with header).
-        :param question: The question related to the image.
-        :return: The response from LLM.
-        """
-        # Prepare the message content
-        messages = [
+        def compute():
+            # Use the ThreadPoolExecutor to ensure that the capture is done in a separate thread;
+            # the image is encoded here, leaving the workbook's thread free
+            image = run_in_executor(self._executor, self._timeout, self._capture, sheet_name, cell_range,
+                                    priority=BACKGROUND)
+            return self._encode(image)
+        return cached_call(self._cache, self._excel_automation, self.tool_name,
+                           self._screenshot_args(sheet_name, cell_range), compute)
+
+    async def atake_screenshot(self, sheet_name: str, cell_range: str) -> str:
+        """Async version of take_screenshot."""
+        async def compute():
+            image = await arun_in_executor(self._executor, self._timeout, self._capture, sheet_name, cell_range,
+                                           priority=BACKGROUND)
+            return await asyncio.to_thread(self._encode, image)
+        return await acached_call(self._cache, self._excel_automation, self.tool_name,
+                                  self._screenshot_args(sheet_name, cell_range), compute)
+
+    def _screenshot_key(self, sheet_name: str, cell_range: str) -> Hashable:
+        version = (id(self._excel_automation), self._excel_automation.version)
+        return ToolResultCache.key(self.tool_name, self._screenshot_args(sheet_name, cell_range), version)
+
+    def _cached_screenshots(self, sheet_name: str, cell_ranges: list[str]) -> tuple[list, list, list[str]]:
+        """Cache keys and cached data URLs (None if missing) of several ranges, and the missing ranges."""
+        keys = [self._screenshot_key(sheet_name, cell_range) for cell_range in cell_ranges]
+        urls = [self._cache.get(key)[1] if self._cache is not None else None for key in keys]
+        return keys, urls, [cell_range for cell_range, url in zip(cell_ranges, urls) if url is None]
+
+    def _store_screenshots(self, keys: list, urls: list, captured: list[str]) -> list[str]:
+        captured = iter(captured)
+        for i, key in enumerate(keys):
+            if urls[i] is None:
+                urls[i] = next(captured)
+                if self._cache is not None:
+                    self._cache.put(key, urls[i])
+        return urls
+
+    def _capture_all(self, sheet_name: str, cell_ranges: list[str]) -> list[Image.Image]:
+        images = self._excel_automation.capture_screenshots(sheet_name, cell_ranges)
+        for cell_range, image in zip(cell_ranges, images):
+            if image is None:
+                raise ToolException(f"Failed to capture a screenshot of {cell_range} in sheet '{sheet_name}'")
+        return images
+
+    def take_screenshots(self, sheet_name: str, cell_ranges: list[str]) -> list[str]:
+        """take_screenshot of several ranges, capturing the ones not cached in a single executor call."""
+        keys, urls, missing = self._cached_screenshots(sheet_name, cell_ranges)
+        images = run_in_executor(self._executor, self._timeout, self._capture_all, sheet_name, missing,
+                                 priority=BACKGROUND) if missing else []
+        return self._store_screenshots(keys, urls, [self._encode(image) for image in images])
+
+    async def atake_screenshots(self, sheet_name: str, cell_ranges: list[str]) -> list[str]:
+        """Async version of take_screenshots."""
+        keys, urls, missing = self._cached_screenshots(sheet_name, cell_ranges)
+        images = await arun_in_executor(self._executor, self._timeout, self._capture_all, sheet_name, missing,
+                                        priority=BACKGROUND) if missing else []
+        captured = await asyncio.to_thread(lambda: [self._encode(image) for image in images])
+        return self._store_screenshots(keys, urls, captured)
+
+    @staticmethod
+    def _image_question_messages(encoded_image_url, question, context: str = "") -> list:
+        """Messages submitting an image (in form of Data URL) and a related question to LLM."""
+        return [
             HumanMessage(content=[
-                {"type": "text", "text": f"Please provide a "
+                {"type": "text", "text": f"{context}Please provide a "
                                          f"concise response to following question \n\n##Question\n\n{question} ."},
                 {
                     "type": "image_url",
@@ -176,16 +399,110 @@ class ExcelAnalyzeImageTool(BaseTool):
             ])
         ]
 
-        # Get the response from OpenAI using the global llm
-        response = self._llm.invoke(messages)
-        return response.content
+    @classmethod
+    def _tile_messages(cls, encoded_image_urls: list[str], question: str, sheet_name: str,
+                       tiles: list[str]) -> list[list]:
+        """One image question per tile, telling the LLM which part of the range it is looking at."""
+        whole_range = f"{tiles[0].split(':')[0]}:{tiles[-1].split(':')[-1]}"
+        return [cls._image_question_messages(
+            url, question,
+            f"The image shows cells {tile} of sheet '{sheet_name}', one part of the range {whole_range}. "
+            f"Answer from this part only, and say so if it holds nothing relevant.\n\n")
+            for url, tile in zip(encoded_image_urls, tiles)]
+
+    @staticmethod
+    def _merge_messages(question: str, tiles: list[str], answers: list[str]) -> list:
+        """Messages asking the LLM to merge the answers about each tile into one."""
+        parts = "\n\n".join(f"### Cells {tile}\n\n{answer}" for tile, answer in zip(tiles, answers))
+        return [HumanMessage(content=
+                             f"A question was asked about each part of a sheet separately. Neighbouring parts "
+                             f"share their edge rows or columns, so values there may be reported twice. "
+                             f"Combine the answers into one concise response to the question."
+                             f"\n\n##Question\n\n{question}\n\n##Answers by part\n\n{parts}")]
+
+    def _answer_key(self, encoded_image_urls: list[str], question: str) -> Optional[str]:
+        """Answer cache key of a question about one or more images, None without an answer cache."""
+        if self._answer_cache is None:
+            return None
+        digest = hashlib.sha256()
+        for url in encoded_image_urls:
+            digest.update(url.encode("ascii"))
+        return AnswerCache.key(digest.hexdigest(), question, model_name(self._llm))
+
+    def _cached_answer(self, key: Optional[str]) -> Optional[str]:
+        return self._answer_cache.get(key) if key is not None else None
+
+    def _store_answer(self, key: Optional[str], answer: str) -> str:
+        if key is not None:
+            self._answer_cache.put(key, answer)
+        return answer
 
+    def ask_question_about_image_base64(self,encoded_image_url, question):
+        """
+        Submits an image (in form of Data URL) and a related question to LLM and returns the concise response.
+        Answers found in the answer cache are returned without calling the LLM.
+
+        :param encoded_image_url: Base64 encoded image string (data URL with header).
+        :param question: The question related to the image.
+        :return: The response from LLM.
+        """
+        key = self._answer_key([encoded_image_url], question)
+        answer = self._cached_answer(key)
+        if answer is not None:
+            return answer
+        # Get the response from OpenAI using the global llm
+        response = self._llm.invoke(self._image_question_messages(encoded_image_url, question))
+        return self._store_answer(key, response.content)
+
+    async def aask_question_about_image_base64(self, encoded_image_url, question):
+        """Async version of ask_question_about_image_base64."""
+        key = self._answer_key([encoded_image_url], question)
+        answer = self._cached_answer(key)
+        if answer is not None:
+            return answer
+        response = await asyncio.wait_for(
+            self._llm.ainvoke(self._image_question_messages(encoded_image_url, question)), self._timeout)
+        return self._store_answer(key, response.content)
+
+    def _tiles(self, sheet_name: str, cell_range: str) -> list[str]:
+        return run_in_executor(self._executor, self._timeout, self._excel_automation.screenshot_tiles, sheet_name,
+                               cell_range, self._tile_rows, self._tile_columns, self._tile_overlap, read=True)
+
+    def analyze_tiles(self, question: str, sheet_name: str, tiles: list[str]) -> str:
+        """Ask about each tile, at most max_concurrency at a time, and merge the answers."""
+        urls = self.take_screenshots(sheet_name, tiles)
+        key = self._answer_key(urls, question)
+        answer = self._cached_answer(key)
+        if answer is not None:
+            return answer
+        responses = self._llm.batch(self._tile_messages(urls, question, sheet_name, tiles),
+                                    config={"max_concurrency": self._max_concurrency})
+        answers = [response.content for response in responses]
+        return self._store_answer(key, self._llm.invoke(self._merge_messages(question, tiles, answers)).content)
+
+    async def aanalyze_tiles(self, question: str, sheet_name: str, tiles: list[str]) -> str:
+        """Async version of analyze_tiles."""
+        urls = await self.atake_screenshots(sheet_name, tiles)
+        key = self._answer_key(urls, question)
+        answer = self._cached_answer(key)
+        if answer is not None:
+            return answer
+        responses = await asyncio.wait_for(
+            self._llm.abatch(self._tile_messages(urls, question, sheet_name, tiles),
+                             config={"max_concurrency": self._max_concurrency}), self._timeout)
+        answers = [response.content for response in responses]
+        response = await asyncio.wait_for(self._llm.ainvoke(self._merge_messages(question, tiles, answers)),
+                                          self._timeout)
+        return self._store_answer(key, response.content)
 
     def _impl(self, question: str, sheet_name: str, cell_range: str = None) -> str:
         """Sync wrapper for the analyze_image method."""
-        # Use the ThreadPoolExecutor to ensure that image processing is done in a separate thread
-        future = self._executor.submit(self.take_screenshot,  sheet_name, cell_range)
-        image_data_url =  future.result()
+        if self._tiled:
+            tiles = self._tiles(sheet_name, cell_range)
+            if len(tiles) > 1:
+                return self.analyze_tiles(question, sheet_name, tiles)
+
+        image_data_url = self.take_screenshot(sheet_name, cell_range)
 
         response = self.ask_question_about_image_base64(image_data_url, question)
 
@@ -198,7 +515,17 @@ class ExcelAnalyzeImageTool(BaseTool):
 
     async def _arun(self, question: str, sheet_name: str, cell_range: str = None) -> str:
         """Async entry point for the tool."""
-        return self._impl(question, sheet_name, cell_range)
+        try:
+            if self._tiled:
+                tiles = await arun_in_executor(self._executor, self._timeout, self._excel_automation.screenshot_tiles,
+                                               sheet_name, cell_range, self._tile_rows, self._tile_columns,
+                                               self._tile_overlap, read=True)
+                if len(tiles) > 1:
+                    return await self.aanalyze_tiles(question, sheet_name, tiles)
+            image_data_url = await self.atake_screenshot(sheet_name, cell_range)
+            return await self.aask_question_about_image_base64(image_data_url, question)
+        except asyncio.TimeoutError:
+            raise ToolException(f"Image analysis did not complete within {self._timeout} seconds")
 
     @property
     def name(self) -> str:
@@ -218,18 +545,20 @@ class ExcelSaveTool(BaseTool):
 
     _excel_automation: ExcelAutomation = PrivateAttr()
     _executor: ThreadPoolExecutor = PrivateAttr()
+    _timeout: float = PrivateAttr()
 
-    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor):
+    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor,
+                 timeout: float = DEFAULT_TIMEOUT):
         """Constructor accepts an ExcelAutomation instance and a ThreadPoolExecutor."""
-        super().__init__(name=self.tool_name, description=self.tool_description)
+        super().__init__(name=self.tool_name, description=self.tool_description, handle_tool_error=True)
         self._excel_automation = excel_automation
         self._executor = executor
+        self._timeout = timeout
 
     def _impl(self, file_path: str = None) -> None:
         """Sync wrapper for the save method."""
         # Use the ThreadPoolExecutor to ensure that xlwings interacts with Excel in a separate thread
-        future = self._executor.submit(self._excel_automation.save, file_path)
-        future.result()
+        run_in_executor(self._executor, self._timeout, self._excel_automation.save, file_path)
 
     def _run(self, file_path: str = None) -> None:
         """Sync entry point for the tool."""
@@ -237,7 +566,7 @@ class ExcelSaveTool(BaseTool):
 
     async def _arun(self, file_path: str = None) -> None:
         """Async entry point for the tool."""
-        return self._impl(file_path)
+        await arun_in_executor(self._executor, self._timeout, self._excel_automation.save, file_path)
 
     @property
     def name(self) -> str:
@@ -257,18 +586,28 @@ class ExcelCloseTool(BaseTool):
 
     _excel_automation: ExcelAutomation = PrivateAttr()
     _executor: ThreadPoolExecutor = PrivateAttr()
+    _timeout: float = PrivateAttr()
+    _on_close: Optional[Callable[[], None]] = PrivateAttr()
 
-    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor):
-        """Constructor accepts an ExcelAutomation instance and a ThreadPoolExecutor."""
-        super().__init__(name=self.tool_name, description=self.tool_description)
+    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor,
+                 timeout: float = DEFAULT_TIMEOUT, on_close: Callable[[], None] = None):
+        """
+        Constructor accepts an ExcelAutomation instance and a ThreadPoolExecutor.
+
+        :param on_close: Called once the workbook is closed, e.g. to release the executor's worker.
+        """
+        super().__init__(name=self.tool_name, description=self.tool_description, handle_tool_error=True)
         self._excel_automation = excel_automation
         self._executor = executor
+        self._timeout = timeout
+        self._on_close = on_close
 
     def _impl(self) -> None:
         """Sync wrapper for the close method."""
         # Use the ThreadPoolExecutor to ensure that xlwings interacts with Excel in a separate thread
-        future = self._executor.submit(self._excel_automation.close)
-        future.result()
+        run_in_executor(self._executor, self._timeout, self._excel_automation.close)
+        if self._on_close is not None:
+            self._on_close()
 
     def _run(self) -> None:
         """Sync entry point for the tool."""
@@ -276,7 +615,9 @@ class ExcelCloseTool(BaseTool):
 
     async def _arun(self) -> None:
         """Async entry point for the tool."""
-        return self._impl()
+        await arun_in_executor(self._executor, self._timeout, self._excel_automation.close)
+        if self._on_close is not None:
+            self._on_close()
 
     @property
     def name(self) -> str:
@@ -301,18 +642,21 @@ class ExcelWriteCellTool(BaseTool):
 
     _excel_automation: ExcelAutomation = PrivateAttr()
     _executor: ThreadPoolExecutor = PrivateAttr()
+    _timeout: float = PrivateAttr()
 
-    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor):
+    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor,
+                 timeout: float = DEFAULT_TIMEOUT):
         """Constructor accepts an ExcelAutomation instance and a ThreadPoolExecutor."""
-        super().__init__(name=self.tool_name, description=self.tool_description)
+        super().__init__(name=self.tool_name, description=self.tool_description, handle_tool_error=True)
         self._excel_automation = excel_automation
         self._executor = executor
+        self._timeout = timeout
 
     def _impl(self, sheet_name: str, cell: str, value: str) -> dict:
         """Sync wrapper for the get_structure method."""
         # Use the ThreadPoolExecutor to ensure that xlwings interacts with Excel in a separate thread
-        future = self._executor.submit(self._excel_automation.write_cell,sheet_name, cell,value)
-        return future.result()
+        return run_in_executor(self._executor, self._timeout, self._excel_automation.write_cell,
+                               sheet_name, cell, value)
 
     def _run(self, sheet_name: str, cell: str,value:str) -> Any:
         """Sync entry point for the tool."""
@@ -320,7 +664,8 @@ class ExcelWriteCellTool(BaseTool):
 
     async def _arun(self, sheet_name: str, cell: str, value:str) -> Any:
         """Async entry point for the tool."""
-        return self._impl(sheet_name, cell,value)
+        return await arun_in_executor(self._executor, self._timeout, self._excel_automation.write_cell,
+                                      sheet_name, cell, value)
 
     @property
     def name(self) -> str:
@@ -333,6 +678,54 @@ class ExcelWriteCellTool(BaseTool):
         return self.tool_description
 
 
+class ExcelWriteRangeTool(BaseTool):
+    """Tool to write many values at once."""
+
+    tool_name: ClassVar[str] = "excel_write_range"
+    tool_description: ClassVar[str] = """Write a block of values in one call. Prefer this over repeated excel_change_cell_value calls.
+                    :param sheet_name: The name of the sheet.
+                    :param top_left_cell: Address of the top-left cell of the block, e.g. "B7".
+                    :param values: List of rows, each a list of values, e.g. [["Jan", 10], ["Feb", 12]].
+                                   To fill a column, pass one value per row: [[1], [2], [3]].
+        """
+
+    _excel_automation: ExcelAutomation = PrivateAttr()
+    _executor: ThreadPoolExecutor = PrivateAttr()
+    _timeout: float = PrivateAttr()
+
+    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor,
+                 timeout: float = DEFAULT_TIMEOUT):
+        """Constructor accepts an ExcelAutomation instance and a ThreadPoolExecutor."""
+        super().__init__(name=self.tool_name, description=self.tool_description, handle_tool_error=True)
+        self._excel_automation = excel_automation
+        self._executor = executor
+        self._timeout = timeout
+
+    def _impl(self, sheet_name: str, top_left_cell: str, values: List[List[Any]]) -> None:
+        """Sync wrapper for the write_range method."""
+        # Use the ThreadPoolExecutor to ensure that xlwings interacts with Excel in a separate thread
+        return run_in_executor(self._executor, self._timeout, self._excel_automation.write_range,
+                               sheet_name, top_left_cell, values)
+
+    def _run(self, sheet_name: str, top_left_cell: str, values: List[List[Any]]) -> Any:
+        """Sync entry point for the tool."""
+        return self._impl(sheet_name, top_left_cell, values)
+
+    async def _arun(self, sheet_name: str, top_left_cell: str, values: List[List[Any]]) -> Any:
+        """Async entry point for the tool."""
+        return await arun_in_executor(self._executor, self._timeout, self._excel_automation.write_range,
+                                      sheet_name, top_left_cell, values)
+
+    @property
+    def name(self) -> str:
+        """The name of the tool."""
+        return self.tool_name
+
+    @property
+    def description(self) -> str:
+        """A brief description of the tool's functionality."""
+        return self.tool_description
+
 class ExcelCellSearchTool(BaseTool):
     """Tool to search for cell values in an Excel workbook."""
 
@@ -341,32 +734,105 @@ class ExcelCellSearchTool(BaseTool):
     Parameters:
       - value: The value to search for.
       - sheet_name: The sheet to search in.
-      - search_whole_workbook: Whether to search the whole workbook (default: False)."""
+      - search_whole_workbook: Whether to search the whole workbook (default: False).
+      - match_mode: How to match the value (default: "exact"). Matching ignores case.
+          - "exact": the whole cell equals the value (2023 and "2023" are equal).
+          - "contains": the cell contains the value, e.g. "net income" finds "Net income (loss)".
+          - "wildcard": Excel-style pattern over the whole cell, * for any text and ? for one character, e.g. "Q? 2023".
+          - "regex": regular expression searched anywhere in the cell.
+    Returns a list of (sheet name, column, row) of the matching cells."""
 
     _excel_automation: ExcelAutomation = PrivateAttr()
     _executor: ThreadPoolExecutor = PrivateAttr()
+    _timeout: float = PrivateAttr()
+    _cache: Optional[ToolResultCache] = PrivateAttr()
 
-    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor):
-        super().__init__(name=self.tool_name, description=self.tool_description)
+    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 cache: ToolResultCache = None):
+        super().__init__(name=self.tool_name, description=self.tool_description, handle_tool_error=True)
         self._excel_automation = excel_automation
         self._executor = executor
+        self._timeout = timeout
+        self._cache = cache
 
-    def _impl(self, value: str, sheet_name: str = None, search_whole_workbook: bool = False) -> list[str]:
+    def _impl(self, value: str, sheet_name: str = None, search_whole_workbook: bool = False,
+              match_mode: str = "exact") -> list[str]:
         """Search for cells by exact or partial value."""
-        future = self._executor.submit(self._excel_automation.find_all_cells_by_value, value, sheet_name,
-                                       search_whole_workbook)
-        result = future.result()
+        return run_in_executor(self._executor, self._timeout, self._excel_automation.find_all_cells_by_value,
+                               value, sheet_name, search_whole_workbook, match_mode, read=True)
+
+    def _run(self, value: str, sheet_name: str = None, search_whole_workbook: bool = False,
+             match_mode: str = "exact") -> Any:
+        """Sync entry point for the tool."""
+        args = (value, sheet_name, search_whole_workbook, match_mode)
+        return cached_call(self._cache, self._excel_automation, self.tool_name, args, lambda: self._impl(*args))
+
+    async def _arun(self, value: str, sheet_name: str = None, search_whole_workbook: bool = False,
+                    match_mode: str = "exact") -> Any:
+        """Async entry point for the tool."""
+        args = (value, sheet_name, search_whole_workbook, match_mode)
+        return await acached_call(self._cache, self._excel_automation, self.tool_name, args, lambda: arun_in_executor(
+            self._executor, self._timeout, self._excel_automation.find_all_cells_by_value, *args, read=True))
+
+    @property
+    def name(self) -> str:
+        return self.tool_name
+
+    @property
+    def description(self) -> str:
+        return self.tool_description
 
 
-        return result
+class ExcelFormulaSearchTool(BaseTool):
+    """Tool to search for cells by the functions and references of their formulas."""
 
-    def _run(self, value: str, sheet_name: str = None, search_whole_workbook: bool = False) -> Any:
+    tool_name: ClassVar[str] = "excel_search_formula"
+    tool_description: ClassVar[str] = """Search for cells whose formula uses functions or references ranges.
+    Parameters:
+      - formula: Function names and cell references the formulas must all have, e.g.
+          - "VLOOKUP": formulas calling VLOOKUP.
+          - "Expenses!B:B": formulas referencing any cell of column B of sheet Expenses.
+          - "SUMIFS 'Cost of sales'!D7:D25": formulas calling SUMIFS on a range overlapping D7:D25.
+          - "Expenses": formulas referencing sheet Expenses.
+          - "Revenue" or "Revenue[JAN]": formulas referencing table Revenue (or its JAN column), by
+            structured reference or by address.
+        Words other than function, sheet and table names are rejected.
+        References without a sheet name refer to the sheet of the formula. A value starting with "="
+        finds the formulas containing that text instead, e.g. "=SUM(D7".
+      - sheet_name: The sheet to search in.
+      - search_whole_workbook: Whether to search the whole workbook (default: False).
+    Returns a list of (sheet name, column, row, formula) of the matching cells."""
+
+    _excel_automation: ExcelAutomation = PrivateAttr()
+    _executor: ThreadPoolExecutor = PrivateAttr()
+    _timeout: float = PrivateAttr()
+    _cache: Optional[ToolResultCache] = PrivateAttr()
+
+    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 cache: ToolResultCache = None):
+        super().__init__(name=self.tool_name, description=self.tool_description, handle_tool_error=True)
+        self._excel_automation = excel_automation
+        self._executor = executor
+        self._timeout = timeout
+        self._cache = cache
+
+    def _impl(self, formula: str, sheet_name: str = None, search_whole_workbook: bool = False) -> list:
+        """Search for cells by formula."""
+        return run_in_executor(self._executor, self._timeout, self._excel_automation.find_all_cells_by_formula,
+                               formula, sheet_name, search_whole_workbook, read=True)
+
+    def _run(self, formula: str, sheet_name: str = None, search_whole_workbook: bool = False) -> Any:
         """Sync entry point for the tool."""
-        return self._impl(value, sheet_name, search_whole_workbook)
+        args = (formula, sheet_name, search_whole_workbook)
+        return cached_call(self._cache, self._excel_automation, self.tool_name, args, lambda: self._impl(*args))
 
-    async def _arun(self, value: str, sheet_name: str = None, search_whole_workbook: bool = False) -> Any:
+    async def _arun(self, formula: str, sheet_name: str = None, search_whole_workbook: bool = False) -> Any:
         """Async entry point for the tool."""
-        return self._impl(value, sheet_name, search_whole_workbook)
+        args = (formula, sheet_name, search_whole_workbook)
+        return await acached_call(self._cache, self._excel_automation, self.tool_name, args, lambda: arun_in_executor(
+            self._executor, self._timeout, self._excel_automation.find_all_cells_by_formula, *args, read=True))
 
     @property
     def name(self) -> str:
@@ -386,38 +852,55 @@ class ExcelGetSheetOrRangeAsMarkdownTool(BaseTool):
         rather than the first row of data.
 
         Also adds a 'RowNumber' column with the actual Excel row indices.
-        
-        Note : DO NOT request large number of cells at a time. Limit to about 100 cells 
+
+        Large ranges are returned one page at a time. To get the next page, call the tool
+        again with cell_range set to the 'NextCursor' of the previous result.
         Note : At least 2 rows data should be extracted to get the column headers.
 
-    :param sheet_name: The name of the sheet to capture the screenshot.
-    :param cell_range: (optional) The range of cells to
-                capture the screenshot. Screenshot of whole sheet is captured if this parameter is not provided.
-    :return: Markdown Table.
+    :param sheet_name: The name of the sheet.
+    :param cell_range: (optional) The range of cells, or the 'NextCursor' of the previous page.
+                Whole sheet is returned if this parameter is not provided.
+    :param compact: (optional) If true, rows are returned as CSV lines. Trailing empty cells are left out,
+                and runs of empty rows or columns are shown once as their range, e.g. "12:30" or "E:H".
+                Uses fewer tokens for sparse ranges.
+    :return: A dictionary with 'Error', 'Content' (the table), 'PageRange' (the range covered)
+             and 'NextCursor' (the remaining range, empty on the last page).
     """
 
     _excel_automation: ExcelAutomation = PrivateAttr()
     _executor: ThreadPoolExecutor = PrivateAttr()
-
-    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor):
-        """Constructor accepts an image path and a ThreadPoolExecutor."""
-        super().__init__(name=self.tool_name, description=self.tool_description)
+    _timeout: float = PrivateAttr()
+    _cache: Optional[ToolResultCache] = PrivateAttr()
+    _max_tokens: int = PrivateAttr()
+
+    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor,
+                 max_tokens: int = DEFAULT_MAX_TOKENS, timeout: float = DEFAULT_TIMEOUT,
+                 cache: ToolResultCache = None):
+        """Constructor accepts an ExcelAutomation instance, a ThreadPoolExecutor and the token budget of a page."""
+        super().__init__(name=self.tool_name, description=self.tool_description, handle_tool_error=True)
         self._executor = executor
+        self._timeout = timeout
+        self._cache = cache
         self._excel_automation = excel_automation
+        self._max_tokens = max_tokens
 
-    def _impl(self, sheet_name: str, cell_range: str) -> dict:
-        """Sync wrapper for the get_structure method."""
+    def _impl(self, sheet_name: str, cell_range: str, compact: bool) -> dict:
+        """Sync wrapper for the get_range_page method."""
         # Use the ThreadPoolExecutor to ensure that xlwings interacts with Excel in a separate thread
-        future = self._executor.submit(self._excel_automation.get_range_as_markdown,sheet_name, cell_range)
-        return future.result()
+        return run_in_executor(self._executor, self._timeout, self._excel_automation.get_range_page,
+                               sheet_name, cell_range, self._max_tokens, compact, read=True)
 
-    def _run(self, sheet_name: str, cell_range: str) -> Any:
+    def _run(self, sheet_name: str, cell_range: str = None, compact: bool = False) -> Any:
         """Sync entry point for the tool."""
-        return self._impl(sheet_name, cell_range)
+        args = (sheet_name, cell_range, compact)
+        return cached_call(self._cache, self._excel_automation, self.tool_name, args, lambda: self._impl(*args))
 
-    async def _arun(self, sheet_name: str, cell_range: str) -> Any:
+    async def _arun(self, sheet_name: str, cell_range: str = None, compact: bool = False) -> Any:
         """Async entry point for the tool."""
-        return self._impl(sheet_name, cell_range)
+        args = (sheet_name, cell_range, compact)
+        return await acached_call(self._cache, self._excel_automation, self.tool_name, args, lambda: arun_in_executor(
+            self._executor, self._timeout, self._excel_automation.get_range_page,
+            sheet_name, cell_range, self._max_tokens, compact, read=True))
 
 class ExcelFindMetricValueTool(BaseTool):
     """Tool to find a financial metric value for a given time period in an Excel sheet."""
@@ -426,8 +909,10 @@ class ExcelFindMetricValueTool(BaseTool):
     tool_description: ClassVar[str] = """Find value of a temporal metric for a given time period in an Excel sheet.
     Parameters:
       - sheet_name: The name of the sheet to search in.
-      - metric_name: The name of the financial metric (e.g., "Net Income").
-      - time_period: The time period (e.g., "2023" or "Q3").
+      - metric_name: The name of the financial metric (e.g., "Net Income"). Use "Section > Metric"
+        (e.g., "Revenue > Total") to pick a row under a group label.
+      - time_period: The time period (e.g., "2023" or "Q3"). Give each header level of multi-level
+        headers (e.g., "Q3 2023") to pick a single column.
     Returns A dictionary with:
              - 'Error': An error message if no matches are found (empty string if no error).
              - 'Cells': A list of dictionaries, each containing:
@@ -441,26 +926,34 @@ class ExcelFindMetricValueTool(BaseTool):
 
     _excel_automation: ExcelAutomation = PrivateAttr()
     _executor: ThreadPoolExecutor = PrivateAttr()
+    _timeout: float = PrivateAttr()
+    _cache: Optional[ToolResultCache] = PrivateAttr()
 
-    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor):
+    def __init__(self, excel_automation: ExcelAutomation, executor: ThreadPoolExecutor,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 cache: ToolResultCache = None):
         """Constructor accepts an ExcelAutomation instance and a ThreadPoolExecutor."""
-        super().__init__(name=self.tool_name, description=self.tool_description)
+        super().__init__(name=self.tool_name, description=self.tool_description, handle_tool_error=True)
         self._excel_automation = excel_automation
         self._executor = executor
+        self._timeout = timeout
+        self._cache = cache
 
     def _impl(self, sheet_name: str, metric_name: str, time_period: str) -> Dict[str, Any]:
         """Sync wrapper for the find_metric_value method."""
-        future = self._executor.submit(self._excel_automation.find_metric_value, sheet_name, metric_name,
-                                       time_period)
-        return future.result()
+        return run_in_executor(self._executor, self._timeout, self._excel_automation.find_metric_value,
+                               sheet_name, metric_name, time_period, read=True)
 
     def _run(self, sheet_name: str, metric_name: str, time_period: str) -> Any:
         """Sync entry point for the tool."""
-        return self._impl(sheet_name, metric_name, time_period)
+        args = (sheet_name, metric_name, time_period)
+        return cached_call(self._cache, self._excel_automation, self.tool_name, args, lambda: self._impl(*args))
 
     async def _arun(self, sheet_name: str, metric_name: str, time_period: str) -> Any:
         """Async entry point for the tool."""
-        return self._impl(sheet_name, metric_name, time_period)
+        args = (sheet_name, metric_name, time_period)
+        return await acached_call(self._cache, self._excel_automation, self.tool_name, args, lambda: arun_in_executor(
+            self._executor, self._timeout, self._excel_automation.find_metric_value, *args, read=True))
 
     @property
     def name(self) -> str:
@@ -0,0 +1,345 @@
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from multiprocessing import shared_memory
+from typing import Any, Callable, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+from langchain_core.tools import ToolException
+
+from ExcelTamer.ExcelAutomation import ExcelAutomation
+from ExcelTamer.ExcelBackend import RangeData
+from ExcelTamer.SheetCache import SheetCache
+
+# Results with fewer cells are pickled, larger ones go through shared memory
+MIN_SHARED_CELLS = 10000
+# Seconds to wait for a worker process to open its workbook
+START_TIMEOUT = 120.0
+
+# Kinds of the cells of a shared grid
+_EMPTY, _NUMBER, _OTHER = 0, 1, 2
+
+
+class WorkerProcessError(ToolException):
+    """Raised when a worker process crashed or timed out; it is restarted before the error is raised."""
+
+
+class _SharedArray(NamedTuple):
+    """Reference to a NumPy array in a shared memory segment."""
+    name: str
+    dtype: str
+    shape: tuple
+
+
+class _SharedGrid(NamedTuple):
+    """2D list of cell values: numbers in a float64 array, other values pickled by position."""
+    numbers: _SharedArray
+    kinds: _SharedArray
+    others: dict
+
+
+class _SharedRangeData(NamedTuple):
+    grid: _SharedGrid
+    first_row: int
+    first_col: int
+    columns: list
+
+
+class _SharedFrame(NamedTuple):
+    """DataFrame with its numeric columns in shared memory and the other columns pickled."""
+    columns: list
+    index: Any
+    data: dict
+
+
+class _Segments:
+    """
+    Shared memory segments of one reply, named <prefix>_0, <prefix>_1, ... after the call, so
+    the parent can find and unlink them even if the reply never arrives.
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.created = []
+
+    def create(self, size: int) -> shared_memory.SharedMemory:
+        segment = shared_memory.SharedMemory(name=f"{self.prefix}_{len(self.created)}", create=True, size=size)
+        self.created.append(segment)
+        return segment
+
+    def close(self) -> None:
+        for segment in self.created:
+            segment.close()
+        self.created = []
+
+
+def _unlink(name: str) -> bool:
+    """Unlink a segment if it still exists."""
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    segment.close()
+    segment.unlink()
+    return True
+
+
+def _unlink_segments(prefix: str) -> None:
+    """Unlink the segments of a reply that was not loaded; they are created in sequence."""
+    index = 0
+    while _unlink(f"{prefix}_{index}"):
+        index += 1
+    if index:
+        logging.debug(f"Unlinked {index} shared memory segments of an unanswered call")
+
+
+def _share_array(array: np.ndarray, segments: _Segments) -> _SharedArray:
+    segment = segments.create(max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+    return _SharedArray(segment.name, array.dtype.str, array.shape)
+
+
+def _load_array(shared: _SharedArray) -> np.ndarray:
+    """Copy a shared array into process memory and release its segment."""
+    segment = shared_memory.SharedMemory(name=shared.name)
+    try:
+        return np.ndarray(shared.shape, dtype=np.dtype(shared.dtype), buffer=segment.buf).copy()
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+def _share_grid(values: list[list], segments: _Segments) -> _SharedGrid:
+    rows = len(values)
+    cols = len(values[0]) if rows else 0
+    numbers = np.zeros((rows, cols), dtype=np.float64)
+    kinds = np.zeros((rows, cols), dtype=np.uint8)
+    others = {}
+    for r, row_values in enumerate(values):
+        for c, value in enumerate(row_values):
+            if value is None:
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and float(value) == value:
+                numbers[r, c] = value
+                kinds[r, c] = _NUMBER
+            else:
+                others[(r, c)] = value
+                kinds[r, c] = _OTHER
+    return _SharedGrid(_share_array(numbers, segments), _share_array(kinds, segments), others)
+
+
+def _load_grid(grid: _SharedGrid) -> list[list]:
+    numbers = _load_array(grid.numbers).tolist()
+    kinds = _load_array(grid.kinds)
+    values = [[None] * kinds.shape[1] for _ in range(kinds.shape[0])]
+    for r, c in zip(*np.nonzero(kinds == _NUMBER)):
+        values[r][c] = numbers[r][c]
+    for (r, c), value in grid.others.items():
+        values[r][c] = value
+    return values
+
+
+def _encode(result: Any, segments: _Segments) -> Any:
+    """Move large 2D results to shared memory segments, created through segments."""
+    if isinstance(result, pd.DataFrame) and result.size >= MIN_SHARED_CELLS:
+        data = {}
+        for position, (_, column) in enumerate(result.items()):
+            numeric = isinstance(column.dtype, np.dtype) and column.dtype.kind in 'biufM'
+            data[position] = _share_array(column.to_numpy(), segments) if numeric else column.tolist()
+        return _SharedFrame(list(result.columns), result.index, data)
+    if isinstance(result, RangeData) and len(result.values) * len(result.columns) >= MIN_SHARED_CELLS:
+        return _SharedRangeData(_share_grid(result.values, segments), result.first_row, result.first_col,
+                                result.columns)
+    return result
+
+
+def _shared_names(payload: Any) -> list[str]:
+    """Names of the segments a reply refers to."""
+    if isinstance(payload, _SharedFrame):
+        return [column.name for column in payload.data.values() if isinstance(column, _SharedArray)]
+    if isinstance(payload, _SharedRangeData):
+        return [payload.grid.numbers.name, payload.grid.kinds.name]
+    return []
+
+
+def _decode(payload: Any) -> Any:
+    if isinstance(payload, _SharedFrame):
+        data = {position: _load_array(column) if isinstance(column, _SharedArray) else column
+                for position, column in payload.data.items()}
+        df = pd.DataFrame({position: data[position] for position in range(len(payload.columns))},
+                          index=payload.index)
+        df.columns = payload.columns
+        return df
+    if isinstance(payload, _SharedRangeData):
+        return RangeData(_load_grid(payload.grid), payload.first_row, payload.first_col, payload.columns)
+    return payload
+
+
+def _serve(conn, file_path: Optional[str], headless: bool, sheet_cache: Optional[SheetCache]) -> None:
+    """Worker process: open the workbook, then answer (method, args, kwargs) requests until None."""
+    try:
+        excel = ExcelAutomation.open_headless(file_path, sheet_cache=sheet_cache) if headless \
+            else ExcelAutomation(file_path=file_path, sheet_cache=sheet_cache)
+    except Exception as e:
+        conn.send(('error', RuntimeError(f"Failed to open workbook: {e!r}"), None))
+        return
+    conn.send(('ok', None, excel.version))
+
+    # Segments of the previous result stay open until the parent has copied them
+    segments = _Segments("")
+    while True:
+        request = conn.recv()
+        segments.close()
+        if request is None:
+            break
+        method, args, kwargs, prefix = request
+        segments = _Segments(prefix)
+        try:
+            reply = ('ok', _encode(getattr(excel, method)(*args, **kwargs), segments), excel.version)
+        except Exception as e:
+            reply = ('error', e, excel.version)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # The result or the exception could not be pickled
+            conn.send(('error', RuntimeError(f"{method} returned an unpicklable result: {e!r}"), excel.version))
+
+
+class ProcessExcelAutomation:
+    """
+    Proxy running ExcelAutomation in a child process, so a hung COM call or an
+    oversized read cannot take the agent process down.
+
+    Method calls are forwarded over a pipe and answered one at a time. Large DataFrames
+    and RangeData come back through shared memory rather than as pickled lists. A call
+    that exceeds the timeout kills the worker; a killed or crashed worker is restarted
+    (re-opening the workbook) and the call fails with WorkerProcessError.
+    """
+
+    def __init__(self, file_path: str = None, headless: bool = False, timeout: Optional[float] = None,
+                 start_method: str = 'spawn', sheet_cache: SheetCache = None):
+        """
+        :param headless: Open the workbook with XlsxFileBackend in the worker.
+        :param sheet_cache: On-disk sheet cache used by the worker's ExcelAutomation. It also spares
+                            a restarted worker reading the workbook again.
+        :param timeout: Seconds a call may take before the worker is restarted, None to wait indefinitely.
+        :param start_method: multiprocessing start method. 'spawn' gives COM a fresh process.
+        """
+        self.file_path = os.path.abspath(file_path) if file_path else None
+        self.headless = headless
+        self.timeout = timeout
+        self.sheet_cache = sheet_cache
+        self._context = multiprocessing.get_context(start_method)
+        self._lock = threading.Lock()
+        self._process = None
+        self._conn = None
+        self._generation = 0
+        self._version = None
+        # Like ExcelAutomation.session; version tells apart the restarts of the worker
+        self.session = uuid.uuid4().hex
+        self._calls = 0
+        # Name prefix of the segments of the call in progress, unlinked if its reply is not loaded
+        self._pending_segments = None
+        self._start()
+
+    def _start(self) -> None:
+        self._conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(target=_serve, args=(child_conn, self.file_path, self.headless, self.sheet_cache),
+                                              name="excel-worker", daemon=True)
+        self._process.start()
+        child_conn.close()
+        status, error, self._version = self._receive(START_TIMEOUT, "opening the workbook")
+        self._generation += 1
+        if status == 'error':
+            self._stop()
+            raise error
+        logging.debug(f"Started worker process {self._process.pid} for '{self.file_path}'")
+
+    def _stop(self) -> None:
+        if self._process.is_alive():
+            self._process.kill()
+        self._process.join()
+        self._conn.close()
+        if self._pending_segments is not None:
+            _unlink_segments(self._pending_segments)
+            self._pending_segments = None
+
+    def restart(self) -> None:
+        with self._lock:
+            self._stop()
+            self._start()
+
+    def _receive(self, timeout: Optional[float], what: str) -> tuple:
+        """Wait for the worker's reply, stopping the worker if it timed out or died."""
+        try:
+            if not self._conn.poll(timeout):
+                raise TimeoutError(f"Worker process did not complete {what} within {timeout} seconds")
+            return self._conn.recv()
+        except (EOFError, OSError, TimeoutError) as e:
+            message = str(e)
+            self._process.join(timeout=1 if not isinstance(e, TimeoutError) else 0)
+            if self._process.exitcode is not None:
+                message = f"Worker process exited with code {self._process.exitcode} while {what}"
+            self._stop()
+            raise WorkerProcessError(message)
+
+    def call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Call a method of the ExcelAutomation in the worker process."""
+        with self._lock:
+            if not self._process.is_alive():
+                self._stop()
+                self._start()
+            self._calls += 1
+            # Short names: macOS limits shared memory names to 31 characters
+            self._pending_segments = f"xt{os.getpid()}_{self._generation}_{self._calls}"
+            try:
+                try:
+                    self._conn.send((method, args, kwargs, self._pending_segments))
+                except OSError:
+                    # The worker died since the last call, _receive reports how
+                    pass
+                status, payload, self._version = self._receive(self.timeout, method)
+            except WorkerProcessError:
+                logging.warning(f"Restarting worker process for '{self.file_path}' after {method} failed")
+                self._start()
+                raise
+            self._pending_segments = None
+        if status == 'error':
+            raise payload
+        try:
+            return _decode(payload)
+        finally:
+            # Segments left by a decode that failed part way
+            for name in _shared_names(payload):
+                _unlink(name)
+
+    @property
+    def version(self) -> tuple:
+        """
+        ExcelAutomation.version of the worker as of its last reply, tagged with the number of
+        worker starts, since a restarted worker counts versions from 0 again.
+        """
+        return self._generation, self._version
+
+    def __getattr__(self, name: str) -> Callable:
+        if name.startswith('_') or not callable(getattr(ExcelAutomation, name, None)):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        method.__name__ = name
+        method.__qualname__ = f"{type(self).__name__}.{name}"
+        return method
+
+    def shutdown(self) -> None:
+        """Ask the worker process to exit and wait for it."""
+        with self._lock:
+            try:
+                self._conn.send(None)
+                self._process.join(timeout=5)
+            except OSError:
+                pass
+            self._stop()
@@ -0,0 +1,174 @@
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Optional
+
+# Request priorities, lower runs first
+INTERACTIVE = 0
+BACKGROUND = 10
+# Calls queued or running on one workbook
+MAX_QUEUE_DEPTH = 64
+
+
+class WorkerQueueFullError(RuntimeError):
+    """Raised when a call is submitted to a workbook whose queue is full."""
+
+
+class DeadlineExceededError(concurrent.futures.TimeoutError):
+    """Set on a request that was still queued when its deadline passed."""
+
+
+class _Request:
+    def __init__(self, key, fn: Callable, args: tuple, read: bool, priority: int, deadline: Optional[float]):
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.read = read
+        self.priority = priority
+        self.deadline = deadline
+        self.started = False
+        # One future per caller; the request runs as long as one of them is still waiting
+        self.subscribers: list[Future] = []
+
+
+class RequestScheduler(Executor):
+    """
+    Queue in front of a workbook executor.
+
+    - Identical reads (same method, same arguments) in flight are coalesced: later
+      callers wait for the first one's result instead of queuing another call.
+    - Queued requests are dispatched by priority (INTERACTIVE before BACKGROUND),
+      then in arrival order, keeping at most max_in_flight calls on the executor.
+    - A request still queued when its deadline passes is dropped, failing with
+      DeadlineExceededError; one whose callers have all cancelled is dropped silently.
+    """
+
+    def __init__(self, executor: Executor, max_in_flight: int = 1, max_queue_depth: int = MAX_QUEUE_DEPTH):
+        self._executor = executor
+        self._max_in_flight = max_in_flight
+        self._max_queue_depth = max_queue_depth
+        # Reentrant: a done callback may run synchronously from within _dispatch
+        self._lock = threading.RLock()
+        self._queue: list[tuple[int, int, _Request]] = []
+        self._in_flight: dict[Any, _Request] = {}
+        self._running = 0
+        self._sequence = itertools.count()
+        self.coalesced = 0
+        self.expired = 0
+
+    @staticmethod
+    def _request_key(fn: Callable, args: tuple):
+        owner = getattr(fn, '__self__', None)
+        return id(owner), getattr(fn, '__qualname__', repr(fn)), repr(args)
+
+    def schedule(self, fn: Callable, args: tuple = (), read: bool = False, priority: int = INTERACTIVE,
+                 deadline: Optional[float] = None) -> Future:
+        """
+        Queue a call and return a future for its result.
+
+        :param read: True if fn only reads the workbook; such calls may be coalesced and run concurrently.
+        :param priority: INTERACTIVE or BACKGROUND (or any int, lower runs first).
+        :param deadline: time.monotonic() value after which the call is dropped if it has not started.
+        """
+        future = Future()
+        key = self._request_key(fn, args) if read else None
+        with self._lock:
+            request = self._in_flight.get(key) if key is not None else None
+            if request is not None:
+                self.coalesced += 1
+                if request.started:
+                    future.set_running_or_notify_cancel()
+                elif priority < request.priority:
+                    # Promote the queued request; the stale heap entry is skipped when popped
+                    request.priority = priority
+                    heapq.heappush(self._queue, (priority, next(self._sequence), request))
+                if request.deadline is not None:
+                    request.deadline = None if deadline is None else max(request.deadline, deadline)
+                request.subscribers.append(future)
+                return future
+
+            if len(self._queue) + self._running >= self._max_queue_depth:
+                raise WorkerQueueFullError(
+                    f"{len(self._queue) + self._running} requests are pending on the workbook, try again later")
+            request = _Request(key, fn, args, read, priority, deadline)
+            request.subscribers.append(future)
+            if key is not None:
+                self._in_flight[key] = request
+            heapq.heappush(self._queue, (priority, next(self._sequence), request))
+            self._dispatch()
+        return future
+
+    def _dispatch(self) -> None:
+        """Start queued requests while there is room; called with the lock held."""
+        while self._queue and self._running < self._max_in_flight:
+            priority, _, request = heapq.heappop(self._queue)
+            if request.started or priority != request.priority:
+                continue
+            request.subscribers = [future for future in request.subscribers if not future.cancelled()]
+            if not request.subscribers:
+                self._forget(request)
+                continue
+            if request.deadline is not None and time.monotonic() > request.deadline:
+                self.expired += 1
+                self._forget(request)
+                logging.debug(f"Dropped {getattr(request.fn, '__name__', request.fn)}, deadline passed in the queue")
+                for future in request.subscribers:
+                    if future.set_running_or_notify_cancel():
+                        future.set_exception(DeadlineExceededError("Request expired before it could start"))
+                continue
+
+            request.started = True
+            request.subscribers = [future for future in request.subscribers if future.set_running_or_notify_cancel()]
+            self._running += 1
+            submit = getattr(self._executor, 'submit_read', self._executor.submit) if request.read \
+                else self._executor.submit
+            try:
+                inner = submit(request.fn, *request.args)
+            except Exception as e:
+                self._running -= 1
+                self._forget(request)
+                for future in request.subscribers:
+                    future.set_exception(e)
+                continue
+            inner.add_done_callback(lambda done, request=request: self._finished(request, done))
+
+    def _forget(self, request: _Request) -> None:
+        if request.key is not None and self._in_flight.get(request.key) is request:
+            del self._in_flight[request.key]
+
+    def _finished(self, request: _Request, inner: Future) -> None:
+        with self._lock:
+            self._running -= 1
+            self._forget(request)
+            subscribers = list(request.subscribers)
+            self._dispatch()
+        error = inner.exception()
+        for future in subscribers:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(inner.result())
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        if kwargs:
+            return self.schedule(lambda: fn(*args, **kwargs))
+        return self.schedule(fn, args)
+
+    def submit_read(self, fn: Callable, /, *args) -> Future:
+        return self.schedule(fn, args, read=True)
+
+    def submit_background(self, fn: Callable, /, *args, read: bool = False) -> Future:
+        """Queue work no caller is waiting on, e.g. warming caches; it yields to interactive requests."""
+        return self.schedule(fn, args, read=read, priority=BACKGROUND)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        if cancel_futures:
+            with self._lock:
+                for _, _, request in self._queue:
+                    for future in request.subscribers:
+                        future.cancel()
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
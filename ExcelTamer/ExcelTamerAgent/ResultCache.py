@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+# Default limits: number of results, and their total size in characters of repr()
+MAX_ENTRIES = 256
+MAX_SIZE = 16 * 1024 * 1024
+
+
+def _freeze(value: Any) -> Hashable:
+    """Hashable form of tool arguments, e.g. lists of cells become tuples."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class ToolResultCache:
+    """
+    LRU cache of tool results, keyed on (tool name, normalized arguments, workbook version).
+
+    ExcelAutomation.version changes on every write, sheet change and save under a new
+    name, so entries of earlier versions are never hit again and age out of the LRU.
+    Entries are evicted least recently used first once either max_entries or max_size
+    (the summed length of the results' repr) is exceeded.
+
+    Cached results are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_size: int = MAX_SIZE):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(tool_name: str, args: tuple, version: Hashable) -> Hashable:
+        return tool_name, _freeze(args), version
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        """Return (True, result) on a hit, (False, None) on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key: Hashable, result: Any) -> None:
+        size = len(repr(result))
+        if size > self.max_size:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (result, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, tool_name: str, args: tuple, version: Hashable, compute: Callable[[], Any]) -> Any:
+        key = self.key(tool_name, args, version)
+        hit, result = self.get(key)
+        if not hit:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    async def aget_or_compute(self, tool_name: str, args: tuple, version: Hashable,
+                              compute: Callable[[], Awaitable[Any]]) -> Any:
+        key = self.key(tool_name, args, version)
+        hit, result = self.get(key)
+        if not hit:
+            result = await compute()
+            self.put(key, result)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'Entries': len(self._entries),
+                'Size': self._size,
+                'Hits': self.hits,
+                'Misses': self.misses,
+                'Evictions': self.evictions,
+                'HitRate': self.hits / lookups if lookups else 0.0,
+            }
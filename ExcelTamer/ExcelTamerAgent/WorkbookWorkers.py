@@ -0,0 +1,268 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from ExcelTamer.ExcelTamerAgent.RequestScheduler import MAX_QUEUE_DEPTH, RequestScheduler, WorkerQueueFullError
+
+# Threads serving concurrent reads of a headless workbook
+READ_WORKERS = 4
+# Seconds without calls after which the threads of a headless workbook are stopped
+IDLE_TIMEOUT = 300.0
+
+
+class _ReadWriteLock:
+    """Many readers or one writer."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+
+    def acquire_read(self) -> None:
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self) -> None:
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self) -> None:
+        with self._condition:
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writing = True
+
+    def release_write(self) -> None:
+        with self._condition:
+            self._writing = False
+            self._condition.notify_all()
+
+
+class WorkbookExecutor(Executor):
+    """
+    Executor dedicated to one workbook.
+
+    submit() runs calls on the workbook's own apartment thread, one at a time. With
+    concurrent_reads (headless workbooks, which have no thread affinity), submit_read()
+    runs read-only calls on a pool of threads, concurrently with each other but never with
+    a submit() call; otherwise submit_read() is the same as submit().
+
+    At most max_queue_depth calls may be queued or running; further submits raise
+    WorkerQueueFullError instead of growing the backlog.
+
+    ExcelAutomation methods that do not write are safe under the read lock: get_snapshot and
+    the queries answered from snapshots (read_cell, query_cell(s), find_all_cells_by_value /
+    _by_formula, find_metric_value(s), workbook_identity), get_structure, get_data_range(s),
+    get_range_page and the iter_range_* / screenshot methods. What they build lazily (snapshots,
+    structure, value, label and formula indexes, display texts) is built under per-sheet locks.
+    Some of them send buffered writes first (flush); concurrent reads are only meant for
+    headless workbooks, which are read-only, so there is never anything to send.
+    """
+
+    def __init__(self, name: str, concurrent_reads: bool = False, read_workers: int = READ_WORKERS,
+                 max_queue_depth: int = MAX_QUEUE_DEPTH):
+        self.name = name
+        self.concurrent_reads = concurrent_reads
+        self._read_workers = read_workers
+        self._max_queue_depth = max_queue_depth
+        self._lock = threading.Lock()
+        self._rw_lock = _ReadWriteLock()
+        self._apartment = None
+        self._readers = None
+        self._pending = 0
+        self._last_used = time.monotonic()
+        self._shutdown = False
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def idle_seconds(self) -> float:
+        """Seconds since the last call completed, 0 while calls are pending."""
+        return 0.0 if self._pending else time.monotonic() - self._last_used
+
+    def _reserve(self) -> None:
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError(f"Worker for workbook '{self.name}' was shut down")
+            if self._pending >= self._max_queue_depth:
+                raise WorkerQueueFullError(
+                    f"Worker for workbook '{self.name}' has {self._pending} calls pending, try again later")
+            self._pending += 1
+
+    def _done(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._last_used = time.monotonic()
+
+    def _guarded(self, acquire: Callable, release: Callable, fn: Callable, args, kwargs) -> Callable:
+        if not self.concurrent_reads:
+            # A single thread runs every call, nothing to exclude
+            return lambda: fn(*args, **kwargs)
+
+        def call():
+            acquire()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                release()
+        return call
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        self._reserve()
+        with self._lock:
+            if self._apartment is None:
+                self._apartment = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"workbook-{self.name}")
+            apartment = self._apartment
+        future = apartment.submit(self._guarded(self._rw_lock.acquire_write, self._rw_lock.release_write,
+                                                fn, args, kwargs))
+        future.add_done_callback(self._done)
+        return future
+
+    def submit_read(self, fn: Callable, /, *args, **kwargs) -> Future:
+        """Submit a call that only reads the workbook."""
+        if not self.concurrent_reads:
+            return self.submit(fn, *args, **kwargs)
+        self._reserve()
+        with self._lock:
+            if self._readers is None:
+                self._readers = ThreadPoolExecutor(max_workers=self._read_workers,
+                                                   thread_name_prefix=f"workbook-{self.name}-read")
+            readers = self._readers
+        future = readers.submit(self._guarded(self._rw_lock.acquire_read, self._rw_lock.release_read,
+                                              fn, args, kwargs))
+        future.add_done_callback(self._done)
+        return future
+
+    def stop_threads(self) -> bool:
+        """
+        Stop the threads of an idle worker with concurrent reads; they are started again
+        by the next call. Returns False if the worker is busy or bound to its apartment thread.
+        """
+        with self._lock:
+            if not self.concurrent_reads or self._pending:
+                return False
+            pools, self._apartment, self._readers = (self._apartment, self._readers), None, None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=False)
+        return True
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._lock:
+            self._shutdown = True
+            pools = (self._apartment, self._readers)
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+class WorkerManager:
+    """
+    Hands out one WorkbookExecutor per workbook, so calls on different workbooks run in
+    parallel while calls on the same COM workbook stay on the thread that opened it.
+
+    Workbooks are keyed by absolute path (None stands for the active Excel workbook) and by
+    whether reads run concurrently, so a COM workbook never gets the reader threads of a
+    headless one opened from the same file. Each executor_for() call adds a user, and the last
+    release() shuts the worker down.
+    Headless workers idle for idle_timeout seconds have their threads stopped. A COM
+    worker keeps its thread until release(), since COM objects cannot move to another
+    thread.
+    """
+
+    def __init__(self, read_workers: int = READ_WORKERS, max_queue_depth: int = MAX_QUEUE_DEPTH,
+                 idle_timeout: Optional[float] = IDLE_TIMEOUT):
+        self._read_workers = read_workers
+        self._max_queue_depth = max_queue_depth
+        self._idle_timeout = idle_timeout
+        self._workers: dict[tuple[Optional[str], bool], WorkbookExecutor] = {}
+        self._schedulers: dict[tuple[Optional[str], bool], RequestScheduler] = {}
+        self._users: dict[tuple[Optional[str], bool], int] = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    @staticmethod
+    def workbook_key(excel_path: Optional[str]) -> Optional[str]:
+        return os.path.normcase(os.path.abspath(excel_path)) if excel_path else None
+
+    def executor_for(self, excel_path: Optional[str], concurrent_reads: bool = False) -> WorkbookExecutor:
+        """
+        Return the executor of a workbook, creating it on first use.
+
+        :param concurrent_reads: Allow reads on several threads. Only for headless workbooks.
+        """
+        path = self.workbook_key(excel_path)
+        key = (path, concurrent_reads)
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is None:
+                name = os.path.basename(path) if path else "active"
+                worker = WorkbookExecutor(name, concurrent_reads, self._read_workers, self._max_queue_depth)
+                self._workers[key] = worker
+                logging.debug(f"Started worker for workbook '{name}'")
+            self._users[key] = self._users.get(key, 0) + 1
+            self._start_reaper()
+        return worker
+
+    def scheduler_for(self, excel_path: Optional[str], concurrent_reads: bool = False) -> RequestScheduler:
+        """
+        Return the RequestScheduler in front of the executor of a workbook, shared by all
+        agents working on it so their identical reads are coalesced.
+        """
+        executor = self.executor_for(excel_path, concurrent_reads)
+        key = (self.workbook_key(excel_path), concurrent_reads)
+        with self._lock:
+            scheduler = self._schedulers.get(key)
+            if scheduler is None:
+                max_in_flight = self._read_workers if executor.concurrent_reads else 1
+                scheduler = RequestScheduler(executor, max_in_flight, self._max_queue_depth)
+                self._schedulers[key] = scheduler
+        return scheduler
+
+    def release(self, excel_path: Optional[str], concurrent_reads: bool = False, wait: bool = False) -> None:
+        """Drop a user of the worker of a workbook, e.g. after closing it; the last one shuts it down."""
+        key = (self.workbook_key(excel_path), concurrent_reads)
+        with self._lock:
+            users = self._users.get(key, 0) - 1
+            if users > 0:
+                self._users[key] = users
+                return
+            self._users.pop(key, None)
+            self._schedulers.pop(key, None)
+            worker = self._workers.pop(key, None)
+        if worker is not None:
+            worker.shutdown(wait=wait)
+
+    def stop_idle_threads(self) -> None:
+        """Stop the threads of headless workers idle for longer than idle_timeout."""
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            if worker.idle_seconds() > self._idle_timeout and worker.stop_threads():
+                logging.debug(f"Stopped idle threads of workbook '{worker.name}'")
+
+    def _start_reaper(self) -> None:
+        if self._idle_timeout is None or self._reaper is not None:
+            return
+
+        def reap():
+            while True:
+                time.sleep(self._idle_timeout / 2)
+                self.stop_idle_threads()
+
+        self._reaper = threading.Thread(target=reap, name="workbook-worker-reaper", daemon=True)
+        self._reaper.start()
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            workers, self._workers, self._schedulers, self._users = list(self._workers.values()), {}, {}, {}
+        for worker in workers:
+            worker.shutdown(wait=wait)
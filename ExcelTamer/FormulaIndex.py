@@ -0,0 +1,266 @@
+import re
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from ExcelTamer.CellAddress import MAX_COLUMNS, MAX_ROWS, CellRange, parse_range
+from ExcelTamer.ExcelFunctions import EXCEL_FUNCTIONS
+
+# Tokens of a formula: string literals, references with an optional sheet, structured references to a
+# table (Revenue[JAN], tblExpenses[[#This Row],[JAN]:[DEC]], or [@JAN] inside the table), function
+# calls and names.
+# A reference must not continue an identifier or number (3E10, LOG10( and XABC1 are not references),
+# nor may a name or function (the E10 of 3E10 is part of the number).
+_TOKEN_RE = re.compile(r"""
+    (?P<string>"(?:[^"]|"")*")
+  | (?<![\w.$'!])(?P<reference>
+        (?:(?P<sheet>'(?:[^']|'')+'|[\w.\[\]]+)!)?
+        (?P<area>\$?[A-Za-z]{1,3}\$?\d+(?::\$?[A-Za-z]{1,3}\$?\d+)?
+               | \$?[A-Za-z]{1,3}:\$?[A-Za-z]{1,3}
+               | \$?\d+:\$?\d+)
+    )(?![\w.(!:$\[])
+  | (?P<structured>(?:(?<![\w.])(?P<table>[A-Za-z_\\][\w.]*))?
+        (?P<specifier>\[(?:[^\[\]']|'.|\[(?:[^\[\]']|'.)*\])*\]))
+  | (?<![\w.])(?P<function>[A-Za-z_][\w.]*)\s*\(
+  | (?<![\w.])(?P<name>[A-Za-z_\\][\w.]*)
+""", re.VERBOSE)
+# The bracketed items of a structured reference's specifier, e.g. [#Totals] and [JAN] in [[#Totals],[JAN]]
+_SPECIFIER_ITEM_RE = re.compile(r"\[((?:[^\[\]']|'.)*)\]")
+# Special characters of column names are escaped with ' in structured references
+_ESCAPE_RE = re.compile(r"'(.)")
+# Prefixes of functions newer than the file format, e.g. _xlfn.XLOOKUP
+_FUNCTION_PREFIXES = ('_XLFN.', '_XLWS.', '_XLL.')
+# The sheet, as a range
+_WHOLE_SHEET = CellRange(1, 1, MAX_ROWS, MAX_COLUMNS)
+
+
+def normalize_sheet(sheet_name: str) -> str:
+    """Sheet names are case-insensitive; quoted names ('My Sheet') are unquoted."""
+    if sheet_name.startswith("'") and sheet_name.endswith("'"):
+        sheet_name = sheet_name[1:-1].replace("''", "'")
+    return sheet_name.casefold()
+
+
+def normalize_function(name: str) -> str:
+    name = name.upper()
+    for prefix in _FUNCTION_PREFIXES:
+        if name.startswith(prefix):
+            return name[len(prefix):]
+    return name
+
+
+def _parse_area(area: str) -> Optional[CellRange]:
+    """The range of a reference's address, None if it lies outside the sheet (e.g. a name like ZZZZ1)."""
+    try:
+        return parse_range(area)
+    except ValueError:
+        return None
+
+
+class TableDefinition(NamedTuple):
+    """A table of the workbook, to resolve the structured references to it."""
+    name: str
+    sheet_name: str
+    bounds: CellRange
+    columns: tuple
+    header_rows: int
+    totals_rows: int
+
+    @classmethod
+    def from_info(cls, info: dict) -> "TableDefinition":
+        """From an entry of ExcelBackend.list_tables."""
+        return cls(info['Name'], info['Sheet'], parse_range(info['Range']),
+                   tuple(str(column).casefold() for column in info['Columns']),
+                   info['Header Rows'], info['Totals Rows'])
+
+    def _rows(self, specifiers: list[str]) -> Optional[tuple[int, int]]:
+        first, last = self.bounds.first_row, self.bounds.last_row
+        data = (first + self.header_rows, last - self.totals_rows)
+        # [#This Row] depends on the formula's cell, a formula is indexed once for all its cells
+        spans = {'#ALL': (first, last), '#DATA': data, '#THIS ROW': data,
+                 '#HEADERS': (first, first + self.header_rows - 1),
+                 '#TOTALS': (last - self.totals_rows + 1, last)}
+        spans = [spans.get(specifier) for specifier in specifiers or ['#DATA']]
+        spans = [span for span in spans if span is not None and span[0] <= span[1]]
+        if not spans:
+            return None
+        return min(first for first, _ in spans), max(last for _, last in spans)
+
+    def resolve(self, specifier: str) -> Optional[CellRange]:
+        """
+        The range of a structured reference to the table, from its bracketed specifier
+        ('' for the table name alone), None if it refers to no cell or to an unknown column.
+        Several columns give the range from the first to the last.
+        """
+        inner = specifier[1:-1].strip() if specifier else ''
+        rows = []
+        if inner.startswith('@'):
+            rows.append('#THIS ROW')
+            inner = inner[1:].strip()
+        items = _SPECIFIER_ITEM_RE.findall(inner) if inner.startswith('[') else [inner] if inner else []
+        columns = []
+        for item in (item.strip() for item in items):
+            if item.startswith('#'):
+                rows.append(item.upper())
+            elif _ESCAPE_RE.sub(r"\1", item).casefold() in self.columns:
+                columns.append(self.columns.index(_ESCAPE_RE.sub(r"\1", item).casefold()))
+            else:
+                return None
+        row_span = self._rows(rows)
+        if row_span is None:
+            return None
+        first_col = self.bounds.first_col + min(columns) if columns else self.bounds.first_col
+        last_col = self.bounds.first_col + max(columns) if columns else self.bounds.last_col
+        return CellRange(row_span[0], first_col, row_span[1], last_col)
+
+
+def tokenize_formula(formula: str, tables: dict[str, TableDefinition] = None
+                     ) -> tuple[set[str], list[tuple[Optional[str], CellRange]], set[str], set[str]]:
+    """
+    Split a formula into the functions it calls, the ranges it references, the tables it refers to
+    by name and the other names it uses.
+
+    :param tables: The workbook's tables by case-folded name. Structured references to them (and
+                   their bare names) are resolved to ranges.
+    :return: (function names, [(normalized sheet name or None for the formula's own sheet, range)],
+             table names, names). Function names are upper case, without the _xlfn. prefix of newer
+             functions; table names and names are upper case.
+    """
+    tables = tables or {}
+    functions, references, table_names, names = set(), [], set(), set()
+    for match in _TOKEN_RE.finditer(formula):
+        if match.group('reference'):
+            bounds = _parse_area(match.group('area'))
+            if bounds is not None:
+                sheet = match.group('sheet')
+                references.append((normalize_sheet(sheet) if sheet else None, bounds))
+            elif not match.group('sheet'):
+                names.add(match.group('reference').upper())
+        elif match.group('structured') or match.group('name'):
+            # [@JAN] without a table name refers to the formula's own table, which is not known here
+            name = match.group('table') or match.group('name')
+            if not name:
+                continue
+            table = tables.get(name.casefold())
+            if table is None and match.group('name'):
+                names.add(name.upper())
+                continue
+            table_names.add(name.upper())
+            bounds = table.resolve(match.group('specifier') or '') if table is not None else None
+            if bounds is not None:
+                references.append((normalize_sheet(table.sheet_name), bounds))
+        elif match.group('function'):
+            functions.add(normalize_function(match.group('function')))
+    return functions, references, table_names, names
+
+
+class FormulaQuery(NamedTuple):
+    """
+    What a formula search looks for: formulas calling all the functions, referencing (overlapping)
+    all the ranges and referring to all the tables by name, or, for a query starting with '=',
+    formulas containing the text.
+    """
+    functions: frozenset
+    references: tuple
+    tables: frozenset
+    text: Optional[str]
+
+    @classmethod
+    def parse(cls, query: str, sheet_names: list[str] = (),
+              tables: dict[str, TableDefinition] = None) -> "FormulaQuery":
+        """
+        Parse a query such as "VLOOKUP", "SUMIFS Expenses!B:B", "'Cost of sales'!D26", "Revenue[JAN]"
+        or "=SUM(D7:D25)".
+        Bare names must be Excel function names, sheet names, which stand for the whole sheet, or table
+        names, which stand for the table's data. References without a sheet refer to the sheet of the
+        formula. Structured references to a table are resolved to its range, or, for a table that is
+        not known, match the formulas referring to it by name.
+        """
+        query = query.strip()
+        if query.startswith('='):
+            return cls(frozenset(), (), frozenset(), query.casefold())
+        sheets = {normalize_sheet(sheet_name): sheet_name for sheet_name in sheet_names}
+        if normalize_sheet(query) in sheets:
+            # A sheet name alone, possibly quoted ('Cost of sales')
+            return cls(frozenset(), ((normalize_sheet(query), _WHOLE_SHEET),), frozenset(), None)
+        tables = tables or {}
+        functions, references, table_names, names = tokenize_formula(query, tables)
+        for name in names:
+            if name.casefold() in sheets:
+                references.append((name.casefold(), _WHOLE_SHEET))
+            elif normalize_function(name) in EXCEL_FUNCTIONS:
+                functions.add(normalize_function(name))
+            else:
+                raise ValueError(f"'{name}' in formula query '{query}' is not a function, sheet or table name")
+        # Known tables are matched by their range, which also finds references to it by address
+        table_names = {name for name in table_names if name.casefold() not in tables}
+        if not functions and not references and not table_names:
+            raise ValueError(f"No function name or cell reference found in formula query '{query}'")
+        return cls(frozenset(functions), tuple(references), frozenset(table_names), None)
+
+
+class FormulaIndex:
+    """
+    Functions and references of the formulas of one sheet, for formula searches without re-reading
+    or re-parsing formulas.
+
+    Formulas are identified by their code in the sheet's string table, and each distinct formula
+    is tokenized once. References are held per referenced sheet as arrays of range bounds, so
+    finding the formulas referencing a range is one vectorized overlap test. Structured references
+    are held both as the ranges they resolve to and under the name of their table.
+    """
+
+    def __init__(self, sheet_name: str, strings: list[str], formula_codes: np.ndarray,
+                 tables: dict[str, TableDefinition] = None):
+        self.sheet_name = sheet_name
+        self._strings = strings
+        self._formula_codes = formula_codes
+        self.functions: dict[str, list[int]] = {}
+        self.tables: dict[str, list[int]] = {}
+        reference_codes: dict[str, list[int]] = {}
+        reference_bounds: dict[str, list[CellRange]] = {}
+        own_sheet = normalize_sheet(sheet_name)
+        self.codes = [code for code in np.unique(formula_codes).tolist()
+                      if code >= 0 and strings[code].startswith('=')]
+        for code in self.codes:
+            functions, references, table_names, _ = tokenize_formula(strings[code], tables)
+            for function in functions:
+                self.functions.setdefault(function, []).append(code)
+            for table_name in table_names:
+                self.tables.setdefault(table_name, []).append(code)
+            for sheet, bounds in references:
+                sheet = sheet or own_sheet
+                reference_codes.setdefault(sheet, []).append(code)
+                reference_bounds.setdefault(sheet, []).append(bounds)
+        # Bounds (first row, first column, last row, last column) of each reference to a sheet, and its formula
+        self.references = {sheet: (np.array(reference_bounds[sheet], dtype=np.int64).reshape(-1, 4),
+                                   np.array(codes, dtype=np.int32))
+                           for sheet, codes in reference_codes.items()}
+
+    def _referencing(self, sheet: str, bounds: CellRange) -> set[int]:
+        if sheet not in self.references:
+            return set()
+        ranges, codes = self.references[sheet]
+        overlaps = ((ranges[:, 0] <= bounds.last_row) & (ranges[:, 2] >= bounds.first_row)
+                    & (ranges[:, 1] <= bounds.last_col) & (ranges[:, 3] >= bounds.first_col))
+        return set(codes[overlaps].tolist())
+
+    def match(self, query: FormulaQuery) -> list[int]:
+        """Codes of the formulas matching the query."""
+        if query.text is not None:
+            return [code for code in self.codes if query.text in self._strings[code].casefold()]
+        matches = set(self.codes)
+        for function in query.functions:
+            matches &= set(self.functions.get(function, ()))
+        for table_name in query.tables:
+            matches &= set(self.tables.get(table_name, ()))
+        for sheet, bounds in query.references:
+            matches &= self._referencing(sheet or normalize_sheet(self.sheet_name), bounds)
+        return sorted(matches)
+
+    def cells(self, query: FormulaQuery) -> tuple[np.ndarray, np.ndarray]:
+        """(row offsets, column offsets) of the cells holding a matching formula, row by row."""
+        codes = self.match(query)
+        if not codes:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        return np.nonzero(np.isin(self._formula_codes, codes))
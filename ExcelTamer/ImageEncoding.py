@@ -0,0 +1,36 @@
+import base64
+import io
+
+from PIL import Image
+
+# Vision models scale images to fit 2048 x 2048, then their short side to 768 pixels, and bill
+# per 512-pixel tile of the result. Larger images only cost upload time.
+DEFAULT_MAX_SIDE = 2048
+DEFAULT_MAX_SHORT_SIDE = 768
+# Sheet renderings have few distinct colors, a 256-color palette keeps text and borders exact
+DEFAULT_COLORS = 256
+
+
+def downscale(image: Image.Image, max_side: int = DEFAULT_MAX_SIDE,
+              max_short_side: int = DEFAULT_MAX_SHORT_SIDE) -> Image.Image:
+    """Shrink an image to fit max_side on its long side and max_short_side on its short side."""
+    width, height = image.size
+    scale = min(1.0, max_side / max(width, height), max_short_side / min(width, height))
+    if scale >= 1.0:
+        return image
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+
+def encode_png_data_url(image: Image.Image, max_side: int = DEFAULT_MAX_SIDE,
+                        max_short_side: int = DEFAULT_MAX_SHORT_SIDE, colors: int = DEFAULT_COLORS) -> str:
+    """
+    Downscale an image, quantize it to a palette of colors (0 to keep full color) and
+    return it as a PNG data URL, without going through a file.
+    """
+    image = downscale(image.convert('RGB'), max_side, max_short_side)
+    if colors:
+        image = image.quantize(colors=colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
@@ -0,0 +1,166 @@
+import re
+
+import numpy as np
+
+from ExcelTamer.ColumnStore import DATE, EMPTY, INTEGER, NUMBER, TEXT, ColumnarSheet
+from ExcelTamer.ValueIndex import normalize_value
+
+# Numbers read as header labels (years) rather than data
+_MIN_YEAR, _MAX_YEAR = 1900, 2100
+# A column is a row-label column if it labels at least this many rows, and this share of the best one
+_MIN_LABELED_ROWS = 2
+_MIN_LABEL_SHARE = 0.25
+# Separators of the levels of a hierarchical label, e.g. "Revenue > Total" or "Q3 2023"
+_METRIC_LEVELS = re.compile(r'\s*[>/|]\s*')
+_PERIOD_LEVELS = re.compile(r'\s*[>/|,]\s*|\s+')
+
+
+def _after(mask: np.ndarray, axis: int) -> np.ndarray:
+    """True where mask holds somewhere strictly after the cell along the axis (right or below)."""
+    flipped = np.flip(mask, axis=axis)
+    seen = np.flip(np.logical_or.accumulate(flipped, axis=axis), axis=axis)
+    shifted = np.zeros_like(seen)
+    if axis == 1:
+        shifted[:, :-1] = seen[:, 1:]
+    else:
+        shifted[:-1] = seen[1:]
+    return shifted
+
+
+class LabelIndex:
+    """
+    Row and column labels of a sheet, for metric x period lookups without scanning.
+
+    Row-label columns are the columns whose text cells have numbers to their right; header
+    rows are rows of labels (text, dates or years) in columns with numbers below them and no
+    other numbers. Each data row gets a label path over the row-label columns, each column a
+    label per header row. Labels of merged cells, which only hold a value in their first
+    cell, are carried over: outer row labels down to the next label, upper header labels
+    right to the next header (in multi-level headers such as year over quarter).
+
+    Labels are normalized like the value index (see ValueIndex.normalize_value). Offsets are
+    relative to the ColumnarSheet the index is built from.
+    """
+
+    def __init__(self, store: ColumnarSheet):
+        self.first_row = store.first_row
+        self.first_col = store.first_col
+        kinds = store.kinds
+        numeric = (kinds == NUMBER) | (kinds == INTEGER)
+        # Text cells, other than blank strings
+        blank_codes = [code for code, string in enumerate(store.strings.strings) if not string.strip()]
+        text = (kinds == TEXT) & ~np.isin(store.payload, blank_codes)
+        years = numeric & (store.payload >= _MIN_YEAR) & (store.payload <= _MAX_YEAR) \
+            & (store.payload == np.floor(store.payload))
+
+        # Header rows: at least two labels over numbers, and no other numbers
+        labels_over_numbers = (text | years | (kinds == DATE)) & _after(numeric, axis=0)
+        is_header = (labels_over_numbers.sum(axis=1) >= 2) & ~(numeric & ~years).any(axis=1)
+        self.header_rows = np.nonzero(is_header)[0].tolist()
+
+        # Row-label columns: text with numbers to the right, outside header rows
+        row_labels = text & _after(numeric, axis=1) & ~is_header[:, None]
+        labeled_rows = row_labels.sum(axis=0)
+        best = labeled_rows.max() if labeled_rows.size else 0
+        self.label_columns = [int(col) for col in np.nonzero(
+            (labeled_rows >= _MIN_LABELED_ROWS) & (labeled_rows >= best * _MIN_LABEL_SHARE))[0]]
+
+        self._store = store
+        # Label path of each data row, and the rows with each label at any level
+        self.row_paths: dict[int, list[str]] = {}
+        self.row_index: dict[str, list[int]] = {}
+        outer = [None] * len(self.label_columns)
+        for row in range(store.row_count):
+            if is_header[row]:
+                outer = [None] * len(self.label_columns)
+                continue
+            keys = [self._key(row, col) if text[row, col] else None for col in self.label_columns]
+            # Outer labels (merged or grouping a section) carry down until the next one
+            for level, key in enumerate(keys[:-1]):
+                if key is not None:
+                    outer[level] = key
+                    outer[level + 1:] = [None] * (len(outer) - level - 1)
+                else:
+                    keys[level] = outer[level]
+            if keys and keys[-1] is not None and numeric[row].any():
+                path = [key for key in keys if key is not None]
+                self.row_paths[row] = path
+                for key in dict.fromkeys(path):
+                    self.row_index.setdefault(key, []).append(row)
+
+        # Label of each column per header row, and the columns with each label per header row
+        self.header_labels: dict[int, list] = {}
+        self.column_index: dict[int, dict[str, list[int]]] = {}
+        for row in self.header_rows:
+            labels = [self._key(row, col) if labels_over_numbers[row, col] else None
+                      for col in range(store.column_count)]
+            if row + 1 in self.header_labels or row + 1 in self.header_rows:
+                # An upper level: each label spans the columns up to the next one
+                current = None
+                for col, label in enumerate(labels):
+                    if label is not None:
+                        current = label
+                    elif kinds[row, col] != EMPTY:
+                        current = None
+                    elif current is not None and labels_over_numbers[row + 1, col]:
+                        labels[col] = current
+            self.header_labels[row] = labels
+            column_index = {}
+            for col, label in enumerate(labels):
+                if label is not None:
+                    column_index.setdefault(label, []).append(col)
+            self.column_index[row] = column_index
+        self._store = None
+
+    def _key(self, row: int, col: int) -> str:
+        return normalize_value(self._store.value(row, col))
+
+    def match_rows(self, metric: str) -> list[int]:
+        """Row offsets labeled with the metric, or with every level of a path like "Revenue > Total"."""
+        key = normalize_value(metric)
+        if key in self.row_index:
+            return list(self.row_index[key])
+        levels = [normalize_value(level) for level in _METRIC_LEVELS.split(str(metric).strip()) if level]
+        if len(levels) < 2:
+            return []
+        return [row for row, path in self.row_paths.items() if all(level in path for level in levels)]
+
+    def _header_blocks(self, row: int) -> list[list[int]]:
+        """Runs of consecutive header rows above a row, nearest first."""
+        blocks = []
+        for header_row in reversed([header_row for header_row in self.header_rows if header_row < row]):
+            if blocks and blocks[-1][-1] == header_row + 1:
+                blocks[-1].append(header_row)
+            else:
+                blocks.append([header_row])
+        return blocks
+
+    def match_columns(self, period: str, row: int) -> list[int]:
+        """
+        Column offsets of the period under the nearest header above the row that has it.
+        A period of several levels (e.g. "Q3 2023") matches the columns having every level.
+        """
+        key = normalize_value(period)
+        blocks = self._header_blocks(row)
+        for block in blocks:
+            columns = sorted({col for header_row in block for col in self.column_index[header_row].get(key, [])})
+            if columns:
+                return columns
+        levels = [normalize_value(level) for level in _PERIOD_LEVELS.split(str(period).strip()) if level]
+        if len(levels) < 2:
+            return []
+        for block in blocks:
+            column_count = len(self.header_labels[block[0]])
+            columns = [col for col in range(column_count)
+                       if all(any(self.header_labels[header_row][col] == level for header_row in block)
+                              for level in levels)]
+            if columns:
+                return columns
+        return []
+
+    def lookup(self, metric: str, period: str) -> list[tuple[int, int]]:
+        """(row offset, column offset) of the cells at the intersection of a metric and a period."""
+        cells = []
+        for row in self.match_rows(metric):
+            cells += [(row, col) for col in self.match_columns(period, row)]
+        return cells
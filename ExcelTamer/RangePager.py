@@ -0,0 +1,148 @@
+import csv
+import io
+import math
+from typing import Iterable, Optional
+
+import pandas as pd
+
+# Default budget of one page, and the average characters per token of tabular text
+DEFAULT_MAX_TOKENS = 2000
+CHARS_PER_TOKEN = 4
+# Fewest characters a cell costs on a page (its separator and at least one character), to size the first read
+MIN_CHARS_PER_CELL = 2
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token count estimate: the character count divided by the average characters per token."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def first_window_cells(max_tokens: int, columns: int) -> int:
+    """
+    Cells to read for a page of max_tokens over a range of this many columns: a few rows more
+    than fit the budget at the smallest cost per cell, so a page usually takes a single read.
+    """
+    rows = max_tokens * CHARS_PER_TOKEN // max(1, columns * MIN_CHARS_PER_CELL) + 2
+    return rows * max(1, columns)
+
+
+def _cell_text(value: any) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _is_empty(df: pd.DataFrame) -> pd.DataFrame:
+    """Boolean frame, True for empty cells (None, NaN or blank strings)."""
+    return df.isna() | df.map(lambda value: isinstance(value, str) and not value.strip())
+
+
+def render_markdown(df: pd.DataFrame) -> str:
+    """Render a page as a Markdown table, the way the range tools always have."""
+    return df.to_markdown(index=True)
+
+
+def _empty_runs(empty: list[bool]) -> list[tuple[int, int]]:
+    """(start, end) positions of the runs of consecutive True values."""
+    runs = []
+    for position, is_empty in enumerate(empty):
+        if not is_empty:
+            continue
+        if runs and runs[-1][1] == position - 1:
+            runs[-1] = (runs[-1][0], position)
+        else:
+            runs.append((position, position))
+    return runs
+
+
+def render_compact(df: pd.DataFrame) -> str:
+    """
+    Render a page as CSV lines with the column letters as header and the row number first.
+
+    Empty cells at the end of a row are left out, and so are empty columns after the last
+    non-empty one. A run of several empty columns is elided into one empty column headed by
+    its range (e.g. "E:H"), a run of several empty rows into one line holding their range
+    (e.g. "12:30"), so every remaining cell stays addressable.
+    """
+    values = df.drop(columns="RowNumber")
+    empty = _is_empty(values)
+    empty_columns = empty.all(axis=0).tolist()
+    last_column = max((position for position, is_empty in enumerate(empty_columns) if not is_empty), default=-1)
+    # Each kept column is a position in values and its header; a run of empty columns keeps its first one
+    kept, headers = [], []
+    column_runs = {start: end for start, end in _empty_runs(empty_columns[:last_column + 1]) if end > start}
+    position = 0
+    while position <= last_column:
+        end = column_runs.get(position, position)
+        kept.append(position)
+        headers.append(f"{values.columns[position]}:{values.columns[end]}" if end > position
+                       else values.columns[position])
+        position = end + 1
+
+    row_numbers = df["RowNumber"].tolist()
+    row_runs = {start: end for start, end in _empty_runs(empty.all(axis=1).tolist()) if end > start}
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(["RowNumber"] + headers)
+    cells = values.iloc[:, kept].map(_cell_text).values.tolist() if kept else [[] for _ in row_numbers]
+    position = 0
+    while position < len(row_numbers):
+        end = row_runs.get(position)
+        if end is not None:
+            writer.writerow([f"{row_numbers[position]}:{row_numbers[end]}"])
+            position = end + 1
+            continue
+        row = cells[position]
+        while row and row[-1] == '':
+            row = row[:-1]
+        writer.writerow([row_numbers[position]] + row)
+        position += 1
+    return buffer.getvalue().rstrip("\n")
+
+
+def take_page(blocks: Iterable[pd.DataFrame], max_tokens: int = DEFAULT_MAX_TOKENS,
+              compact: bool = False) -> tuple[str, Optional[int], Optional[int]]:
+    """
+    Render the leading rows of a stream of row blocks that fit in a token budget.
+
+    Rows are selected on a per-row estimate, then the page is rendered and shrunk until the
+    rendered text fits. At least one row is always returned, even if it alone exceeds the budget.
+
+    :param blocks: DataFrames with a 'RowNumber' column, as yielded by ExcelAutomation.iter_range_as_dataframes.
+    :param compact: If True, render with render_compact instead of Markdown.
+    :return: (rendered text, last Excel row on the page, first Excel row of the next page).
+             The rows are None if the stream was empty, the next row if it was exhausted.
+    """
+    render = render_compact if compact else render_markdown
+    selected = []
+    used = 0
+    next_row = None
+    for df in blocks:
+        # One line per row, unpadded; Markdown adds separators and padding, checked after rendering
+        lines = df.drop(columns="RowNumber").map(_cell_text).agg(" | ".join, axis=1)
+        costs = (lines.str.len() + len(str(df["RowNumber"].iloc[-1])) + 8) // CHARS_PER_TOKEN + 1
+        if compact:
+            costs = costs.where(~_is_empty(df.drop(columns="RowNumber")).all(axis=1), 0)
+        fitting = (costs.cumsum() + used <= max_tokens).sum()
+        if not selected and not fitting:
+            fitting = 1
+        selected.append(df.iloc[:fitting])
+        used += costs.iloc[:fitting].sum()
+        if fitting < len(df):
+            next_row = int(df["RowNumber"].iloc[fitting])
+            # Stop before the stream reads another block
+            break
+
+    if not selected:
+        return render(pd.DataFrame(columns=["RowNumber"])), None, None
+
+    page = pd.concat(selected) if len(selected) > 1 else selected[0]
+    text = render(page)
+    while len(page) > 1 and estimate_tokens(text) > max_tokens:
+        keep = max(1, min(len(page) - 1, len(page) * max_tokens // estimate_tokens(text)))
+        next_row = int(page["RowNumber"].iloc[keep])
+        page = page.iloc[:keep]
+        text = render(page)
+    return text, int(page["RowNumber"].iloc[-1]), next_row
@@ -0,0 +1,67 @@
+import logging
+import time
+from typing import Callable, Iterator, TypeVar
+
+from ExcelTamer.CellAddress import CellRange
+
+T = TypeVar('T')
+
+# Initial number of cells per read, and the duration each read is steered towards
+CHUNK_CELLS = 100000
+TARGET_SECONDS = 0.5
+MAX_CHUNK_CELLS = 2000000
+# Default tile size of split_into_tiles, legible in one screenshot, and the rows / columns neighbouring tiles share
+TILE_ROWS = 40
+TILE_COLUMNS = 15
+TILE_OVERLAP = 1
+
+
+def read_in_windows(bounds: CellRange, read: Callable[[CellRange], T], chunk_cells: int = CHUNK_CELLS,
+                    target_seconds: float = TARGET_SECONDS) -> Iterator[T]:
+    """
+    Read a range as a sequence of row windows spanning all of its columns, yielding the
+    result of read(window) for each one.
+
+    The window height adapts to the backend: it doubles while reads finish well under
+    target_seconds, halves when they take much longer, and a failing read (e.g. a COM
+    call running out of memory) is retried with half the rows.
+    """
+    max_rows = max(1, MAX_CHUNK_CELLS // bounds.columns)
+    rows = min(max(1, chunk_cells // bounds.columns), max_rows)
+    row = bounds.first_row
+    while row <= bounds.last_row:
+        window = CellRange(row, bounds.first_col, min(row + rows - 1, bounds.last_row), bounds.last_col)
+        start = time.monotonic()
+        try:
+            result = read(window)
+        except Exception as e:
+            if rows == 1:
+                raise
+            rows = max(1, rows // 2)
+            logging.warning(f"Reading {window.address(False)} failed ({e}), retrying with {rows} rows per read")
+            continue
+        elapsed = time.monotonic() - start
+
+        yield result
+        row = window.last_row + 1
+
+        if elapsed < target_seconds / 2:
+            rows = min(rows * 2, max_rows)
+        elif elapsed > target_seconds * 2:
+            rows = max(1, rows // 2)
+
+
+def split_into_tiles(bounds: CellRange, max_rows: int, max_columns: int, overlap: int = 0) -> list[CellRange]:
+    """
+    Split a range into tiles of at most max_rows x max_columns cells, in row-major order.
+    Neighbouring tiles share overlap rows or columns, so content cut at a tile edge is whole in one of them.
+    """
+    def bands(first: int, last: int, size: int) -> list[tuple[int, int]]:
+        step = max(1, size - overlap)
+        result = [(start, min(start + size - 1, last)) for start in range(first, max(first, last - overlap) + 1, step)]
+        # Drop a last band lying entirely inside the overlap of the previous one
+        return [band for i, band in enumerate(result) if i == 0 or band[1] > result[i - 1][1]]
+
+    return [CellRange(first_row, first_col, last_row, last_col)
+            for first_row, last_row in bands(bounds.first_row, bounds.last_row, max_rows)
+            for first_col, last_col in bands(bounds.first_col, bounds.last_col, max_columns)]
@@ -0,0 +1,296 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from ExcelTamer.CellAddress import CellRange
+
+Color = tuple[int, int, int]
+
+# Excel's default sizes: column width in characters of the maximum digit width (padding
+# included, as stored in the file), row height in points
+DEFAULT_COLUMN_WIDTH = 9.140625
+DEFAULT_ROW_HEIGHT = 15.0
+DEFAULT_FONT_SIZE = 11.0
+MAX_DIGIT_WIDTH = 7
+POINTS_TO_PIXELS = 96 / 72
+
+GRIDLINE_COLOR = (212, 212, 212)
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+# Space between a cell's border and its text, in pixels
+TEXT_PADDING = 3
+# Rendered texts kept for reuse across renders
+MAX_CACHED_TEXTS = 8192
+
+# Sans-serif fonts with Excel-like metrics first, DejaVu as shipped with most Linux distributions
+_FONT_FILES = {
+    (False, False): ("arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf", "DejaVuSans.ttf"),
+    (True, False): ("arialbd.ttf", "Arial Bold.ttf", "LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf"),
+    (False, True): ("ariali.ttf", "Arial Italic.ttf", "LiberationSans-Italic.ttf", "DejaVuSans-Oblique.ttf"),
+    (True, True): ("arialbi.ttf", "Arial Bold Italic.ttf", "LiberationSans-BoldItalic.ttf",
+                   "DejaVuSans-BoldOblique.ttf"),
+}
+
+
+class Border(NamedTuple):
+    color: Color
+    width: int
+
+
+class CellStyle(NamedTuple):
+    """How a cell is drawn. 'general' horizontal alignment puts numbers right and text left, like Excel."""
+    fill: Optional[Color] = None
+    font_color: Color = BLACK
+    font_size: float = DEFAULT_FONT_SIZE
+    bold: bool = False
+    italic: bool = False
+    horizontal: str = 'general'
+    vertical: str = 'bottom'
+    # Borders of the left, top, right and bottom edges
+    borders: tuple[Optional[Border], ...] = (None, None, None, None)
+
+
+DEFAULT_STYLE = CellStyle()
+
+
+class RangeLayout(NamedTuple):
+    """Everything RangeRenderer draws for a range."""
+    cell_range: CellRange
+    values: list[list]
+    # Display text of each cell
+    texts: list[list[str]]
+    # Index of each cell's style in styles
+    style_ids: np.ndarray
+    styles: list[CellStyle]
+    # In Excel's units: characters for columns, points for rows
+    column_widths: np.ndarray
+    row_heights: np.ndarray
+    merged: tuple[CellRange, ...] = ()
+    show_gridlines: bool = True
+
+
+def _runs(ids: np.ndarray) -> list[tuple[int, int, int]]:
+    """(start, stop, id) of each run of equal ids in a 1D array, for ids >= 0."""
+    if not ids.size:
+        return []
+    starts = np.concatenate(([0], np.nonzero(np.diff(ids))[0] + 1))
+    stops = np.concatenate((starts[1:], [ids.size]))
+    values = ids[starts]
+    keep = values >= 0
+    return list(zip(starts[keep].tolist(), stops[keep].tolist(), values[keep].tolist()))
+
+
+def _next_occupied(occupied: np.ndarray) -> np.ndarray:
+    """Column offset of the next occupied cell to the right of each cell, the column count if none."""
+    rows, columns = occupied.shape
+    positions = np.where(occupied, np.arange(columns), columns)
+    following = np.full((rows, columns), columns)
+    if columns > 1:
+        following[:, :-1] = np.minimum.accumulate(positions[:, :0:-1], axis=1)[:, ::-1]
+    return following
+
+
+class RangeRenderer:
+    """
+    Draws a RangeLayout to an image with Pillow, without Excel: fills, gridlines, borders
+    and display text, sized from the sheet's column widths and row heights.
+
+    Cell positions are cumulative sums of the pixel sizes; fills and borders are drawn
+    per run of equal cells along rows and columns rather than per cell. Fonts, text widths
+    and the bitmap of each (text, font) are cached and shared by all renders, so a
+    renderer can serve many sessions; it is thread-safe.
+    """
+
+    def __init__(self, scale: float = 1.0):
+        self.scale = scale
+        self._fonts = {}
+        self._texts: OrderedDict[tuple, Image.Image] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _font(self, size: float, bold: bool, italic: bool) -> ImageFont.FreeTypeFont:
+        pixels = max(1, round(size * POINTS_TO_PIXELS * self.scale))
+        key = (pixels, bold, italic)
+        font = self._fonts.get(key)
+        if font is None:
+            candidates = _FONT_FILES[(bold, italic)] + _FONT_FILES[(bold, False)] + _FONT_FILES[(False, False)]
+            for file_name in candidates:
+                try:
+                    font = ImageFont.truetype(file_name, pixels)
+                    break
+                except OSError:
+                    continue
+            else:
+                try:
+                    font = ImageFont.load_default(pixels)
+                except TypeError:
+                    # Pillow before 10.1 only has the fixed-size bitmap font
+                    font = ImageFont.load_default()
+            self._fonts[key] = font
+        return font
+
+    def text_mask(self, text: str, style: CellStyle) -> Image.Image:
+        """Grayscale bitmap of a text in the style's font, from the cache if it was drawn before."""
+        key = (text, style.font_size, style.bold, style.italic)
+        with self._lock:
+            mask = self._texts.get(key)
+            if mask is not None:
+                self._texts.move_to_end(key)
+                return mask
+            font = self._font(style.font_size, style.bold, style.italic)
+        ascent, descent = font.getmetrics()
+        mask = Image.new('L', (max(1, int(np.ceil(font.getlength(text)))), ascent + descent))
+        ImageDraw.Draw(mask).text((0, 0), text, fill=255, font=font)
+        with self._lock:
+            self._texts[key] = mask
+            if len(self._texts) > MAX_CACHED_TEXTS:
+                self._texts.popitem(last=False)
+        return mask
+
+    def _edges(self, layout: RangeLayout) -> tuple[np.ndarray, np.ndarray]:
+        """Pixel x of each column edge and y of each row edge, starting at 0."""
+        widths = np.round(layout.column_widths * MAX_DIGIT_WIDTH * self.scale).astype(np.int64)
+        heights = np.round(layout.row_heights * POINTS_TO_PIXELS * self.scale).astype(np.int64)
+        return np.concatenate(([0], np.cumsum(widths))), np.concatenate(([0], np.cumsum(heights)))
+
+    def render(self, layout: RangeLayout) -> Image.Image:
+        xs, ys = self._edges(layout)
+        image = Image.new('RGB', (max(1, int(xs[-1]) + 1), max(1, int(ys[-1]) + 1)), WHITE)
+        draw = ImageDraw.Draw(image)
+        rows, columns = layout.style_ids.shape
+        if not rows or not columns:
+            return image
+        first_row, first_col = layout.cell_range.first_row, layout.cell_range.first_col
+        styles = layout.styles
+
+        if layout.show_gridlines:
+            for x in xs.tolist():
+                draw.line([(x, 0), (x, int(ys[-1]))], fill=GRIDLINE_COLOR)
+            for y in ys.tolist():
+                draw.line([(0, y), (int(xs[-1]), y)], fill=GRIDLINE_COLOR)
+
+        # Merged areas: one box per anchor, covered cells take the anchor's fill and hold no text.
+        # Borders stay per cell, as Excel stores them.
+        style_ids = np.asarray(layout.style_ids, dtype=np.int64)
+        fill_ids = style_ids.copy()
+        covered = np.zeros((rows, columns), dtype=bool)
+        boxes = {}
+        for merged in layout.merged:
+            top, left = merged.first_row - first_row, merged.first_col - first_col
+            bottom, right = merged.last_row - first_row + 1, merged.last_col - first_col + 1
+            if not (0 <= top < rows and 0 <= left < columns):
+                continue
+            bottom, right = min(bottom, rows), min(right, columns)
+            fill_ids[top:bottom, left:right] = style_ids[top, left]
+            covered[top:bottom, left:right] = True
+            covered[top, left] = False
+            boxes[(top, left)] = (bottom, right)
+
+        # Fills, per run of equal fill color along each row
+        fill_colors = {}
+        fill_of_style = np.array([fill_colors.setdefault(style.fill, len(fill_colors)) if style.fill else -1
+                                  for style in styles], dtype=np.int64)
+        fills = fill_of_style[fill_ids]
+        colors = list(fill_colors)
+        for r in range(rows):
+            for start, stop, fill in _runs(fills[r]):
+                draw.rectangle([int(xs[start]), int(ys[r]), int(xs[stop]), int(ys[r + 1])], fill=colors[fill])
+        if layout.show_gridlines:
+            # Merged areas hide the gridlines inside them
+            for (top, left), (bottom, right) in boxes.items():
+                if fills[top, left] < 0:
+                    draw.rectangle([int(xs[left]) + 1, int(ys[top]) + 1, int(xs[right]) - 1, int(ys[bottom]) - 1],
+                                   fill=WHITE)
+
+        self._draw_borders(draw, layout, style_ids, xs, ys)
+        self._draw_texts(image, layout, style_ids, covered, boxes, xs, ys)
+        return image
+
+    @staticmethod
+    def _draw_borders(draw: ImageDraw.ImageDraw, layout: RangeLayout, style_ids: np.ndarray,
+                      xs: np.ndarray, ys: np.ndarray) -> None:
+        """Draw cell borders, per run of equal border along each row edge and column edge."""
+        border_ids = {}
+        edge_of_style = np.array([[border_ids.setdefault(border, len(border_ids)) if border else -1
+                                   for border in style.borders] for style in layout.styles], dtype=np.int64)
+        if not border_ids:
+            return
+        borders = list(border_ids)
+        left, top, right, bottom = (edge_of_style[:, edge][style_ids] for edge in range(4))
+        rows, columns = style_ids.shape
+        for r in range(rows):
+            for edges, y in ((top[r], ys[r]), (bottom[r], ys[r + 1])):
+                for start, stop, border in _runs(edges):
+                    color, width = borders[border]
+                    draw.line([(int(xs[start]), int(y)), (int(xs[stop]), int(y))], fill=color, width=width)
+        for c in range(columns):
+            for edges, x in ((left[:, c], xs[c]), (right[:, c], xs[c + 1])):
+                for start, stop, border in _runs(edges):
+                    color, width = borders[border]
+                    draw.line([(int(x), int(ys[start])), (int(x), int(ys[stop]))], fill=color, width=width)
+
+    def _draw_texts(self, image: Image.Image, layout: RangeLayout, style_ids: np.ndarray, covered: np.ndarray,
+                    boxes: dict, xs: np.ndarray, ys: np.ndarray) -> None:
+        texts = np.empty(style_ids.shape, dtype=object)
+        texts[...] = layout.texts
+        has_text = (texts != None) & (texts != '') & ~covered  # noqa: E711 - elementwise comparison
+        # Left-aligned text overflows into the empty cells to its right, like in Excel
+        next_occupied = _next_occupied(has_text | covered)
+        for r, c in zip(*np.nonzero(has_text)):
+            r, c = int(r), int(c)
+            text = texts[r, c]
+            value = layout.values[r][c]
+            style = layout.styles[style_ids[r, c]]
+            bottom, right = boxes.get((r, c), (r + 1, c + 1))
+            x0, x1, y0, y1 = int(xs[c]), int(xs[right]), int(ys[r]), int(ys[bottom])
+
+            horizontal = style.horizontal
+            if horizontal == 'general':
+                if isinstance(value, bool):
+                    horizontal = 'center'
+                elif isinstance(value, (int, float, datetime)):
+                    horizontal = 'right'
+                else:
+                    horizontal = 'left'
+            mask = self.text_mask(str(text), style)
+            width, height = mask.size
+            clip_right = x1
+            if horizontal == 'left':
+                x = x0 + TEXT_PADDING
+                if width > x1 - x - TEXT_PADDING and (r, c) not in boxes:
+                    clip_right = int(xs[next_occupied[r, c]])
+            elif horizontal == 'right':
+                x = x1 - TEXT_PADDING - width
+            else:
+                x = x0 + (x1 - x0 - width) // 2
+            if style.vertical == 'top':
+                y = y0 + 1
+            elif style.vertical == 'center':
+                y = y0 + (y1 - y0 - height) // 2
+            else:
+                y = y1 - height - 1
+
+            # Clip to the cell (or the cells it overflows into)
+            crop_left, crop_top = max(0, x0 - x), max(0, y0 - y)
+            crop_right, crop_bottom = min(width, clip_right - x), min(height, y1 - y)
+            if crop_right <= crop_left or crop_bottom <= crop_top:
+                continue
+            if (crop_left, crop_top, crop_right, crop_bottom) != (0, 0, width, height):
+                mask = mask.crop((crop_left, crop_top, crop_right, crop_bottom))
+            image.paste(style.font_color, (x + crop_left, y + crop_top), mask)
+
+
+_default_renderer = None
+_default_renderer_lock = threading.Lock()
+
+
+def default_renderer() -> RangeRenderer:
+    """The renderer shared by backends, so its caches serve every workbook of the process."""
+    global _default_renderer
+    with _default_renderer_lock:
+        if _default_renderer is None:
+            _default_renderer = RangeRenderer()
+        return _default_renderer
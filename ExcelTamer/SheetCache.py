@@ -0,0 +1,290 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Any, Optional
+
+import numpy as np
+
+from ExcelTamer.ColumnStore import ColumnarSheet, StringTable
+from ExcelTamer.SheetSnapshot import SheetSnapshot
+
+# Default location and total size of the cache
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ExcelTamer", "sheets")
+MAX_SIZE = 1024 * 1024 * 1024
+
+_META_FILE = "meta.json"
+_HASH_CHUNK = 1024 * 1024
+# Version of the layout of the cached files; entries of another version are discarded
+_FORMAT = 2
+
+
+def file_hash(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode_strings(strings: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """A string table as one UTF-8 byte array and the offsets of each string in it (one more than strings)."""
+    encoded = [text.encode("utf-8", "surrogatepass") for text in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(blob: np.ndarray, offsets: np.ndarray) -> list[str]:
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[start:end].decode("utf-8", "surrogatepass") for start, end in zip(bounds, bounds[1:])]
+
+
+def _tag_value(value: Any) -> list:
+    """[type, JSON value] of a value kept aside by a ColumnarSheet (see ColumnStore.OTHER)."""
+    if isinstance(value, bool) or isinstance(value, np.bool_):
+        return ['bool', bool(value)]
+    if isinstance(value, (int, np.integer)):
+        # Integers too large for float64, as text to stay exact
+        return ['int', str(int(value))]
+    if isinstance(value, (float, np.floating)):
+        return ['float', float(value)]
+    if isinstance(value, str):
+        return ['str', str(value)]
+    if isinstance(value, datetime):
+        return ['datetime', value.isoformat()]
+    if isinstance(value, date):
+        return ['date', value.isoformat()]
+    if isinstance(value, time):
+        return ['time', value.isoformat()]
+    if isinstance(value, timedelta):
+        return ['timedelta', [value.days, value.seconds, value.microseconds]]
+    raise ValueError(f"Cannot cache a value of type {type(value).__name__}")
+
+
+def _untag_value(tag: str, data: Any) -> Any:
+    if tag == 'bool':
+        return bool(data)
+    if tag == 'int':
+        return int(data)
+    if tag == 'float':
+        return float(data)
+    if tag == 'str':
+        return str(data)
+    if tag == 'datetime':
+        return datetime.fromisoformat(data)
+    if tag == 'date':
+        return date.fromisoformat(data)
+    if tag == 'time':
+        return time.fromisoformat(data)
+    if tag == 'timedelta':
+        return timedelta(*data)
+    raise ValueError(f"Unknown cached value type '{tag}'")
+
+
+def _write_atomic(path: str, write) -> None:
+    """Write a file through a temporary file and a rename, so readers never see it half written."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            write(file)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class SheetCache:
+    """
+    On-disk cache of parsed workbooks, so a workbook that has not changed since it was last
+    opened is answered from disk instead of being read again.
+
+    Each workbook has a directory holding its structure (sheets, used and data ranges,
+    named ranges) in meta.json, and the snapshot of each sheet read so far as .npy files:
+    the kinds, payload and formula codes of its ColumnarSheet, opened memory-mapped
+    (copy-on-write), and its string table as UTF-8 bytes with their offsets. The few values
+    of other types (e.g. times, tz-aware dates) are kept in JSON, tagged with their type.
+    Nothing is unpickled, so cache files cannot run code. Loading a sheet costs a few file opens.
+
+    Entries are keyed by the workbook's path and checked against its size and modification
+    time; if those changed, the content hash decides, so a file that was only touched or
+    copied back keeps its entry. Least recently used entries are evicted once the total size
+    of the cache exceeds max_size.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_size: int = MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __getstate__(self) -> dict:
+        # Worker processes get their own lock
+        return {'cache_dir': self.cache_dir, 'max_size': self.max_size}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def _entry_dir(self, file_path: str) -> str:
+        key = hashlib.sha1(os.path.normcase(os.path.abspath(file_path)).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key)
+
+    @staticmethod
+    def _read_meta(entry_dir: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(entry_dir, _META_FILE), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_meta(entry_dir: str, meta: dict) -> None:
+        _write_atomic(os.path.join(entry_dir, _META_FILE), lambda file: file.write(json.dumps(meta).encode("utf-8")))
+
+    def _valid_meta(self, file_path: str) -> Optional[dict]:
+        """The metadata of the entry of a workbook, None if there is none or the file changed."""
+        entry_dir = self._entry_dir(file_path)
+        meta = self._read_meta(entry_dir)
+        if meta is None or meta.get('Format') != _FORMAT:
+            return None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        if (meta['Size'], meta['MTime']) != (stat.st_size, stat.st_mtime_ns):
+            if meta['Size'] != stat.st_size or meta['Hash'] != file_hash(file_path):
+                logging.debug(f"Cached sheets of '{file_path}' are out of date")
+                return None
+            # Same content under a new modification time
+            meta['MTime'] = stat.st_mtime_ns
+            self._write_meta(entry_dir, meta)
+        os.utime(os.path.join(entry_dir, _META_FILE))
+        return meta
+
+    def _meta_for_update(self, file_path: str) -> dict:
+        """The metadata of a workbook's entry, starting a new entry if the file changed."""
+        meta = self._valid_meta(file_path)
+        if meta is not None:
+            return meta
+        entry_dir = self._entry_dir(file_path)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.makedirs(entry_dir, exist_ok=True)
+        stat = os.stat(file_path)
+        return {'Format': _FORMAT, 'Path': os.path.abspath(file_path), 'Size': stat.st_size,
+                'MTime': stat.st_mtime_ns, 'Hash': file_hash(file_path), 'Structure': None, 'Sheets': {}}
+
+    def workbook_hash(self, file_path: str) -> str:
+        """SHA-256 of the workbook's file, kept in its entry so the file is only hashed when it changes."""
+        with self._lock:
+            meta = self._valid_meta(file_path)
+            if meta is None:
+                meta = self._meta_for_update(file_path)
+                self._write_meta(self._entry_dir(file_path), meta)
+                self._evict()
+        return meta['Hash']
+
+    def load_structure(self, file_path: str) -> Optional[dict]:
+        """The structure saved with save_structure, None if there is none for the current file."""
+        with self._lock:
+            meta = self._valid_meta(file_path)
+        return meta['Structure'] if meta else None
+
+    def save_structure(self, file_path: str, structure: dict) -> None:
+        """Save a JSON-serializable description of the workbook's structure."""
+        with self._lock:
+            meta = self._meta_for_update(file_path)
+            meta['Structure'] = structure
+            self._write_meta(self._entry_dir(file_path), meta)
+            self._evict()
+
+    def load_snapshot(self, file_path: str, sheet_name: str, revision: int) -> Optional[SheetSnapshot]:
+        """The snapshot of a sheet of the current file, memory-mapped, None if it is not cached."""
+        with self._lock:
+            meta = self._valid_meta(file_path)
+            sheet = meta['Sheets'].get(sheet_name) if meta else None
+            if sheet is None:
+                return None
+            prefix = os.path.join(self._entry_dir(file_path), sheet['File'])
+            try:
+                # Copy-on-write: writes overlaid on the snapshot stay in this process
+                kinds = np.load(f"{prefix}.kinds.npy", mmap_mode='c')
+                payload = np.load(f"{prefix}.payload.npy", mmap_mode='c')
+                formula_codes = np.load(f"{prefix}.formulas.npy", mmap_mode='c')
+                strings = _decode_strings(np.load(f"{prefix}.strings.npy", mmap_mode='r'),
+                                          np.load(f"{prefix}.offsets.npy", mmap_mode='r'))
+                with open(f"{prefix}.others.json", "r", encoding="utf-8") as file:
+                    others = {(row, col): _untag_value(tag, data) for row, col, tag, data in json.load(file)}
+            except (OSError, ValueError, TypeError) as e:
+                logging.warning(f"Failed to load cached sheet '{sheet_name}' of '{file_path}': {e}")
+                return None
+
+        table = StringTable()
+        for text in strings:
+            table.encode(text)
+        store = ColumnarSheet.from_arrays(sheet['FirstRow'], sheet['FirstCol'], kinds, payload, table, others)
+        logging.debug(f"Loaded cached snapshot of sheet '{sheet_name}' of '{file_path}'")
+        return SheetSnapshot(sheet_name, store, formula_codes, revision)
+
+    def save_snapshot(self, file_path: str, snapshot: SheetSnapshot) -> None:
+        """Save the snapshot of a sheet, read from the workbook as it is on disk."""
+        store = snapshot.store
+        try:
+            others = [[row, col, *_tag_value(value)] for (row, col), value in store.other_values().items()]
+        except ValueError as e:
+            logging.debug(f"Sheet '{snapshot.sheet_name}' is not cached: {e}")
+            return
+        blob, offsets = _encode_strings(store.strings.strings)
+        with self._lock:
+            meta = self._meta_for_update(file_path)
+            entry_dir = self._entry_dir(file_path)
+            sheet = meta['Sheets'].get(snapshot.sheet_name) or {'File': f"sheet{len(meta['Sheets'])}"}
+            prefix = os.path.join(entry_dir, sheet['File'])
+            _write_atomic(f"{prefix}.kinds.npy", lambda file: np.save(file, store.kinds))
+            _write_atomic(f"{prefix}.payload.npy", lambda file: np.save(file, store.payload))
+            _write_atomic(f"{prefix}.formulas.npy", lambda file: np.save(file, snapshot.formula_codes))
+            _write_atomic(f"{prefix}.strings.npy", lambda file: np.save(file, blob))
+            _write_atomic(f"{prefix}.offsets.npy", lambda file: np.save(file, offsets))
+            _write_atomic(f"{prefix}.others.json", lambda file: file.write(json.dumps(others).encode("utf-8")))
+            sheet.update({'FirstRow': store.first_row, 'FirstCol': store.first_col})
+            meta['Sheets'][snapshot.sheet_name] = sheet
+            self._write_meta(entry_dir, meta)
+            self._evict()
+
+    def size(self) -> int:
+        """Total size of the cached files in bytes."""
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self) -> list[tuple[float, str, int]]:
+        """(last use, directory, size) of each entry."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            try:
+                last_used = os.stat(os.path.join(entry_dir, _META_FILE)).st_mtime
+                size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+            except OSError:
+                continue
+            entries.append((last_used, entry_dir, size))
+        return entries
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        # The most recently used entry (being written) is kept even if it alone exceeds max_size
+        for _, entry_dir, size in entries[:-1]:
+            if total <= self.max_size:
+                break
+            logging.debug(f"Evicting cached sheets in '{entry_dir}'")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
@@ -0,0 +1,169 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ExcelTamer.CellAddress import CellRange, column_letters_range, parse_range
+from ExcelTamer.ColumnStore import ColumnarSheet
+from ExcelTamer.ExcelBackend import ExcelBackend, RangeData
+from ExcelTamer.FormulaIndex import FormulaIndex, TableDefinition
+from ExcelTamer.LabelIndex import LabelIndex
+from ExcelTamer.RangeReader import read_in_windows
+from ExcelTamer.XlsxFileBackend import format_cell_text
+
+
+class SheetSnapshot:
+    """
+    In-memory copy of the data of a sheet: values and formulas loaded in one
+    bulk read, plus display text fetched on demand and memoized.
+
+    Values are held in a ColumnarSheet, and formulas as codes into the same string
+    table, since most formulas of a sheet repeat its constants' text.
+
+    A snapshot is tagged with the workbook revision it was read at; ExcelAutomation
+    discards it once the revision moves on. Concurrent readers may share a snapshot: what it
+    builds on demand (DataFrame, indexes, hash, display texts) is built under its lock.
+    """
+
+    def __init__(self, sheet_name: str, store: ColumnarSheet, formula_codes: np.ndarray, revision: int):
+        self.sheet_name = sheet_name
+        self.store = store
+        # Code of each cell's formula text in store.strings, -1 for none
+        self.formula_codes = formula_codes
+        self.first_row = store.first_row
+        self.first_col = store.first_col
+        self.columns = column_letters_range(store.first_col, store.column_count)
+        self.revision = revision
+        self._column_offsets = {letters: offset for offset, letters in enumerate(self.columns)}
+        self._texts = {}
+        self._df = None
+        self._label_index = None
+        self._formula_index = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, backend: ExcelBackend, sheet_name: str, revision: int, bounds: CellRange = None) -> "SheetSnapshot":
+        """
+        Read values and formulas of a sheet, in row windows for large ranges.
+
+        :param bounds: The range to read, the used range by default. Cells outside it are treated as empty.
+        """
+        if bounds is None:
+            bounds = parse_range(backend.used_range(sheet_name)[0])
+        store = ColumnarSheet(bounds.first_row, bounds.first_col, bounds.rows, bounds.columns)
+        for block in read_in_windows(bounds, lambda window: backend.read_range(sheet_name, window.address(False))):
+            store.set_block(block.first_row - bounds.first_row, 0, block.values)
+        formula_codes = np.full((bounds.rows, bounds.columns), -1, dtype=np.int32, order='F')
+        row = 0
+        for block in read_in_windows(bounds, lambda window: backend.read_formulas(sheet_name, window.address(False))):
+            formula_codes[row:row + len(block)] = [[store.strings.encode(formula) if formula else -1
+                                                    for formula in row_formulas] for row_formulas in block]
+            row += len(block)
+        return cls(sheet_name, store, formula_codes, revision)
+
+    @property
+    def row_count(self) -> int:
+        return self.store.row_count
+
+    def range_data(self) -> RangeData:
+        """The values of the snapshot, decoded as returned by ExcelBackend.read_range."""
+        return RangeData(self.store.rows(), self.first_row, self.first_col, self.columns)
+
+    def has_formulas(self) -> bool:
+        codes = np.unique(self.formula_codes)
+        strings = self.store.strings.strings
+        return any(strings[code].startswith('=') for code in codes.tolist() if code >= 0)
+
+    def dataframe(self) -> pd.DataFrame:
+        """
+        The snapshot as a DataFrame with Excel column letters as columns and a
+        'RowNumber' column. Built once, numeric columns share memory with the
+        snapshot; callers must not modify it.
+        """
+        with self._lock:
+            if self._df is None:
+                if not self.row_count:
+                    df = pd.DataFrame()
+                else:
+                    df = self.store.dataframe(self.columns)
+                    df.insert(0, "RowNumber", range(self.first_row, self.first_row + self.row_count))
+                self._df = df
+            return self._df
+
+    def label_index(self) -> LabelIndex:
+        """The row and column labels of the snapshot, detected on first use."""
+        with self._lock:
+            if self._label_index is None:
+                self._label_index = LabelIndex(self.store)
+            return self._label_index
+
+    def formula_index(self, tables: dict[str, TableDefinition] = None) -> FormulaIndex:
+        """
+        The functions and references of the snapshot's formulas, tokenized on first use.
+
+        :param tables: The workbook's tables by case-folded name, to resolve structured references.
+        """
+        with self._lock:
+            if self._formula_index is None:
+                self._formula_index = FormulaIndex(self.sheet_name, self.store.strings.strings, self.formula_codes,
+                                                   tables)
+            return self._formula_index
+
+    def _offsets(self, row: int, column: str):
+        """Return the (row, column) offsets of a cell inside the snapshot, or None if outside."""
+        row_offset = row - self.first_row
+        col_offset = self._column_offsets.get(column)
+        if col_offset is None or not 0 <= row_offset < self.row_count:
+            return None
+        return row_offset, col_offset
+
+    def contains(self, row: int, column: str) -> bool:
+        return self._offsets(row, column) is not None
+
+    def value(self, row: int, column: str) -> any:
+        offsets = self._offsets(row, column)
+        return self.store.value(*offsets) if offsets else None
+
+    def formula(self, row: int, column: str) -> str:
+        offsets = self._offsets(row, column)
+        code = self.formula_codes[offsets] if offsets else -1
+        return self.store.strings.strings[code] if code >= 0 else ''
+
+    def set_value(self, row: int, column: str, value: any) -> None:
+        """Overlay a written value on a cell inside the snapshot."""
+        row_offset, col_offset = self._offsets(row, column)
+        self.store.set_value(row_offset, col_offset, value)
+        formula = format_cell_text(value)
+        self.formula_codes[row_offset, col_offset] = self.store.strings.encode(formula) if formula else -1
+        # The cell's number format is not known here, the General format is assumed
+        self._texts[(row, column)] = format_cell_text(value)
+        self._df = None
+        self._label_index = None
+        self._formula_index = None
+
+    def visible_text(self, backend: ExcelBackend, row: int, column: str) -> str:
+        """Display text of a cell, read from the backend the first time it is requested."""
+        key = (row, column)
+        with self._lock:
+            if key not in self._texts:
+                self._texts[key] = backend.cell_text(self.sheet_name, f"{column}{row}")
+            return self._texts[key]
+
+    def visible_texts(self, backend: ExcelBackend, cells: list[tuple[int, str]]) -> list[str]:
+        """Display text of several cells, reading the ones not seen yet in one backend call."""
+        # Cells with neither a value nor a formula display nothing
+        with self._lock:
+            missing = [key for key in dict.fromkeys(cells)
+                       if key not in self._texts and (self.value(*key) is not None or self.formula(*key))]
+            if missing:
+                texts = backend.cell_texts(self.sheet_name, [f"{column}{row}" for row, column in missing])
+                self._texts.update(zip(missing, texts))
+            return [self._texts.get(key, '') for key in cells]
+
+    def query_cell(self, backend: ExcelBackend, row: int, column: str) -> dict:
+        """Same result as ExcelAutomation.query_cell, answered from the snapshot."""
+        return {
+            'Value': self.value(row, column),
+            'Formula': self.formula(row, column),
+            'VisibleText': self.visible_text(backend, row, column),
+        }
@@ -0,0 +1,157 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+MATCH_MODES = ('exact', 'contains', 'wildcard', 'regex')
+
+# Characters that end a literal run when scanning a regular expression
+_REGEX_META = set('.^$[]{}()*+?|\\')
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def wildcard_to_regex(pattern: str) -> str:
+    """
+    Translate an Excel wildcard pattern to a regular expression: '*' matches any run of
+    characters, '?' a single character and '~' escapes the next character.
+    """
+    parts = []
+    escaped = False
+    for ch in pattern:
+        if escaped:
+            parts.append(re.escape(ch))
+            escaped = False
+        elif ch == '~':
+            escaped = True
+        elif ch == '*':
+            parts.append('.*')
+        elif ch == '?':
+            parts.append('.')
+        else:
+            parts.append(re.escape(ch))
+    if escaped:
+        parts.append(re.escape('~'))
+    return ''.join(parts)
+
+
+def _wildcard_literals(pattern: str) -> list[str]:
+    literals = ['']
+    escaped = False
+    for ch in pattern:
+        if escaped or ch not in '*?~':
+            literals[-1] += ch
+            escaped = False
+        elif ch == '~':
+            escaped = True
+        else:
+            literals.append('')
+    return literals
+
+
+def _regex_literals(pattern: str) -> list[str]:
+    """
+    Literal runs every match of a regular expression must contain. Conservative: patterns
+    with alternation or groups yield no literals, so they are never pruned wrongly.
+    """
+    if '|' in pattern or '(' in pattern:
+        return []
+    literals = [[]]
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\' and i + 1 < len(pattern):
+            following = pattern[i + 1]
+            if following.isalnum():
+                # Character classes like \d or \w
+                literals.append([])
+            else:
+                literals[-1].append(following)
+            i += 2
+            continue
+        if ch == '[':
+            end = pattern.find(']', i + 2)
+            i = end + 1 if end != -1 else len(pattern)
+            literals.append([])
+            continue
+        if ch in '*?{':
+            # The quantifier makes the previous character optional
+            if literals[-1]:
+                literals[-1].pop()
+            literals.append([])
+            if ch == '{':
+                end = pattern.find('}', i)
+                i = end if end != -1 else len(pattern)
+        elif ch in _REGEX_META:
+            literals.append([])
+        else:
+            literals[-1].append(ch)
+        i += 1
+    return [''.join(run).casefold() for run in literals]
+
+
+class TrigramIndex:
+    """
+    Trigram index over the distinct normalized values of a sheet, used for partial matching.
+
+    A query is first reduced to the literal text every match must contain; the keys
+    holding all trigrams of that text are the candidates, which are then verified with a
+    single vectorized string match.
+    """
+
+    def __init__(self, keys: list[str]):
+        self.keys = np.array(keys, dtype=object)
+        postings: dict[str, list[int]] = {}
+        for position, key in enumerate(keys):
+            for gram in trigrams(key):
+                postings.setdefault(gram, []).append(position)
+        self._postings = {gram: np.array(positions, dtype=np.int64) for gram, positions in postings.items()}
+
+    def _candidates(self, literals: list[str]) -> np.ndarray:
+        grams = set()
+        for literal in literals:
+            grams |= trigrams(literal)
+        if not grams:
+            return np.arange(len(self.keys))
+        # Intersect the shortest posting lists first
+        lists = sorted((self._postings.get(gram, np.empty(0, dtype=np.int64)) for gram in grams), key=len)
+        candidates = lists[0]
+        for positions in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, positions, assume_unique=True)
+        return candidates
+
+    def search(self, text: str, match_mode: str) -> list[str]:
+        """
+        Return the keys matching a normalized query.
+
+        :param text: The query, already case-folded with whitespace collapsed.
+        :param match_mode: 'contains', 'wildcard' (Excel-style * and ?, whole value) or 'regex'.
+        """
+        if match_mode == 'contains':
+            literals = [text]
+        elif match_mode == 'wildcard':
+            literals = _wildcard_literals(text)
+        elif match_mode == 'regex':
+            try:
+                re.compile(text)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression '{text}': {e}")
+            literals = _regex_literals(text)
+        else:
+            raise ValueError(f"Unsupported match mode '{match_mode}', expected one of {MATCH_MODES[1:]}")
+
+        candidates = self._candidates(literals)
+        if not len(candidates):
+            return []
+        keys = pd.Series(self.keys[candidates], dtype=object)
+        if match_mode == 'contains':
+            matched = keys.str.contains(text, regex=False)
+        elif match_mode == 'wildcard':
+            matched = keys.map(re.compile(wildcard_to_regex(text), re.DOTALL).fullmatch).notna()
+        else:
+            matched = keys.map(re.compile(text, re.IGNORECASE).search).notna()
+        return keys[matched.astype(bool)].tolist()
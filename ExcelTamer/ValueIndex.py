@@ -0,0 +1,226 @@
+import logging
+import re
+import threading
+from datetime import datetime
+from typing import Iterable
+
+import numpy as np
+
+from ExcelTamer.CellAddress import CellRange, column_letters, parse_range
+from ExcelTamer.ColumnStore import BOOL, DATE, INTEGER, NUMBER, TEXT, ColumnarSheet, StringTable
+from ExcelTamer.ExcelBackend import RangeData
+from ExcelTamer.TrigramIndex import TrigramIndex
+
+_NUMBER_RE = re.compile(r'^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$')
+
+
+def normalize_text(value: any) -> str:
+    """Case-fold text and collapse surrounding and repeated whitespace."""
+    return ' '.join(str(value).split()).casefold()
+
+
+def normalize_value(value: any) -> str:
+    """
+    Normalize a cell value (or a search term) to the key used by the value index.
+
+    Text is case-folded with surrounding and repeated whitespace collapsed, and numbers
+    are reduced to one canonical form, so 2023, 2023.0, "2023" and " 2023 " all map to
+    the same key. Returns None for empty values.
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        number = float(value)
+        return str(int(number)) if number.is_integer() else repr(number)
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value == datetime(value.year, value.month, value.day) else value.isoformat()
+    text = normalize_text(value)
+    if not text:
+        return None
+    if _NUMBER_RE.match(text):
+        return normalize_value(float(text))
+    return text
+
+
+class _SheetIndex:
+    """
+    Index of one sheet: the distinct normalized values (keys) of its cells, and the id of each
+    cell's key in a 2D int32 array (-1 for empty cells), so lookups are array comparisons.
+    """
+
+    def __init__(self, has_formulas: bool):
+        self.has_formulas = has_formulas
+        self.keys: list[str] = []
+        self.key_ids: dict[str, int] = {}
+        self.first_row = 1
+        self.first_col = 1
+        self.cell_keys = np.full((0, 0), -1, dtype=np.int32)
+        self._trigram_index = None
+        self._lock = threading.Lock()
+
+    def key_id(self, key: str) -> int:
+        if key is None:
+            return -1
+        key_id = self.key_ids.get(key)
+        if key_id is None:
+            key_id = self.key_ids[key] = len(self.keys)
+            self.keys.append(key)
+            self._trigram_index = None
+        return key_id
+
+    def encode(self, store: ColumnarSheet) -> np.ndarray:
+        """Key ids of the cells of a store, normalizing each distinct value once."""
+        ids = np.full(store.kinds.shape, -1, dtype=np.int32)
+        for kind in (NUMBER, INTEGER, TEXT, DATE, BOOL):
+            mask = store.kinds == kind
+            if not mask.any():
+                continue
+            distinct, inverse = np.unique(store.payload[mask], return_inverse=True)
+            distinct_ids = np.array([self.key_id(normalize_value(value))
+                                     for value in store.decode_payload(kind, distinct)], dtype=np.int32)
+            ids[mask] = distinct_ids[inverse]
+        for (row_offset, col_offset), value in store.other_values().items():
+            ids[row_offset, col_offset] = self.key_id(normalize_value(value))
+        return ids
+
+    def set_cells(self, first_row: int, first_col: int, ids: np.ndarray) -> None:
+        """Store the key ids of a block of cells, growing the indexed area to cover it."""
+        if not ids.size:
+            return
+        if not self.cell_keys.size:
+            self.first_row, self.first_col, self.cell_keys = first_row, first_col, ids
+            return
+        last_row = max(self.first_row + self.cell_keys.shape[0], first_row + ids.shape[0]) - 1
+        last_col = max(self.first_col + self.cell_keys.shape[1], first_col + ids.shape[1]) - 1
+        grow_top, grow_left = max(0, self.first_row - first_row), max(0, self.first_col - first_col)
+        grow_bottom = last_row - (self.first_row + self.cell_keys.shape[0] - 1)
+        grow_right = last_col - (self.first_col + self.cell_keys.shape[1] - 1)
+        if grow_top or grow_left or grow_bottom or grow_right:
+            self.cell_keys = np.pad(self.cell_keys, ((grow_top, grow_bottom), (grow_left, grow_right)),
+                                    constant_values=-1)
+            self.first_row -= grow_top
+            self.first_col -= grow_left
+        row_offset, col_offset = first_row - self.first_row, first_col - self.first_col
+        self.cell_keys[row_offset:row_offset + ids.shape[0], col_offset:col_offset + ids.shape[1]] = ids
+
+    def cells(self, key_ids: list[int]) -> list[tuple[int, int]]:
+        """(row, col) of the cells holding one of the keys, in row-major order."""
+        if not key_ids:
+            return []
+        mask = self.cell_keys == key_ids[0] if len(key_ids) == 1 else np.isin(self.cell_keys, key_ids)
+        rows, cols = np.nonzero(mask)
+        return list(zip((rows + self.first_row).tolist(), (cols + self.first_col).tolist()))
+
+    def trigram_index(self) -> TrigramIndex:
+        """Trigram index over the distinct keys, rebuilt when keys were added."""
+        with self._lock:
+            if self._trigram_index is None:
+                self._trigram_index = TrigramIndex(list(self.keys))
+            return self._trigram_index
+
+
+class ValueIndex:
+    """
+    Index from normalized cell value to the cells holding it, for the whole workbook.
+
+    Sheets are indexed lazily, the first time they are searched. Each cell is reduced to the
+    id of its normalized value in a NumPy array, 4 bytes per cell; values are normalized
+    once per distinct value, from the dictionary-encoded ColumnarSheet of the cells.
+    Writes through ExcelAutomation update the index in place; sheets containing formulas
+    are dropped and re-indexed on next use, since a write may change their computed values.
+    """
+
+    def __init__(self):
+        self._sheets: dict[str, _SheetIndex] = {}
+
+    def is_indexed(self, sheet_name: str) -> bool:
+        return sheet_name in self._sheets
+
+    def index_sheet(self, sheet_name: str, blocks: Iterable[RangeData], has_formulas: bool) -> None:
+        """
+        Index a sheet from a stream of row blocks, so only the index itself is kept in memory.
+
+        :param blocks: Row blocks of values covering the used range of the sheet.
+        :param has_formulas: Whether the sheet contains formulas.
+        """
+        logging.debug(f"Indexing values of sheet '{sheet_name}'")
+        sheet_index = _SheetIndex(has_formulas)
+        strings = StringTable()
+        for block in blocks:
+            if block.values and block.values[0]:
+                store = ColumnarSheet.from_rows(block.values, block.first_row, block.first_col, strings)
+                sheet_index.set_cells(block.first_row, block.first_col, sheet_index.encode(store))
+        self._sheets[sheet_name] = sheet_index
+
+    def index_store(self, sheet_name: str, store: ColumnarSheet, has_formulas: bool) -> None:
+        """Index a sheet from the ColumnarSheet of a snapshot."""
+        logging.debug(f"Indexing values of sheet '{sheet_name}' from its snapshot")
+        sheet_index = _SheetIndex(has_formulas)
+        sheet_index.set_cells(store.first_row, store.first_col, sheet_index.encode(store))
+        self._sheets[sheet_name] = sheet_index
+
+    def lookup(self, sheet_name: str, value: any) -> list[tuple[str, str, int]]:
+        """
+        Return the cells of an indexed sheet matching the value, as (sheet name, column letters, row)
+        in row-major order.
+        """
+        key = normalize_value(value)
+        sheet_index = self._sheets[sheet_name]
+        if key is None or key not in sheet_index.key_ids:
+            return []
+        cells = sheet_index.cells([sheet_index.key_ids[key]])
+        return [(sheet_name, column_letters(col), row) for row, col in cells]
+
+    def search(self, sheet_name: str, value: str, match_mode: str) -> list[tuple[str, str, int]]:
+        """
+        Partial match over the cells of an indexed sheet, in row-major order.
+
+        :param match_mode: 'contains' (substring), 'wildcard' (Excel-style * and ?, matching the
+                           whole value) or 'regex' (searched anywhere in the value). Matching
+                           ignores case and repeated whitespace.
+        """
+        if match_mode == 'exact':
+            return self.lookup(sheet_name, value)
+        sheet_index = self._sheets[sheet_name]
+        # Regular expressions are used as given; case is ignored by the match itself
+        text = str(value) if match_mode == 'regex' else normalize_text(value)
+        if not text:
+            return []
+        key_ids = [sheet_index.key_ids[key] for key in sheet_index.trigram_index().search(text, match_mode)]
+        return [(sheet_name, column_letters(col), row) for row, col in sheet_index.cells(key_ids)]
+
+    def cell_written(self, sheet_name: str, cell: str, value: any) -> None:
+        """Update the index after a value was written to a cell (or the same value to every cell of a range)."""
+        target = parse_range(cell)
+        self.range_written(sheet_name, target, [[value]] if target.size == 1 else None)
+
+    def range_written(self, sheet_name: str, target: CellRange, values: list[list] = None) -> None:
+        """
+        Update the index after a 2D list of values was written to the target range.
+        If values is None, the written values are unknown and the sheet is dropped.
+
+        Formula results depending on the written cells are not updated here;
+        call drop_formula_sheets once the workbook has recalculated.
+        """
+        sheet_index = self._sheets.get(sheet_name)
+        if sheet_index is None:
+            return
+        if values is None or any(isinstance(value, str) and value.startswith('=') for row in values for value in row):
+            # Formula results are not known here
+            self.drop_sheet(sheet_name)
+            return
+        store = ColumnarSheet.from_rows(values, target.first_row, target.first_col)
+        sheet_index.set_cells(target.first_row, target.first_col, sheet_index.encode(store))
+
+    def drop_formula_sheets(self) -> None:
+        """Drop the sheets containing formulas, whose computed values may have changed."""
+        for name in [name for name, index in self._sheets.items() if index.has_formulas]:
+            self.drop_sheet(name)
+
+    def drop_sheet(self, sheet_name: str) -> None:
+        self._sheets.pop(sheet_name, None)
+
+    def clear(self) -> None:
+        self._sheets.clear()
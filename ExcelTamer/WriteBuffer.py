@@ -0,0 +1,77 @@
+import time
+
+from ExcelTamer.CellAddress import CellRange
+
+
+class WriteBuffer:
+    """
+    Pending cell writes per sheet, kept until they are flushed as range writes.
+
+    Later writes to the same cell replace earlier ones. blocks() coalesces the pending
+    cells of a sheet into rectangles: consecutive cells of a row form a run, and runs
+    spanning the same columns on consecutive rows are stacked into one block.
+    """
+
+    def __init__(self):
+        self._pending: dict[str, dict[tuple[int, int], any]] = {}
+        self._oldest_write = None
+
+    def __len__(self) -> int:
+        return sum(len(cells) for cells in self._pending.values())
+
+    def add(self, sheet_name: str, row: int, col: int, value: any) -> None:
+        if self._oldest_write is None:
+            self._oldest_write = time.monotonic()
+        self._pending.setdefault(sheet_name, {})[(row, col)] = value
+
+    def get(self, sheet_name: str, row: int, col: int) -> tuple[bool, any]:
+        """Return (True, value) if a write to the cell is pending, (False, None) otherwise."""
+        cells = self._pending.get(sheet_name, {})
+        if (row, col) in cells:
+            return True, cells[(row, col)]
+        return False, None
+
+    def has_pending(self, sheet_name: str = None) -> bool:
+        if sheet_name is None:
+            return bool(self._pending)
+        return sheet_name in self._pending
+
+    def age(self) -> float:
+        """Seconds since the oldest pending write, 0 if nothing is pending."""
+        return time.monotonic() - self._oldest_write if self._oldest_write is not None else 0.0
+
+    def blocks(self, sheet_name: str) -> list[tuple[CellRange, list[list]]]:
+        """Coalesce the pending writes of a sheet into rectangular blocks of values."""
+        cells = self._pending.get(sheet_name, {})
+
+        # Runs of consecutive columns on each row
+        runs = []
+        for row, col in sorted(cells):
+            if runs and runs[-1][0] == row and runs[-1][2] == col - 1:
+                runs[-1][2] = col
+                runs[-1][3].append(cells[(row, col)])
+            else:
+                runs.append([row, col, col, [cells[(row, col)]]])
+
+        # Stack runs covering the same columns on consecutive rows
+        open_blocks = {}
+        blocks = []
+        for row, first_col, last_col, values in runs:
+            block = open_blocks.get((first_col, last_col))
+            if block is not None and block[1] == row - 1:
+                block[1] = row
+                block[2].append(values)
+            else:
+                block = [row, row, [values]]
+                open_blocks[(first_col, last_col)] = block
+                blocks.append((first_col, last_col, block))
+
+        return [(CellRange(first_row, first_col, last_row, last_col), values)
+                for first_col, last_col, (first_row, last_row, values) in blocks]
+
+    def sheets(self) -> list[str]:
+        return list(self._pending)
+
+    def clear(self) -> None:
+        self._pending.clear()
+        self._oldest_write = None
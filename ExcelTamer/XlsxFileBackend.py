@@ -0,0 +1,660 @@
+import logging
+import os
+import posixpath
+import re
+import shutil
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from ExcelTamer.CellAddress import (CellRange, column_index, column_letters, column_letters_range, parse_cell,
+                                    parse_range, quote_sheet)
+from ExcelTamer.ExcelBackend import ExcelBackend, RangeData, named_range_address
+from ExcelTamer.RangeRenderer import DEFAULT_COLUMN_WIDTH, DEFAULT_ROW_HEIGHT, RangeLayout, default_renderer
+from ExcelTamer.XlsxStyles import read_cell_styles, read_theme_colors
+
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+
+# Built-in number formats that are not stored in styles.xml
+_BUILTIN_NUM_FMTS = {
+    0: 'General', 1: '0', 2: '0.00', 3: '#,##0', 4: '#,##0.00',
+    9: '0%', 10: '0.00%', 11: '0.00E+00', 12: '# ?/?', 13: '# ??/??',
+    14: 'm/d/yyyy', 15: 'd-mmm-yy', 16: 'd-mmm', 17: 'mmm-yy',
+    18: 'h:mm AM/PM', 19: 'h:mm:ss AM/PM', 20: 'h:mm', 21: 'h:mm:ss', 22: 'm/d/yyyy h:mm',
+    37: '#,##0 ;(#,##0)', 38: '#,##0 ;[Red](#,##0)', 39: '#,##0.00;(#,##0.00)', 40: '#,##0.00;[Red](#,##0.00)',
+    45: 'mm:ss', 46: '[h]:mm:ss', 47: 'mmss.0', 48: '##0.0E+0', 49: '@',
+}
+
+# Relative A1 references inside a formula, used to expand shared formulas
+_FORMULA_REF_RE = re.compile(r'(?<![A-Za-z0-9_.])(\$?)([A-Z]{1,3})(\$?)(\d+)(?![A-Za-z0-9_(])')
+_FORMULA_STRING_RE = re.compile(r'"(?:[^"]|"")*"')
+
+# Tokens of a number format code that are only ever used for dates and times
+_DATE_TOKENS_RE = re.compile(r'[dmyhs]', re.IGNORECASE)
+_FORMAT_NOISE_RE = re.compile(r'"[^"]*"|\\.|_.|\*.|\[[^\]]*\]')
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace from an element tag."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _is_date_format(format_code: str) -> bool:
+    """Return True if an Excel number format code displays a date or time."""
+    if format_code in ('General', '@'):
+        return False
+    stripped = _FORMAT_NOISE_RE.sub('', format_code.split(';')[0])
+    return bool(_DATE_TOKENS_RE.search(stripped))
+
+
+def _format_number(number: float, format_code: str) -> str:
+    """Approximate Excel's rendering of a number with a numeric format code."""
+    sections = format_code.split(';')
+    section = sections[0]
+    if number < 0 and len(sections) > 1:
+        section = sections[1]
+        number = -number
+    elif number == 0 and len(sections) > 2:
+        section = sections[2]
+
+    # Literal text around the number: quoted strings and backslash escapes
+    literals = re.sub(r'"([^"]*)"', r'\1', section)
+    literals = re.sub(r'\\(.)', r'\1', literals)
+    literals = re.sub(r'_.|\*.|\[[^\]]*\]', '', literals)
+
+    number_part = re.search(r'[#0?,.%E+\-]*[#0?][#0?,.%E+\-]*', literals)
+    if not number_part:
+        return literals
+    pattern = number_part.group(0)
+    if 'E' in pattern.upper():
+        decimals = len(pattern.split('.')[1].upper().split('E')[0]) if '.' in pattern else 0
+        text = f"{number:.{decimals}E}"
+    else:
+        if '%' in pattern:
+            number *= 100
+        decimals = len(re.sub(r'[^0#?]', '', pattern.split('.')[1])) if '.' in pattern else 0
+        thousands = ',' in pattern.split('.')[0]
+        text = f"{number:,.{decimals}f}" if thousands else f"{number:.{decimals}f}"
+        if '%' in pattern:
+            text += '%'
+    return literals[:number_part.start()] + text + literals[number_part.end():]
+
+
+def _format_date(value: datetime, format_code: str) -> str:
+    """Approximate Excel's rendering of a date with a date/time format code."""
+    section = re.sub(r'"([^"]*)"', r'\1', format_code.split(';')[0])
+    section = re.sub(r'\\(.)', r'\1', section)
+    section = re.sub(r'_.|\*.|\[[^\]]*\]', '', section)
+    am_pm = 'AM/PM' in section.upper()
+    tokens = re.findall(r'yyyy|yy|mmmmm|mmmm|mmm|mm|m|dddd|ddd|dd|d|hh|h|ss|s|AM/PM|.', section, re.IGNORECASE)
+    hour = (value.hour % 12 or 12) if am_pm else value.hour
+    result = []
+    for i, token in enumerate(tokens):
+        lower = token.lower()
+        if lower in ('mm', 'm'):
+            # "m" after an hour or before a second means minutes
+            previous = ''.join(tokens[:i]).lower().rstrip(':')
+            following = ''.join(tokens[i + 1:]).lower().lstrip(':')
+            if previous.endswith(('h', 'hh')) or following.startswith('s'):
+                result.append(f"{value.minute:02d}" if lower == 'mm' else str(value.minute))
+                continue
+            result.append(f"{value.month:02d}" if lower == 'mm' else str(value.month))
+        elif lower == 'yyyy':
+            result.append(f"{value.year:04d}")
+        elif lower == 'yy':
+            result.append(f"{value.year % 100:02d}")
+        elif lower == 'mmmmm':
+            result.append(value.strftime('%B')[0])
+        elif lower == 'mmmm':
+            result.append(value.strftime('%B'))
+        elif lower == 'mmm':
+            result.append(value.strftime('%b'))
+        elif lower == 'dddd':
+            result.append(value.strftime('%A'))
+        elif lower == 'ddd':
+            result.append(value.strftime('%a'))
+        elif lower == 'dd':
+            result.append(f"{value.day:02d}")
+        elif lower == 'd':
+            result.append(str(value.day))
+        elif lower == 'hh':
+            result.append(f"{hour:02d}")
+        elif lower == 'h':
+            result.append(str(hour))
+        elif lower == 'ss':
+            result.append(f"{value.second:02d}")
+        elif lower == 's':
+            result.append(str(value.second))
+        elif lower == 'am/pm':
+            result.append('AM' if value.hour < 12 else 'PM')
+        else:
+            result.append(token)
+    return ''.join(result)
+
+
+def format_cell_text(value: any, format_code: str = 'General') -> str:
+    """
+    Return the text Excel would display for a value with the given number format.
+    This is an approximation of Range.Text covering the common number, percent,
+    currency and date formats.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, datetime):
+        return _format_date(value, format_code if _is_date_format(format_code) else 'm/d/yyyy')
+    if isinstance(value, (int, float)):
+        if format_code in ('General', '@') or not format_code:
+            return str(int(value)) if float(value).is_integer() else f"{value:.10g}"
+        return _format_number(float(value), format_code)
+    return str(value)
+
+
+class _SheetCells:
+    """Parsed contents of one worksheet part."""
+
+    def __init__(self):
+        self.values = {}
+        self.formulas = {}
+        self.styles = {}
+        self.dimension = None
+        # Layout, for rendering: (first col, last col, width, style) of each <col>, row heights and styles
+        self.column_specs = []
+        self.row_heights = {}
+        self.row_styles = {}
+        self.default_column_width = DEFAULT_COLUMN_WIDTH
+        self.default_row_height = DEFAULT_ROW_HEIGHT
+        self.show_gridlines = True
+        self.merged = []
+        self.min_row = self.min_col = None
+        self.max_row = self.max_col = 0
+
+    def extend_bounds(self, row: int, col: int) -> None:
+        self.min_row = row if self.min_row is None else min(self.min_row, row)
+        self.min_col = col if self.min_col is None else min(self.min_col, col)
+        self.max_row = max(self.max_row, row)
+        self.max_col = max(self.max_col, col)
+
+
+class XlsxFileBackend(ExcelBackend):
+    """
+    Read-only backend that reads an .xlsx file directly, without a running Excel.
+
+    Sheet XML parts are streamed out of the zip with iterparse, resolving the
+    shared-strings table and the number formats from styles.xml, so values,
+    formulas and display text are available on any platform.
+    Each sheet is parsed once, on first access. Parsing is serialized, so reads may
+    run concurrently from several threads.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = os.path.abspath(file_path)
+        self._zip = zipfile.ZipFile(self.file_path)
+        self._sheet_parts = {}
+        self._active_tab = 0
+        self._date1904 = False
+        self._defined_names = []
+        self._shared_strings = None
+        self._cell_formats = None
+        self._cell_styles = None
+        self._sheets = {}
+        self._tables = None
+        self._parse_lock = threading.RLock()
+        self._read_workbook()
+
+    # ---- package parts ----
+
+    def _read_workbook(self) -> None:
+        rels = {}
+        rels_root = ET.fromstring(self._zip.read('xl/_rels/workbook.xml.rels'))
+        for rel in rels_root:
+            target = rel.get('Target')
+            # Targets are relative to xl/ unless they are absolute package paths
+            rels[rel.get('Id')] = target.lstrip('/') if target.startswith('/') else posixpath.normpath(
+                posixpath.join('xl', target))
+
+        root = ET.fromstring(self._zip.read('xl/workbook.xml'))
+        sheet_names = []
+        for elem in root.iter():
+            tag = _local_name(elem.tag)
+            if tag == 'workbookPr':
+                self._date1904 = elem.get('date1904') in ('1', 'true')
+            elif tag == 'workbookView':
+                self._active_tab = int(elem.get('activeTab', 0))
+            elif tag == 'sheet':
+                name = elem.get('name')
+                sheet_names.append(name)
+                self._sheet_parts[name] = rels[elem.get(f'{_REL_NS}id')]
+            elif tag == 'definedName':
+                local_sheet = elem.get('localSheetId')
+                self._defined_names.append((elem.get('name'), local_sheet, elem.text or ''))
+
+        self._defined_names = [
+            (name, sheet_names[int(local_sheet)] if local_sheet is not None else None, refers_to)
+            for name, local_sheet, refers_to in self._defined_names
+        ]
+
+    def _get_shared_strings(self) -> list[str]:
+        with self._parse_lock:
+            if self._shared_strings is None:
+                shared_strings = []
+                if 'xl/sharedStrings.xml' in self._zip.namelist():
+                    with self._zip.open('xl/sharedStrings.xml') as part:
+                        for event, elem in ET.iterparse(part, events=('end',)):
+                            if _local_name(elem.tag) == 'si':
+                                shared_strings.append(self._rich_text(elem))
+                                elem.clear()
+                self._shared_strings = shared_strings
+        return self._shared_strings
+
+    def _get_cell_formats(self) -> list[str]:
+        """Return the number format code of each cellXfs style index."""
+        with self._parse_lock:
+            if self._cell_formats is None:
+                cell_formats = []
+                if 'xl/styles.xml' in self._zip.namelist():
+                    root = ET.fromstring(self._zip.read('xl/styles.xml'))
+                    num_fmts = dict(_BUILTIN_NUM_FMTS)
+                    for elem in root.iter():
+                        if _local_name(elem.tag) == 'numFmt':
+                            num_fmts[int(elem.get('numFmtId'))] = elem.get('formatCode')
+                    for elem in root:
+                        if _local_name(elem.tag) == 'cellXfs':
+                            for xf in elem:
+                                cell_formats.append(num_fmts.get(int(xf.get('numFmtId', 0)), 'General'))
+                self._cell_formats = cell_formats
+        return self._cell_formats
+
+    def _get_cell_styles(self) -> list:
+        """Return the CellStyle of each cellXfs style index, with theme colors resolved."""
+        with self._parse_lock:
+            if self._cell_styles is None:
+                names = self._zip.namelist()
+                theme_colors = read_theme_colors(self._zip.read('xl/theme/theme1.xml')) \
+                    if 'xl/theme/theme1.xml' in names else []
+                self._cell_styles = read_cell_styles(self._zip.read('xl/styles.xml'), theme_colors) \
+                    if 'xl/styles.xml' in names else read_cell_styles(b'<styleSheet/>', theme_colors)
+        return self._cell_styles
+
+    @staticmethod
+    def _rich_text(elem: ET.Element) -> str:
+        """Concatenate the <t> runs of a shared or inline string, skipping phonetic runs."""
+        parts = []
+        for child in elem.iter():
+            tag = _local_name(child.tag)
+            if tag == 'rPh':
+                # Phonetic guide text is not part of the displayed value
+                child.clear()
+            elif tag == 't' and child.text:
+                parts.append(child.text)
+        return ''.join(parts)
+
+    def _from_serial(self, serial: float) -> datetime:
+        epoch = datetime(1904, 1, 1) if self._date1904 else datetime(1899, 12, 30)
+        return epoch + timedelta(days=serial)
+
+    def _get_sheet(self, sheet_name: str) -> _SheetCells:
+        sheet = self._sheets.get(sheet_name)
+        if sheet is None:
+            if sheet_name not in self._sheet_parts:
+                raise KeyError(f"Sheet '{sheet_name}' not found in workbook '{self.file_path}'")
+            with self._parse_lock:
+                if sheet_name not in self._sheets:
+                    self._sheets[sheet_name] = self._parse_sheet(self._sheet_parts[sheet_name])
+                sheet = self._sheets[sheet_name]
+        return sheet
+
+    def _parse_sheet(self, part_name: str) -> _SheetCells:
+        logging.debug(f"Parsing sheet part '{part_name}' of '{self.file_path}'")
+        shared_strings = self._get_shared_strings()
+        cell_formats = self._get_cell_formats()
+        sheet = _SheetCells()
+        shared_formulas = {}
+        row_number = 0
+        col_number = 0
+
+        with self._zip.open(part_name) as part:
+            for event, elem in ET.iterparse(part, events=('start', 'end')):
+                tag = _local_name(elem.tag)
+                if event == 'start':
+                    if tag == 'row':
+                        row_number = int(elem.get('r')) if elem.get('r') else row_number + 1
+                        col_number = 0
+                        if elem.get('ht'):
+                            sheet.row_heights[row_number] = float(elem.get('ht'))
+                        if elem.get('customFormat') in ('1', 'true'):
+                            sheet.row_styles[row_number] = int(elem.get('s', 0))
+                    continue
+
+                if tag == 'dimension':
+                    sheet.dimension = elem.get('ref')
+                elif tag == 'sheetView':
+                    sheet.show_gridlines = elem.get('showGridLines') not in ('0', 'false')
+                elif tag == 'sheetFormatPr':
+                    if elem.get('defaultColWidth'):
+                        sheet.default_column_width = float(elem.get('defaultColWidth'))
+                    if elem.get('defaultRowHeight'):
+                        sheet.default_row_height = float(elem.get('defaultRowHeight'))
+                elif tag == 'col':
+                    width = float(elem.get('width')) if elem.get('width') else None
+                    if elem.get('hidden') in ('1', 'true'):
+                        width = 0.0
+                    sheet.column_specs.append((int(elem.get('min')), int(elem.get('max')), width,
+                                               int(elem.get('style', 0))))
+                elif tag == 'mergeCell':
+                    try:
+                        sheet.merged.append(parse_range(elem.get('ref')))
+                    except ValueError:
+                        pass
+                elif tag == 'c':
+                    ref = elem.get('r')
+                    if ref:
+                        row_number, col_number = parse_cell(ref)
+                    else:
+                        col_number += 1
+                    key = (row_number, col_number)
+
+                    cell_type = elem.get('t', 'n')
+                    style = int(elem.get('s', 0))
+                    raw_value = None
+                    formula = None
+                    for child in elem:
+                        child_tag = _local_name(child.tag)
+                        if child_tag == 'v':
+                            raw_value = child.text
+                        elif child_tag == 'f':
+                            formula = self._read_formula(child, key, shared_formulas)
+                        elif child_tag == 'is':
+                            raw_value = self._rich_text(child)
+
+                    value = self._convert_value(raw_value, cell_type, style, shared_strings, cell_formats)
+                    if style:
+                        sheet.styles[key] = style
+                    if value is not None:
+                        sheet.values[key] = value
+                    if formula:
+                        sheet.formulas[key] = formula
+                    if value is not None or formula:
+                        sheet.extend_bounds(row_number, col_number)
+                    elem.clear()
+                elif tag == 'row':
+                    if elem.get('hidden') in ('1', 'true'):
+                        sheet.row_heights[row_number] = 0.0
+                    elem.clear()
+                elif tag == 'sheetData':
+                    elem.clear()
+        return sheet
+
+    def _read_formula(self, elem: ET.Element, key: tuple[int, int], shared_formulas: dict) -> str:
+        """Return the formula text of a cell, expanding shared formulas relative to their anchor."""
+        text = elem.text
+        if elem.get('t') != 'shared':
+            return text
+        si = elem.get('si')
+        if text:
+            shared_formulas[si] = (text, key)
+            return text
+        if si not in shared_formulas:
+            return None
+        anchor_formula, (anchor_row, anchor_col) = shared_formulas[si]
+        return self._shift_formula(anchor_formula, key[0] - anchor_row, key[1] - anchor_col)
+
+    @staticmethod
+    def _shift_formula(formula: str, row_offset: int, col_offset: int) -> str:
+        """Move the relative A1 references of a formula by the given offsets, leaving string literals alone."""
+
+        def shift(match):
+            col_abs, col, row_abs, row = match.groups()
+            if not col_abs:
+                col = column_letters(column_index(col) + col_offset)
+            if not row_abs:
+                row = str(int(row) + row_offset)
+            return f"{col_abs}{col}{row_abs}{row}"
+
+        pieces = []
+        last = 0
+        for literal in _FORMULA_STRING_RE.finditer(formula):
+            pieces.append(_FORMULA_REF_RE.sub(shift, formula[last:literal.start()]))
+            pieces.append(literal.group(0))
+            last = literal.end()
+        pieces.append(_FORMULA_REF_RE.sub(shift, formula[last:]))
+        return ''.join(pieces)
+
+    def _convert_value(self, raw_value: str, cell_type: str, style: int, shared_strings: list[str],
+                       cell_formats: list[str]) -> any:
+        """Convert the raw <v> text of a cell to the Python value xlwings would return."""
+        if raw_value is None:
+            return None
+        if cell_type == 's':
+            return shared_strings[int(raw_value)]
+        if cell_type in ('str', 'inlineStr'):
+            return raw_value
+        if cell_type == 'b':
+            return raw_value == '1'
+        if cell_type == 'e':
+            # xlwings returns None for cell errors
+            return None
+        if cell_type == 'd':
+            return datetime.fromisoformat(raw_value)
+        number = float(raw_value)
+        if style < len(cell_formats) and _is_date_format(cell_formats[style]):
+            return self._from_serial(number)
+        return number
+
+    def _cell_format(self, sheet: _SheetCells, key: tuple[int, int]) -> str:
+        cell_formats = self._get_cell_formats()
+        style = sheet.styles.get(key, 0)
+        return cell_formats[style] if style < len(cell_formats) else 'General'
+
+    @staticmethod
+    def _used_bounds(sheet: _SheetCells) -> CellRange:
+        if sheet.dimension:
+            try:
+                return parse_range(sheet.dimension)
+            except ValueError:
+                pass
+        if sheet.min_row is None:
+            return CellRange(1, 1, 1, 1)
+        return CellRange(sheet.min_row, sheet.min_col, sheet.max_row, sheet.max_col)
+
+    # ---- ExcelBackend ----
+
+    def list_open_workbooks(self) -> list[str]:
+        return [self.file_path]
+
+    def workbook_path(self) -> Optional[str]:
+        return self.file_path
+
+    def has_unsaved_changes(self) -> bool:
+        # The file is never modified
+        return False
+
+    def save(self, file_path: str = None) -> None:
+        # The file is never modified, so saving in place has nothing to do
+        if file_path and os.path.abspath(file_path) != self.file_path:
+            shutil.copyfile(self.file_path, file_path)
+
+    def close(self) -> None:
+        self._zip.close()
+        self._sheets.clear()
+
+    def list_sheets(self) -> list[str]:
+        return list(self._sheet_parts)
+
+    def active_sheet_name(self) -> str:
+        sheet_names = self.list_sheets()
+        return sheet_names[self._active_tab] if self._active_tab < len(sheet_names) else sheet_names[0]
+
+    def add_sheet(self, sheet_name: str) -> None:
+        raise NotImplementedError("XlsxFileBackend is read-only; open the workbook in Excel to add sheets.")
+
+    def remove_sheet(self, sheet_name: str) -> None:
+        raise NotImplementedError("XlsxFileBackend is read-only; open the workbook in Excel to remove sheets.")
+
+    def write_cell(self, sheet_name: str, cell: str, value: any) -> None:
+        raise NotImplementedError("XlsxFileBackend is read-only; open the workbook in Excel to write cells.")
+
+    def write_range(self, sheet_name: str, top_left_cell: str, values: list[list]) -> None:
+        raise NotImplementedError("XlsxFileBackend is read-only; open the workbook in Excel to write cells.")
+
+    def used_range(self, sheet_name: str) -> tuple[str, int, int]:
+        bounds = self._used_bounds(self._get_sheet(sheet_name))
+        return bounds.address(), bounds.rows, bounds.columns
+
+    def data_range(self, sheet_name: str) -> Optional[str]:
+        # Bounds of the cells holding a value or a formula, tracked while parsing
+        sheet = self._get_sheet(sheet_name)
+        if sheet.min_row is None:
+            return None
+        return CellRange(sheet.min_row, sheet.min_col, sheet.max_row, sheet.max_col).address()
+
+    def read_range(self, sheet_name: str, cell_range: str = None) -> RangeData:
+        sheet = self._get_sheet(sheet_name)
+        bounds = self._used_bounds(sheet)
+        first_row, first_col, last_row, last_col = parse_range(cell_range, bounds) if cell_range else bounds
+
+        values = sheet.values
+        data_2d = [[values.get((row, col)) for col in range(first_col, last_col + 1)]
+                   for row in range(first_row, last_row + 1)]
+        columns = column_letters_range(first_col, last_col - first_col + 1)
+        return RangeData(data_2d, first_row, first_col, columns)
+
+    def _formula_text(self, sheet: _SheetCells, key: tuple[int, int]) -> str:
+        if key in sheet.formulas:
+            return f"={sheet.formulas[key]}"
+        value = sheet.values.get(key)
+        if isinstance(value, (datetime, bool)):
+            return format_cell_text(value)
+        # Like Range.Formula, constants are returned as their unformatted text
+        return format_cell_text(value, 'General')
+
+    def read_formulas(self, sheet_name: str, cell_range: str) -> list[list[str]]:
+        sheet = self._get_sheet(sheet_name)
+        first_row, first_col, last_row, last_col = parse_range(cell_range, self._used_bounds(sheet))
+        return [[self._formula_text(sheet, (row, col)) for col in range(first_col, last_col + 1)]
+                for row in range(first_row, last_row + 1)]
+
+    def has_formulas(self, sheet_name: str) -> bool:
+        return bool(self._get_sheet(sheet_name).formulas)
+
+    def cell_text(self, sheet_name: str, cell: str) -> str:
+        sheet = self._get_sheet(sheet_name)
+        row, col = parse_cell(cell)
+        return format_cell_text(sheet.values.get((row, col)), self._cell_format(sheet, (row, col)))
+
+    def query_cell(self, sheet_name: str, cell: str) -> dict:
+        sheet = self._get_sheet(sheet_name)
+        row, col = parse_cell(cell)
+        key = (row, col)
+        return {
+            'Value': sheet.values.get(key),
+            'Formula': self._formula_text(sheet, key),
+            'VisibleText': format_cell_text(sheet.values.get(key), self._cell_format(sheet, key)),
+        }
+
+    def list_named_ranges(self, sheet_name: str = None) -> list[dict]:
+        named_ranges = self.named_ranges_by_sheet()
+        if sheet_name is not None:
+            return named_ranges.get(sheet_name, [])
+        return [info for infos in named_ranges.values() for info in infos]
+
+    def named_ranges_by_sheet(self) -> dict[Optional[str], list[dict]]:
+        named_ranges = {}
+        for name, local_sheet, refers_to in self._defined_names:
+            address = named_range_address(refers_to)
+            if address is None:
+                continue
+            display_name = f"{quote_sheet(local_sheet)}!{name}" if local_sheet is not None else name
+            named_ranges.setdefault(local_sheet, []).append({'Name': display_name, 'Refers To': address})
+        return named_ranges
+
+    def list_tables(self) -> list[dict]:
+        with self._parse_lock:
+            if self._tables is None:
+                self._tables = self._read_tables()
+        return self._tables
+
+    def _read_tables(self) -> list[dict]:
+        """Read the table parts related to each sheet part."""
+        part_names = set(self._zip.namelist())
+        tables = []
+        for sheet_name, part_name in self._sheet_parts.items():
+            part_dir = posixpath.dirname(part_name)
+            rels_name = posixpath.join(part_dir, '_rels', posixpath.basename(part_name) + '.rels')
+            if rels_name not in part_names:
+                continue
+            for rel in ET.fromstring(self._zip.read(rels_name)):
+                if not rel.get('Type', '').endswith('/table'):
+                    continue
+                target = rel.get('Target')
+                table_part = target.lstrip('/') if target.startswith('/') else posixpath.normpath(
+                    posixpath.join(part_dir, target))
+                root = ET.fromstring(self._zip.read(table_part))
+                tables.append({
+                    # Formulas refer to a table by its display name
+                    'Name': root.get('displayName') or root.get('name'),
+                    'Sheet': sheet_name,
+                    'Range': root.get('ref'),
+                    'Columns': [elem.get('name') for elem in root.iter() if _local_name(elem.tag) == 'tableColumn'],
+                    'Header Rows': int(root.get('headerRowCount', 1)),
+                    'Totals Rows': int(root.get('totalsRowCount', 0)),
+                })
+        return tables
+
+    def range_layout(self, sheet_name: str, cell_range: str) -> RangeLayout:
+        sheet = self._get_sheet(sheet_name)
+        bounds = parse_range(cell_range, self._used_bounds(sheet)) if cell_range else self._used_bounds(sheet)
+        rows = range(bounds.first_row, bounds.last_row + 1)
+        cols = range(bounds.first_col, bounds.last_col + 1)
+
+        # Cell style, else the row's style, else the column's style
+        column_widths = np.full(bounds.columns, sheet.default_column_width)
+        style_ids = np.zeros((bounds.rows, bounds.columns), dtype=np.int64)
+        for first, last, width, style in sheet.column_specs:
+            if last < bounds.first_col or first > bounds.last_col:
+                continue
+            span = slice(max(first, bounds.first_col) - bounds.first_col, min(last, bounds.last_col) - bounds.first_col + 1)
+            if width is not None:
+                column_widths[span] = width
+            style_ids[:, span] = style
+        for row, style in sheet.row_styles.items():
+            if bounds.first_row <= row <= bounds.last_row:
+                style_ids[row - bounds.first_row] = style
+        row_heights = np.array([sheet.row_heights.get(row, sheet.default_row_height) for row in rows])
+
+        cell_formats = self._get_cell_formats()
+        values = [[None] * bounds.columns for _ in rows]
+        texts = [[''] * bounds.columns for _ in rows]
+        if bounds.size < len(sheet.styles) + len(sheet.values):
+            cells = [(row, col) for row in rows for col in cols]
+        else:
+            cells = [key for key in sheet.styles.keys() | sheet.values.keys() if bounds.contains(*key)]
+        for row, col in cells:
+            r, c = row - bounds.first_row, col - bounds.first_col
+            style = sheet.styles.get((row, col))
+            if style is not None or (row, col) in sheet.values:
+                style_ids[r, c] = style or 0
+            value = sheet.values.get((row, col))
+            if value is not None:
+                values[r][c] = value
+                cell_format = cell_formats[style] if style and style < len(cell_formats) else 'General'
+                texts[r][c] = format_cell_text(value, cell_format)
+
+        styles = self._get_cell_styles()
+        style_ids[style_ids >= len(styles)] = 0
+        merged = tuple(merged for merged in sheet.merged if bounds.contains(merged.first_row, merged.first_col))
+        return RangeLayout(bounds, values, texts, style_ids, styles, column_widths, row_heights, merged,
+                           sheet.show_gridlines)
+
+    def capture_screenshot(self, sheet_name: str, cell_range: str = None) -> Image.Image:
+        return self.render_range(sheet_name, cell_range)
+
+    def capture_screenshot_png(self, sheet_name: str, output_path: str, cell_range: str = None) -> bool:
+        self.render_range(sheet_name, cell_range).save(output_path, format='PNG')
+        return True
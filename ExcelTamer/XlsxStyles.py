@@ -0,0 +1,146 @@
+import colorsys
+import xml.etree.ElementTree as ET
+from typing import Optional
+
+from ExcelTamer.RangeRenderer import BLACK, Border, CellStyle, Color, DEFAULT_FONT_SIZE
+
+# Legacy palette of 'indexed' colors; 64 and 65 are the system foreground and background
+_INDEXED_COLORS = (
+    '000000', 'FFFFFF', 'FF0000', '00FF00', '0000FF', 'FFFF00', 'FF00FF', '00FFFF',
+    '000000', 'FFFFFF', 'FF0000', '00FF00', '0000FF', 'FFFF00', 'FF00FF', '00FFFF',
+    '800000', '008000', '000080', '808000', '800080', '008080', 'C0C0C0', '808080',
+    '9999FF', '993366', 'FFFFCC', 'CCFFFF', '660066', 'FF8080', '0066CC', 'CCCCFF',
+    '000080', 'FF00FF', 'FFFF00', '00FFFF', '800080', '800000', '008080', '0000FF',
+    '00CCFF', 'CCFFFF', 'CCFFCC', 'FFFF99', '99CCFF', 'FF99CC', 'CC99FF', 'FFCC99',
+    '3366FF', '33CCCC', '99CC00', 'FFCC00', 'FF9900', 'FF6600', '666699', '969696',
+    '003366', '339966', '003300', '333300', '993300', '993366', '333399', '333333',
+    '000000', 'FFFFFF',
+)
+# Theme color indexes in styles.xml swap the light and dark pairs of the theme's scheme
+_THEME_ORDER = ('lt1', 'dk1', 'lt2', 'dk2', 'accent1', 'accent2', 'accent3', 'accent4', 'accent5', 'accent6',
+                'hlink', 'folHlink')
+_BORDER_WIDTHS = {'medium': 2, 'mediumDashed': 2, 'mediumDashDot': 2, 'mediumDashDotDot': 2, 'slantDashDot': 2,
+                  'thick': 3, 'double': 3}
+_HORIZONTAL = {'general': 'general', 'left': 'left', 'right': 'right', 'center': 'center',
+               'centerContinuous': 'center', 'distributed': 'center', 'justify': 'left', 'fill': 'left'}
+_VERTICAL = {'top': 'top', 'center': 'center', 'bottom': 'bottom', 'justify': 'top', 'distributed': 'center'}
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _hex_color(rgb: str) -> Color:
+    """'FFB2B2B2' (ARGB) or 'B2B2B2' -> (178, 178, 178)."""
+    rgb = rgb[-6:]
+    return int(rgb[0:2], 16), int(rgb[2:4], 16), int(rgb[4:6], 16)
+
+
+def apply_tint(color: Color, tint: float) -> Color:
+    """Lighten (tint > 0) or darken (tint < 0) a color the way Excel tints theme colors."""
+    hue, lightness, saturation = colorsys.rgb_to_hls(*(channel / 255 for channel in color))
+    lightness = lightness * (1 + tint) if tint < 0 else lightness * (1 - tint) + tint
+    return tuple(round(channel * 255) for channel in colorsys.hls_to_rgb(hue, lightness, saturation))
+
+
+def read_theme_colors(theme_xml: bytes) -> list[Color]:
+    """The colors of a theme part's color scheme, in the order styles.xml refers to them."""
+    scheme = {}
+    for elem in ET.fromstring(theme_xml).iter():
+        if _local_name(elem.tag) == 'clrScheme':
+            for entry in elem:
+                for color in entry:
+                    rgb = color.get('val') if _local_name(color.tag) == 'srgbClr' else color.get('lastClr')
+                    if rgb:
+                        scheme[_local_name(entry.tag)] = _hex_color(rgb)
+            break
+    return [scheme.get(name, BLACK) for name in _THEME_ORDER]
+
+
+def _color(elem: Optional[ET.Element], theme_colors: list[Color]) -> Optional[Color]:
+    """The color of a <color>, <fgColor> or <bgColor> element, None for automatic or missing colors."""
+    if elem is None:
+        return None
+    color = None
+    if elem.get('rgb'):
+        color = _hex_color(elem.get('rgb'))
+    elif elem.get('theme') is not None:
+        theme = int(elem.get('theme'))
+        color = theme_colors[theme] if theme < len(theme_colors) else None
+    elif elem.get('indexed') is not None:
+        indexed = int(elem.get('indexed'))
+        color = _hex_color(_INDEXED_COLORS[indexed]) if indexed < len(_INDEXED_COLORS) else None
+    if color is not None and elem.get('tint'):
+        color = apply_tint(color, float(elem.get('tint')))
+    return color
+
+
+def _child(elem: ET.Element, name: str) -> Optional[ET.Element]:
+    for child in elem:
+        if _local_name(child.tag) == name:
+            return child
+    return None
+
+
+def _flag(elem: Optional[ET.Element]) -> bool:
+    return elem is not None and elem.get('val', '1') not in ('0', 'false')
+
+
+def _read_font(elem: ET.Element, theme_colors: list[Color]) -> dict:
+    size = _child(elem, 'sz')
+    return {
+        'font_color': _color(_child(elem, 'color'), theme_colors) or BLACK,
+        'font_size': float(size.get('val')) if size is not None else DEFAULT_FONT_SIZE,
+        'bold': _flag(_child(elem, 'b')),
+        'italic': _flag(_child(elem, 'i')),
+    }
+
+
+def _read_fill(elem: ET.Element, theme_colors: list[Color]) -> Optional[Color]:
+    pattern = _child(elem, 'patternFill')
+    if pattern is not None:
+        if pattern.get('patternType', 'none') in ('none', 'gray125'):
+            return None
+        return _color(_child(pattern, 'fgColor'), theme_colors) or BLACK
+    gradient = _child(elem, 'gradientFill')
+    if gradient is not None:
+        # The first stop stands for the whole gradient
+        for stop in gradient:
+            return _color(_child(stop, 'color'), theme_colors)
+    return None
+
+
+def _read_borders(elem: ET.Element, theme_colors: list[Color]) -> tuple[Optional[Border], ...]:
+    borders = []
+    for edge in ('left', 'top', 'right', 'bottom'):
+        side = _child(elem, edge)
+        style = side.get('style') if side is not None else None
+        if not style:
+            borders.append(None)
+            continue
+        color = _color(_child(side, 'color'), theme_colors) or BLACK
+        borders.append(Border(color, _BORDER_WIDTHS.get(style, 1)))
+    return tuple(borders)
+
+
+def read_cell_styles(styles_xml: bytes, theme_colors: list[Color]) -> list[CellStyle]:
+    """The CellStyle of each cellXfs style index of a styles.xml part."""
+    sections = {_local_name(elem.tag): elem for elem in ET.fromstring(styles_xml)}
+    fonts = [_read_font(font, theme_colors) for font in sections.get('fonts', ())]
+    fills = [_read_fill(fill, theme_colors) for fill in sections.get('fills', ())]
+    borders = [_read_borders(border, theme_colors) for border in sections.get('borders', ())]
+
+    styles = []
+    for xf in sections.get('cellXfs', ()):
+        font_id, fill_id, border_id = (int(xf.get(name, 0)) for name in ('fontId', 'fillId', 'borderId'))
+        alignment = _child(xf, 'alignment')
+        horizontal = alignment.get('horizontal', 'general') if alignment is not None else 'general'
+        vertical = alignment.get('vertical', 'bottom') if alignment is not None else 'bottom'
+        styles.append(CellStyle(
+            fill=fills[fill_id] if fill_id < len(fills) else None,
+            horizontal=_HORIZONTAL.get(horizontal, 'general'),
+            vertical=_VERTICAL.get(vertical, 'bottom'),
+            borders=borders[border_id] if border_id < len(borders) else (None,) * 4,
+            **(fonts[font_id] if font_id < len(fonts) else {}),
+        ))
+    return styles or [CellStyle()]
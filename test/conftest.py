@@ -0,0 +1,52 @@
+import os
+import re
+import shutil
+import zipfile
+
+import pytest
+
+from ExcelTamer.ExcelAutomation import ExcelAutomation
+from ExcelTamer.XlsxFileBackend import XlsxFileBackend
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "example.xlsx")
+
+
+@pytest.fixture(scope="module")
+def backend() -> XlsxFileBackend:
+    return XlsxFileBackend(EXAMPLE_PATH)
+
+
+@pytest.fixture
+def excel() -> ExcelAutomation:
+    """A headless ExcelAutomation on example.xlsx."""
+    excel = ExcelAutomation.open_headless(EXAMPLE_PATH)
+    yield excel
+    excel.close()
+
+
+@pytest.fixture
+def example_path(tmp_path) -> str:
+    """A copy of example.xlsx, so tests may write next to it."""
+    path = str(tmp_path / "example.xlsx")
+    shutil.copyfile(EXAMPLE_PATH, path)
+    return path
+
+
+@pytest.fixture
+def rewrite_part(tmp_path):
+    """Copy example.xlsx with one of its parts changed by a function of the part's text."""
+    def rewrite(part_name: str, change) -> str:
+        path = str(tmp_path / "rewritten.xlsx")
+        with zipfile.ZipFile(EXAMPLE_PATH) as source, zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as target:
+            for info in source.infolist():
+                data = source.read(info)
+                if info.filename == part_name:
+                    data = change(data.decode("utf-8")).encode("utf-8")
+                target.writestr(info, data)
+        return path
+    return rewrite
+
+
+def replace_columns(cols: str):
+    """A change for rewrite_part replacing the <cols> element of a sheet part."""
+    return lambda text: re.sub(r"<cols>.*?</cols>", cols, text, count=1, flags=re.S)
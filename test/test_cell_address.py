@@ -0,0 +1,87 @@
+import pytest
+
+from ExcelTamer.CellAddress import (MAX_COLUMNS, MAX_ROWS, CellRange, bounding_range, cell_address, column_index,
+                                    column_letters, parse_cell, parse_range, quote_sheet, split_sheet)
+
+
+@pytest.mark.parametrize("index, letters", [(1, "A"), (26, "Z"), (27, "AA"), (28, "AB"), (702, "ZZ"),
+                                            (703, "AAA"), (MAX_COLUMNS, "XFD")])
+def test_column_letters_and_index_round_trip(index, letters):
+    assert column_letters(index) == letters
+    assert column_index(letters) == index
+    assert column_index(letters.lower()) == index
+
+
+@pytest.mark.parametrize("letters", ["XFE", "ZZZ", "A1", ""])
+def test_column_index_rejects_columns_outside_the_sheet(letters):
+    with pytest.raises(ValueError):
+        column_index(letters)
+
+
+def test_parse_cell():
+    assert parse_cell("B7") == (7, 2)
+    assert parse_cell("$AD$14") == (14, 30)
+    assert parse_cell(f"XFD{MAX_ROWS}") == (MAX_ROWS, MAX_COLUMNS)
+
+
+@pytest.mark.parametrize("reference", ["A0", f"A{MAX_ROWS + 1}", "XFE1", "B", "7", "B7C", "Revenue"])
+def test_parse_cell_rejects_invalid_cells(reference):
+    with pytest.raises(ValueError):
+        parse_cell(reference)
+
+
+def test_cell_address():
+    assert cell_address(7, 2) == "B7"
+    assert cell_address(7, 2, absolute=True) == "$B$7"
+
+
+def test_parse_range():
+    assert parse_range("I3:AH10") == CellRange(3, 9, 10, 34)
+    assert parse_range("D26") == CellRange(26, 4, 26, 4)
+    # Corners may be given in any order
+    assert parse_range("C5:A1") == CellRange(1, 1, 5, 3)
+    assert parse_range("'Cost of sales'!$D$7:$D$25") == CellRange(7, 4, 25, 4)
+
+
+def test_parse_range_of_whole_rows_and_columns():
+    assert parse_range("B:D") == CellRange(1, 2, MAX_ROWS, 4)
+    assert parse_range("3:5") == CellRange(3, 1, 5, MAX_COLUMNS)
+    used = CellRange(2, 2, 30, 31)
+    assert parse_range("B:D", used) == CellRange(2, 2, 30, 4)
+    assert parse_range("3:5", used) == CellRange(3, 2, 5, 31)
+
+
+@pytest.mark.parametrize("reference", ["A0", "A2000000", "XFE1", "A1:XFE1", "0:3", "A1:B2:C3"])
+def test_parse_range_rejects_invalid_ranges(reference):
+    with pytest.raises(ValueError):
+        parse_range(reference)
+
+
+def test_range_address():
+    assert CellRange(2, 2, 10, 4).address() == "$B$2:$D$10"
+    assert CellRange(2, 2, 10, 4).address(False) == "B2:D10"
+    assert CellRange(6, 1, 6, MAX_COLUMNS).address(False) == "6:6"
+    assert CellRange(1, 2, MAX_ROWS, 2).address(False) == "B:B"
+    assert CellRange(7, 4, 7, 4).address(False) == "D7"
+
+
+def test_range_geometry():
+    bounds = CellRange(2, 2, 10, 4)
+    assert (bounds.rows, bounds.columns, bounds.size) == (9, 3, 27)
+    assert bounds.column_letters() == ["B", "C", "D"]
+    assert bounds.contains(10, 4) and not bounds.contains(11, 4)
+    assert bounds.intersection(CellRange(5, 3, 20, 20)) == CellRange(5, 3, 10, 4)
+    assert bounds.intersection(CellRange(11, 1, 12, 1)) is None
+    assert bounds.union(CellRange(1, 5, 1, 5)) == CellRange(1, 2, 10, 5)
+    assert bounds.offset(1, 1) == CellRange(3, 3, 11, 5)
+    assert bounds.resize(rows=2) == CellRange(2, 2, 3, 4)
+    assert bounding_range([(3, 4), (1, 7), (2, 2)]) == CellRange(1, 2, 3, 7)
+
+
+def test_sheet_names_in_references():
+    assert split_sheet("'My Sheet'!A1:B2") == ("My Sheet", "A1:B2")
+    assert split_sheet("'It''s'!A1") == ("It's", "A1")
+    assert split_sheet("A1") == (None, "A1")
+    assert quote_sheet("Expenses") == "Expenses"
+    assert quote_sheet("Cost of sales") == "'Cost of sales'"
+    assert quote_sheet("It's") == "'It''s'"
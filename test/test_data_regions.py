@@ -0,0 +1,51 @@
+from ExcelTamer.CellAddress import CellRange
+from ExcelTamer.DataRegions import RegionDetector, detect_regions
+from ExcelTamer.RangeReader import read_in_windows
+
+
+def test_separate_tables_are_separate_regions():
+    detector = RegionDetector()
+    detector.add_block([["a", "b", None, None],
+                        [1, 2, None, None],
+                        [None, None, None, None],
+                        [None, None, None, "x"]], 1, 1)
+
+    assert detector.regions() == [CellRange(1, 1, 2, 2), CellRange(4, 4, 4, 4)]
+    assert detector.bounds == CellRange(1, 1, 4, 4)
+
+
+def test_regions_join_across_blocks_and_diagonally():
+    detector = RegionDetector()
+    detector.add_block([["a", None, None]], 3, 2)
+    detector.add_block([[None, "b", None]], 4, 2)
+    detector.add_block([[None, None, "c"]], 5, 2)
+
+    assert detector.regions() == [CellRange(3, 2, 5, 4)]
+
+
+def test_overlapping_boxes_are_merged():
+    # C1 touches no other cell, but lies in the box of the L-shaped table
+    detector = RegionDetector()
+    detector.add_block([["a", None, 1],
+                        ["b", None, None],
+                        ["c", "d", "e"]], 1, 1)
+
+    assert detector.regions() == [CellRange(1, 1, 3, 3)]
+
+
+def test_empty_sheet_has_no_regions():
+    detector = RegionDetector()
+    detector.add_block([[None, ""], [None, None]], 1, 1)
+
+    assert detector.regions() == []
+    assert detector.bounds is None
+
+
+def test_regions_of_example(backend):
+    bounds = CellRange(1, 1, 32, 31)
+    # Small windows, so regions span several blocks
+    blocks = read_in_windows(bounds, lambda window: backend.read_range("Expenses", window.address(False)), 64)
+    detector = detect_regions(blocks)
+
+    assert detector.regions()[0] == CellRange(6, 2, 27, 30)
+    assert detector.bounds == CellRange(1, 2, 27, 31)
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from ExcelTamer.CellAddress import MAX_COLUMNS, MAX_ROWS, CellRange
+from ExcelTamer.FormulaIndex import FormulaIndex, FormulaQuery, TableDefinition, tokenize_formula
+
+
+@pytest.fixture(scope="module")
+def tables(backend) -> dict[str, TableDefinition]:
+    return {info["Name"].casefold(): TableDefinition.from_info(info) for info in backend.list_tables()}
+
+
+def test_tokenize_functions_references_and_names():
+    functions, references, table_names, names = tokenize_formula(
+        "=IFERROR(_xlfn.XLOOKUP(A2,'Cost of sales'!$B$7:$B$25,Expenses!D:D),TaxRate)")
+
+    assert functions == {"IFERROR", "XLOOKUP"}
+    assert references == [(None, CellRange(2, 1, 2, 1)), ("cost of sales", CellRange(7, 2, 25, 2)),
+                          ("expenses", CellRange(1, 4, MAX_ROWS, 4))]
+    assert table_names == set()
+    assert names == {"TAXRATE"}
+
+
+def test_tokenize_skips_strings_and_non_references():
+    functions, references, _, names = tokenize_formula('=LOG10(3E10)&"A1"&XABC1')
+
+    assert functions == {"LOG10"}
+    assert references == []
+    assert names == {"XABC1"}
+
+
+def test_tokenize_resolves_structured_references(tables):
+    functions, references, table_names, names = tokenize_formula(
+        "=SUM(Revenue[[#This Row],[JAN]:[DEC]])", tables)
+
+    assert functions == {"SUM"}
+    # [#This Row] stands for the data rows, JAN:DEC for columns D:O
+    assert references == [("revenues (sales)", CellRange(7, 4, 13, 15))]
+    assert table_names == {"REVENUE"}
+    assert names == set()
+
+
+@pytest.mark.parametrize("formula, bounds", [
+    ("=SUBTOTAL(109,Revenue[APR %])", CellRange(7, 21, 13, 21)),
+    ('=Revenue[[#Totals],[JAN]]', CellRange(14, 4, 14, 4)),
+    ("=SUM(Revenue[#All])", CellRange(6, 2, 14, 30)),
+    ("=SUM(Revenue)", CellRange(7, 2, 13, 30)),
+    ("=Revenue[@[JAN]:[MAR]]", CellRange(7, 4, 13, 6)),
+    ("=Revenue[[#Headers],[TREND]]", CellRange(6, 3, 6, 3)),
+])
+def test_structured_reference_ranges(tables, formula, bounds):
+    assert tokenize_formula(formula, tables)[1] == [("revenues (sales)", bounds)]
+
+
+def test_structured_references_without_definitions():
+    _, references, table_names, _ = tokenize_formula("=SUM(Revenue[[#This Row],[JAN]:[DEC]])+[@JAN]")
+
+    # Only the table name is known
+    assert references == []
+    assert table_names == {"REVENUE"}
+
+
+def test_parse_query(tables):
+    sheets = ["Revenues (sales)", "Cost of sales", "Expenses"]
+
+    assert FormulaQuery.parse("sumifs Expenses!B:B", sheets) == FormulaQuery(
+        frozenset({"SUMIFS"}), (("expenses", CellRange(1, 2, MAX_ROWS, 2)),), frozenset(), None)
+    assert FormulaQuery.parse("'Cost of sales'", sheets).references == \
+        (("cost of sales", CellRange(1, 1, MAX_ROWS, MAX_COLUMNS)),)
+    assert FormulaQuery.parse("=SUM(D7", sheets).text == "=sum(d7"
+    assert FormulaQuery.parse("Revenue[JAN]", sheets, tables).references == \
+        (("revenues (sales)", CellRange(7, 4, 13, 4)),)
+    # Unknown tables are matched by name
+    assert FormulaQuery.parse("Other[JAN]", sheets, tables).tables == frozenset({"OTHER"})
+
+
+@pytest.mark.parametrize("query", ["Revenuex", "SUM nonsense", "", "Revenue[Nope]"])
+def test_parse_query_rejects_unknown_words(tables, query):
+    with pytest.raises(ValueError):
+        FormulaQuery.parse(query, ["Expenses"], tables)
+
+
+def test_index_matches_functions_and_overlapping_references():
+    strings = ["=SUM(D7:D25)", "=SUM(E7:E25)", "='Cost of sales'!D15-D26", "text", "=AVERAGE(D7:D8)"]
+    codes = np.array([[0, 1], [2, 3], [4, -1]], dtype=np.int32)
+    index = FormulaIndex("Expenses", strings, codes)
+
+    assert index.match(FormulaQuery.parse("SUM")) == [0, 1]
+    assert index.match(FormulaQuery.parse("D8")) == [0, 4]
+    assert index.match(FormulaQuery.parse("SUM D8")) == [0]
+    assert index.match(FormulaQuery.parse("'Cost of sales'!D:D", ["Cost of sales"])) == [2]
+    assert index.match(FormulaQuery.parse("=sum(e7")) == [1]
+    rows, cols = index.cells(FormulaQuery.parse("D26"))
+    assert (rows.tolist(), cols.tolist()) == ([1], [0])
+
+
+def test_find_cells_by_table_name(excel):
+    cells = excel.find_all_cells_by_formula("Revenue", search_whole_workbook=True)
+
+    assert ("Revenues (sales)", "P", 7, "=SUM(Revenue[[#This Row],[JAN]:[DEC]])") in cells
+    assert {sheet for sheet, _, _, _ in cells} == {"Revenues (sales)"}
+    by_address = excel.find_all_cells_by_formula("'Revenues (sales)'!E:E", "Revenues (sales)")
+    assert ("Revenues (sales)", "P", 8, "=SUM(Revenue[[#This Row],[JAN]:[DEC]])") in by_address
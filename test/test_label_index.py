@@ -0,0 +1,46 @@
+from ExcelTamer.ColumnStore import ColumnarSheet
+from ExcelTamer.LabelIndex import LabelIndex
+
+
+def _index(rows: list[list]) -> LabelIndex:
+    return LabelIndex(ColumnarSheet.from_rows(rows, 5, 2))
+
+
+def test_lookup_in_example(excel):
+    snapshot = excel.get_snapshot("Expenses")
+
+    cells = snapshot.label_index().lookup("TOTAL EXPENSES", "JAN")
+
+    assert [(snapshot.first_row + row, snapshot.columns[col]) for row, col in cells] == [(26, "D")]
+
+
+def test_lookup_is_case_insensitive():
+    index = _index([[None, "JAN", "FEB"],
+                    ["Revenue", 10, 20],
+                    ["Costs", 1, 2]])
+
+    assert index.header_rows == [0]
+    assert index.lookup("revenue", "feb") == [(1, 2)]
+    assert index.lookup("Costs", "JAN") == [(2, 1)]
+
+
+def test_lookup_in_multi_level_headers():
+    # The year labels of merged cells only hold a value in their first cell
+    index = _index([[None, 2023, None, 2024, None],
+                    [None, "Q1", "Q2", "Q1", "Q2"],
+                    ["Revenue", 10, 20, 30, 40],
+                    [None, None, None, None, None],
+                    ["Costs", 1, 2, 3, 4]])
+
+    assert index.header_rows == [0, 1]
+    assert index.lookup("Revenue", "Q2") == [(2, 2), (2, 4)]
+    assert index.lookup("Revenue", "Q2 2024") == [(2, 4)]
+    assert index.lookup("Costs", "2024") == [(4, 3), (4, 4)]
+
+
+def test_lookup_of_unknown_labels():
+    index = _index([[None, "JAN", "FEB"],
+                    ["Revenue", 10, 20]])
+
+    assert index.lookup("Profit", "JAN") == []
+    assert index.lookup("Revenue", "MAR") == []
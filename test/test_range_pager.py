@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from ExcelTamer.RangePager import estimate_tokens, first_window_cells, take_page
+
+
+def _rows(first_row: int, count: int) -> pd.DataFrame:
+    return pd.DataFrame({"RowNumber": range(first_row, first_row + count),
+                         "B": [f"label {i}" for i in range(count)], "C": np.arange(count, dtype=float)})
+
+
+def test_whole_range_fits():
+    content, last_row, next_row = take_page([_rows(1, 10)], 10000)
+
+    assert (last_row, next_row) == (10, None)
+    assert "label 9" in content
+
+
+def test_page_is_cut_to_the_budget():
+    content, last_row, next_row = take_page([_rows(1, 200)], 200)
+
+    assert 1 <= last_row < 200
+    assert next_row == last_row + 1
+    assert estimate_tokens(content) <= 200
+
+
+def test_at_least_one_row():
+    content, last_row, next_row = take_page([_rows(5, 3)], 1)
+
+    assert (last_row, next_row) == (5, 6)
+    assert "label 0" in content
+
+
+def test_blocks_after_a_full_page_are_not_read():
+    def blocks():
+        yield _rows(1, 100)
+        raise AssertionError("read past the page")
+
+    _, last_row, next_row = take_page(blocks(), 100)
+    assert next_row == last_row + 1
+
+
+def test_page_spans_blocks():
+    _, last_row, next_row = take_page([_rows(1, 5), _rows(6, 5)], 10000)
+
+    assert (last_row, next_row) == (10, None)
+
+
+def test_empty_stream():
+    assert take_page([], 100)[1:] == (None, None)
+
+
+def test_compact_page_elides_empty_rows_and_columns():
+    df = _rows(1, 40)
+    df["D"] = np.nan
+    df["E"] = np.nan
+    df["F"] = 1.0
+    df.loc[10:29, ["B", "C", "F"]] = [None, np.nan, np.nan]
+
+    content, last_row, next_row = take_page([df], 10000, compact=True)
+
+    lines = content.splitlines()
+    assert lines[0] == "RowNumber,B,C,D:E,F"
+    assert lines[1] == "1,label 0,0,,1"
+    assert "11:30" in lines
+    assert (last_row, next_row) == (40, None)
+
+
+def test_first_window_is_sized_from_the_budget():
+    assert first_window_cells(2000, 30) < first_window_cells(20000, 30)
+    assert first_window_cells(1, 30) >= 30
+
+
+def test_range_page_of_example(excel):
+    first = excel.get_range_page("Expenses", max_tokens=300)
+    rest = excel.get_range_page("Expenses", first["NextCursor"], max_tokens=100000)
+
+    assert first["Error"] == ""
+    assert first["PageRange"].startswith("B1:")
+    assert rest["NextCursor"] == ""
+    assert rest["PageRange"].endswith(":AE27")
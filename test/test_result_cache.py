@@ -0,0 +1,89 @@
+import asyncio
+
+from ExcelTamer.ExcelTamerAgent.ResultCache import ToolResultCache
+
+
+def test_arguments_and_version_are_part_of_the_key():
+    assert ToolResultCache.key("read", ("A1", ["B", "C"]), 1) == ToolResultCache.key("read", ("A1", ("B", "C")), 1)
+    assert ToolResultCache.key("read", ("A1",), 1) != ToolResultCache.key("read", ("A1",), 2)
+    assert ToolResultCache.key("read", ({'b': 1, 'a': 2},), 1) == ToolResultCache.key("read", ({'a': 2, 'b': 1},), 1)
+
+
+def test_get_or_compute_counts_hits_and_misses():
+    cache = ToolResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "result"
+
+    assert cache.get_or_compute("read", ("A1",), 1, compute) == "result"
+    assert cache.get_or_compute("read", ("A1",), 1, compute) == "result"
+    assert cache.get_or_compute("read", ("A1",), 2, compute) == "result"
+
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert (stats['Hits'], stats['Misses'], stats['Entries']) == (1, 2, 2)
+
+
+def test_aget_or_compute():
+    cache = ToolResultCache()
+
+    async def compute():
+        return [1, 2]
+
+    async def run():
+        return [await cache.aget_or_compute("read", ("A1",), 1, compute) for _ in range(2)]
+
+    assert asyncio.run(run()) == [[1, 2], [1, 2]]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ToolResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == (True, 1)
+    cache.put("c", 3)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+    assert cache.evictions == 1
+
+
+def test_entries_are_evicted_by_size():
+    cache = ToolResultCache(max_size=20)
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+
+    assert cache.get("a") == (False, None)
+    assert cache.get("b") == (True, "y" * 10)
+    assert cache.stats()['Size'] == len(repr("y" * 10))
+
+
+def test_replacing_an_entry_updates_the_size():
+    cache = ToolResultCache()
+    cache.put("a", "x" * 10)
+    cache.put("a", "x")
+
+    assert cache.stats()['Size'] == len(repr("x"))
+
+
+def test_results_larger_than_the_cache_are_not_stored():
+    cache = ToolResultCache(max_size=10)
+    cache.put("small", "x")
+    cache.put("large", "x" * 100)
+
+    assert cache.get("large") == (False, None)
+    assert cache.get("small") == (True, "x")
+    assert cache.evictions == 0
+
+
+def test_clear():
+    cache = ToolResultCache()
+    cache.put("a", 1)
+    cache.clear()
+
+    assert cache.get("a") == (False, None)
+    assert cache.stats()['Size'] == 0
@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+import pytest
+
+from ExcelTamer.SheetCache import SheetCache, file_hash
+from ExcelTamer.SheetSnapshot import SheetSnapshot
+from ExcelTamer.XlsxFileBackend import XlsxFileBackend
+
+
+@pytest.fixture
+def cache(tmp_path) -> SheetCache:
+    return SheetCache(str(tmp_path / "cache"))
+
+
+def _snapshot(path: str, sheet_name: str = "Expenses") -> SheetSnapshot:
+    return SheetSnapshot.load(XlsxFileBackend(path), sheet_name, 0)
+
+
+def test_snapshot_round_trip(cache, example_path):
+    snapshot = _snapshot(example_path)
+    cache.save_snapshot(example_path, snapshot)
+
+    loaded = cache.load_snapshot(example_path, "Expenses", 3)
+
+    assert loaded is not None
+    assert loaded.revision == 3
+    assert (loaded.first_row, loaded.first_col) == (snapshot.first_row, snapshot.first_col)
+    assert loaded.range_data().values == snapshot.range_data().values
+    np.testing.assert_array_equal(loaded.formula_codes, snapshot.formula_codes)
+    assert loaded.value(26, "D") == 236
+    assert loaded.formula(26, "D") == "=SUM(D7:D25)"
+    label_index, expected = loaded.label_index(), snapshot.label_index()
+    assert label_index.lookup("TOTAL EXPENSES", "JAN") == expected.lookup("TOTAL EXPENSES", "JAN")
+
+
+def test_sheets_not_saved_are_not_loaded(cache, example_path):
+    cache.save_snapshot(example_path, _snapshot(example_path))
+
+    assert cache.load_snapshot(example_path, "Cost of sales", 0) is None
+
+
+def test_structure_round_trip(cache, example_path):
+    structure = {'Sheets': ["Revenues (sales)", "Cost of sales", "Expenses"], 'UsedRange': "$A$1:$AE$32"}
+
+    assert cache.load_structure(example_path) is None
+    cache.save_structure(example_path, structure)
+    assert cache.load_structure(example_path) == structure
+
+
+def test_entry_survives_a_touch(cache, example_path):
+    cache.save_structure(example_path, {'Sheets': []})
+    stat = os.stat(example_path)
+    os.utime(example_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert cache.load_structure(example_path) == {'Sheets': []}
+
+
+def test_entry_is_dropped_when_the_file_changes(cache, example_path):
+    cache.save_structure(example_path, {'Sheets': []})
+    cache.save_snapshot(example_path, _snapshot(example_path))
+    with open(example_path, "ab") as file:
+        file.write(b"\0")
+
+    assert cache.load_structure(example_path) is None
+    assert cache.load_snapshot(example_path, "Expenses", 0) is None
+
+
+def test_workbook_hash(cache, example_path):
+    assert cache.workbook_hash(example_path) == file_hash(example_path)
+    assert cache.workbook_hash(example_path) == cache.workbook_hash(example_path)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, example_path):
+    cache = SheetCache(str(tmp_path / "cache"))
+    cache.save_snapshot(example_path, _snapshot(example_path))
+    entry_size = cache.size()
+    cache.clear()
+    assert cache.size() == 0
+
+    cache = SheetCache(str(tmp_path / "cache"), max_size=entry_size * 2)
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f"copy{i}.xlsx")
+        with open(example_path, "rb") as source, open(path, "wb") as target:
+            target.write(source.read())
+        cache.save_snapshot(path, _snapshot(path))
+        paths.append(path)
+        # Entries are ordered by their modification time
+        os.utime(os.path.join(cache._entry_dir(path), "meta.json"), (i, i))
+
+    assert cache.size() <= entry_size * 2
+    assert cache.load_snapshot(paths[0], "Expenses", 0) is None
+    assert cache.load_snapshot(paths[2], "Expenses", 0) is not None
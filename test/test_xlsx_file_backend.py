@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from ExcelTamer.XlsxFileBackend import XlsxFileBackend
+from conftest import replace_columns
+
+
+def test_range_layout_skips_column_specs_left_of_the_range(rewrite_part):
+    path = rewrite_part("xl/worksheets/sheet1.xml",
+                        replace_columns('<cols><col min="1" max="1" width="40" customWidth="1"/></cols>'))
+    backend = XlsxFileBackend(path)
+    sheet_name = backend.list_sheets()[0]
+
+    layout = backend.range_layout(sheet_name, "E1:H3")
+
+    # The sheet's default width, as for columns far from A
+    np.testing.assert_array_equal(layout.column_widths, backend.range_layout(sheet_name, "X1:AA3").column_widths)
+    assert backend.range_layout(sheet_name, "A1:B1").column_widths[0] == 40
+
+
+def test_workbook_parts(backend):
+    assert backend.list_sheets() == ["Revenues (sales)", "Cost of sales", "Expenses"]
+    assert backend.active_sheet_name() == "Cost of sales"
+    assert not backend.has_unsaved_changes()
+
+
+def test_used_and_data_ranges(backend):
+    assert backend.used_range("Expenses") == ("$A$1:$AE$32", 32, 31)
+    # Formatting alone does not extend the data range
+    assert backend.data_range("Expenses") == "$B$1:$AE$27"
+    assert backend.has_formulas("Expenses")
+
+
+def test_read_range(backend):
+    data = backend.read_range("Expenses", "B6:E7")
+
+    assert (data.first_row, data.first_col, data.columns) == (6, 2, ["B", "C", "D", "E"])
+    assert data.values == [["EXPENSES", "TREND", "JAN", "FEB"], ["Salary expenses ", " ", 10.0, 18.0]]
+
+
+def test_read_formulas_expands_shared_formulas(backend):
+    assert backend.read_formulas("Expenses", "D26:E27") == [["=SUM(D7:D25)", "=SUM(E7:E25)"],
+                                                              ["='Cost of sales'!D15-D26", "='Cost of sales'!E15-E26"]]
+
+
+def test_cell_texts_use_number_formats(backend):
+    assert backend.cell_text("Expenses", "D26") == "$236.00"
+    assert backend.cell_texts("Expenses", ["D26", "B2", "D6"]) == ["$236.00", "COMPANY NAME", "JAN"]
+    assert backend.query_cell("Expenses", "D26") == {"Value": 236.0, "Formula": "=SUM(D7:D25)",
+                                                     "VisibleText": "$236.00"}
+
+
+def test_named_ranges(backend):
+    named_ranges = backend.named_ranges_by_sheet()
+
+    assert named_ranges[None] == [{"Name": "Company_Name", "Refers To": "$B$2"},
+                                  {"Name": "Wksht_Title", "Refers To": "$B$4"}]
+    assert named_ranges["Expenses"] == [{"Name": "Expenses!_xlnm.Print_Titles", "Refers To": "$6:$6"}]
+    assert len(backend.list_named_ranges()) == 5
+
+
+def test_list_tables(backend):
+    tables = {table["Name"]: table for table in backend.list_tables()}
+
+    assert set(tables) == {"Revenue", "CostofSales", "tblExpenses"}
+    revenue = tables["Revenue"]
+    assert (revenue["Sheet"], revenue["Range"], revenue["Header Rows"], revenue["Totals Rows"]) == \
+        ("Revenues (sales)", "B6:AD14", 1, 1)
+    assert revenue["Columns"][:4] == ["REVENUES (SALES)", "TREND", "JAN", "FEB"]
+
+
+def test_unknown_sheet_raises(backend):
+    with pytest.raises(KeyError):
+        backend.read_range("Nope", "A1")